@@ -13,6 +13,7 @@ def evaluate(input_file="rawdoc/validation_set.xlsx", output_file="evaluation_re
     # Lazy import to avoid long wait before first print
     print("Importing RAG modules (this may take a few seconds)...", flush=True)
     from rag_pipeline_v3 import FundRAG
+    from core.tracing import stage_ms
 
     try:
         # Load CSV or Excel
@@ -75,7 +76,9 @@ def evaluate(input_file="rawdoc/validation_set.xlsx", output_file="evaluation_re
                     "full_response": full_response,
                     "evidence_sources": str(rag_output.get('evidence_sources', [])),
                     "pipeline_type": rag_output.get('pipeline', 'unknown'),
-                    "latency": round(latency, 2)
+                    "latency": round(latency, 2),
+                    # Per-stage breakdown (core.tracing), e.g. rerank_ms / llm_ttft_ms
+                    **{f"{stage}_ms": ms for stage, ms in stage_ms(rag_output.get('trace', {})).items()}
                 })
                 
             except Exception as e:
@@ -1,11 +1,43 @@
 import sys
 import io
+import threading
 
 # Fix encoding for Windows Console
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
 
-from rag_pipeline_v3 import FundRAG
+
+class BackgroundRAG:
+    """
+    Imports rag_pipeline_v3 and builds FundRAG (index + LLM client) on a
+    background thread, so the prompt is shown at once and loading overlaps
+    with the user typing the first question.
+    """
+
+    def __init__(self):
+        self.rag = None
+        self.error = None
+        self._thread = threading.Thread(target=self._load, name="rag-init", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        try:
+            from rag_pipeline_v3 import FundRAG
+            rag = FundRAG()
+            rag.ensure_llm()
+            self.rag = rag
+        except Exception as e:
+            self.error = e
+
+    def get(self):
+        """Blocks until loading is done; raises the load error, if any."""
+        if self._thread.is_alive():
+            print("系统仍在初始化，请稍候...")
+            self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.rag
+
 
 def main():
     print("==================================================")
@@ -13,36 +45,37 @@ def main():
     print("   输入 'exit' 或 'quit' 退出")
     print("==================================================\n")
 
-    print("正在初始化系统，请稍候...")
-    try:
-        rag = FundRAG()
-        print("系统初始化完成！\n")
-    except Exception as e:
-        print(f"系统初始化失败: {e}")
-        return
+    print("系统在后台初始化，可直接输入问题。")
+    loader = BackgroundRAG()
 
     while True:
         try:
             # Handle input encoding safely
             print("请输入题目/问题：")
             question = input("> ").strip()
-            
+
             if question.lower() in ['exit', 'quit']:
                 print("再见！")
                 break
-                
+
             if not question:
                 continue
-                
+
+            try:
+                rag = loader.get()
+            except Exception as e:
+                print(f"系统初始化失败: {e}")
+                return
+
             print("\n正在思考中...\n")
-            
+
             result = rag.query(question)
-            
+
             print("-" * 50)
             print(result['full_response'])
             print("-" * 50)
             print("\n")
-            
+
         except KeyboardInterrupt:
             print("\n再见！")
             break
@@ -51,4 +84,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
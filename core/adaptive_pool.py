@@ -0,0 +1,76 @@
+import os
+from typing import Dict, List
+
+# Fixed pool (original behaviour): 20 hits per leg, up to 20 parents reranked
+DEFAULT_SEARCH_K = 20
+DEFAULT_POOL = 20
+
+# Thresholds are on FAISS squared-L2 distances of normalized OpenAI embeddings
+# (2 - 2*cos). Tune with scripts/evaluate_adaptive_pool.py.
+SKIP_GAP = float(os.getenv("ADAPTIVE_SKIP_GAP", "0.15"))       # best vs 2nd parent: skip rerank
+SHRINK_GAP = float(os.getenv("ADAPTIVE_SHRINK_GAP", "0.06"))   # best vs 2nd parent: shrink pool
+SHRINK_OVERLAP = float(os.getenv("ADAPTIVE_SHRINK_OVERLAP", "0.4"))  # share of top parents found by both legs
+FLAT_SPREAD = float(os.getenv("ADAPTIVE_FLAT_SPREAD", "0.04"))  # best vs 10th parent: scores are flat
+SHRINK_POOL = int(os.getenv("ADAPTIVE_SHRINK_POOL", "8"))
+WIDEN_SEARCH_K = int(os.getenv("ADAPTIVE_WIDEN_K", "40"))
+WIDEN_POOL = int(os.getenv("ADAPTIVE_WIDEN_POOL", "30"))
+
+TOP_N = 5          # parents compared between legs
+SPREAD_RANK = 10   # parent rank used for the flatness check
+
+
+def _unique_parents(hits: List[Dict]) -> List[str]:
+    seen = []
+    for hit in hits:
+        pid = hit.get('parent_id')
+        if pid and pid not in seen:
+            seen.append(pid)
+    return seen
+
+
+def pool_signals(vector_hits: List[Dict], keyword_hits: List[Dict]) -> Dict:
+    """
+    Ambiguity signals from the first retrieval round (parent level):
+    - gap:     distance of the 2nd best parent minus the best (vector leg)
+    - spread:  distance of the 10th best parent minus the best (vector leg)
+    - overlap: share of the top-5 vector parents also in the top-5 keyword parents
+    - top_agree: both legs rank the same parent first
+    """
+    best_dist: Dict[str, float] = {}
+    for hit in vector_hits:
+        pid = hit.get('parent_id')
+        if pid and pid not in best_dist:
+            best_dist[pid] = hit['score']  # hits arrive sorted by distance
+    dists = list(best_dist.values())
+
+    vector_top = list(best_dist)[:TOP_N]
+    keyword_top = _unique_parents(keyword_hits)[:TOP_N]
+
+    return {
+        "gap": round(dists[1] - dists[0], 4) if len(dists) >= 2 else None,
+        "spread": round(dists[min(SPREAD_RANK, len(dists)) - 1] - dists[0], 4) if dists else None,
+        "overlap": round(len(set(vector_top) & set(keyword_top)) / TOP_N, 4) if keyword_top else 0.0,
+        "top_agree": bool(vector_top and keyword_top and vector_top[0] == keyword_top[0]),
+    }
+
+
+def plan_pool(signals: Dict) -> Dict:
+    """
+    Picks the retrieval path from pool_signals():
+    - skip_rerank: both legs agree on a clearly separated best parent
+    - shrink:      clear gap or strong leg overlap -> rerank a small pool
+    - widen:       flat distances and no leg overlap -> search deeper, rerank more
+    - default:     the fixed 20/20 pool
+    """
+    gap, spread = signals["gap"], signals["spread"]
+    if gap is None:
+        # Vector leg empty / timed out or a single hit: nothing to judge on
+        return {"path": "default", "search_k": DEFAULT_SEARCH_K, "pool_size": DEFAULT_POOL, "rerank": True}
+
+    if signals["top_agree"] and gap >= SKIP_GAP:
+        return {"path": "skip_rerank", "search_k": DEFAULT_SEARCH_K, "pool_size": SHRINK_POOL, "rerank": False}
+    if gap >= SHRINK_GAP or signals["overlap"] >= SHRINK_OVERLAP:
+        return {"path": "shrink", "search_k": DEFAULT_SEARCH_K, "pool_size": SHRINK_POOL, "rerank": True}
+    if spread is not None and spread <= FLAT_SPREAD and signals["overlap"] == 0.0:
+        return {"path": "widen", "search_k": WIDEN_SEARCH_K, "pool_size": WIDEN_POOL, "rerank": True}
+    return {"path": "default", "search_k": DEFAULT_SEARCH_K, "pool_size": DEFAULT_POOL, "rerank": True}
@@ -0,0 +1,254 @@
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.text_utils import normalize_text
+
+DEFAULT_MAX_ITEMS = 2000
+DEFAULT_TTL_S = 7 * 24 * 3600
+DEFAULT_THRESHOLD = 0.95
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_TRAILING = "?？。.!！ "
+# SQLite writes from aget_exact / aput: a commit can wait on another process's lock
+_disk_io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="answer-cache")
+
+
+def question_key(question: str) -> str:
+    """Exact-match key: normalized, case-folded, trailing punctuation ignored."""
+    text = normalize_text(question).lower().rstrip(_TRAILING)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def answer_namespace(*parts: str) -> str:
+    """Cache namespace from everything an answer depends on (index build, prompts, models)."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+class AnswerCache:
+    """
+    Generated answers keyed by question, in front of FundRAG.aquery / aquery_stream.
+
+    Lookup is two-step:
+    1. get_exact: same normalized question
+    2. get_similar: best cached question whose query embedding has cosine
+       similarity >= threshold and the same numbers (a calc question with
+       other amounts is a different question). The caller only serves it when
+       retrieval for the new question returns the same parents.
+
+    Entries expire after ttl_s and the least recently used are evicted beyond
+    max_items. All entries live under one `namespace` (index build + prompt
+    templates + models); a persistent cache opened under a new namespace drops
+    the old rows. aget_exact / aput are the event-loop variants: lookups are
+    served from memory on the loop and SQLite writes run on a worker thread.
+    """
+
+    def __init__(self, namespace: str, threshold: float = DEFAULT_THRESHOLD,
+                 max_items: int = DEFAULT_MAX_ITEMS, ttl_s: float = DEFAULT_TTL_S, path: Optional[str] = None):
+        self.namespace = namespace
+        self.threshold = threshold
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self.path = path
+
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()     # entries + stats
+        self._db_lock = threading.Lock()  # SQLite connection
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+        # Stacked unit vectors of _entries for get_similar, rebuilt after changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+
+        self._conn = None
+        if path:
+            db_dir = os.path.dirname(path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    namespace TEXT,
+                    key TEXT,
+                    vector BLOB,
+                    entry TEXT,
+                    created REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            # Invalidate answers from another index build / prompt / model, and expired ones
+            self._conn.execute("DELETE FROM answers WHERE namespace != ? OR created < ?",
+                               (namespace, time.time() - ttl_s))
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT key, vector, entry, created FROM answers WHERE namespace = ? ORDER BY created DESC LIMIT ?",
+                (namespace, max_items)
+            ).fetchall()
+            for key, blob, entry, created in reversed(rows):
+                self._entries[key] = {
+                    **json.loads(entry),
+                    "vector": np.frombuffer(blob, dtype=np.float32),
+                    "created": created
+                }
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _public(entry: Dict, **extra) -> Dict:
+        return {**{k: v for k, v in entry.items() if k not in ("vector", "created")}, **extra}
+
+    def _expired(self, entry: Dict) -> bool:
+        return time.time() - entry["created"] > self.ttl_s
+
+    def _drop(self, key: str):
+        """Removes an entry from memory; the caller deletes its row (_persist)."""
+        self._entries.pop(key, None)
+        self._matrix = None
+
+    def _persist(self, rows: List[Tuple], deleted: List[str]):
+        """Writes new rows and deletes dropped keys in the SQLite file (if any)."""
+        with self._db_lock:
+            if self._conn is None or not (rows or deleted):
+                return
+            self._conn.executemany("DELETE FROM answers WHERE namespace = ? AND key = ?",
+                                   [(self.namespace, key) for key in deleted])
+            self._conn.executemany("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    async def _apersist(self, rows: List[Tuple], deleted: List[str]):
+        if self._conn is not None and (rows or deleted):
+            await asyncio.get_running_loop().run_in_executor(_disk_io, self._persist, rows, deleted)
+
+    def _lookup_exact(self, question: str) -> Tuple[Optional[Dict], List[str]]:
+        """(public entry or None, keys dropped as expired)."""
+        key = question_key(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._drop(key)
+                return None, [key]
+            if entry is None:
+                return None, []
+            self._entries.move_to_end(key)
+            self._stats["exact_hits"] += 1
+            return self._public(entry, similarity=1.0), []
+
+    def get_exact(self, question: str) -> Optional[Dict]:
+        entry, expired = self._lookup_exact(question)
+        self._persist([], expired)
+        return entry
+
+    async def aget_exact(self, question: str) -> Optional[Dict]:
+        entry, expired = self._lookup_exact(question)
+        await self._apersist([], expired)
+        return entry
+
+    def get_similar(self, question: str, vector: Sequence[float]) -> Optional[Dict]:
+        """
+        Most similar live entry above the threshold with the same numbers, or
+        None. Not counted: the caller records the outcome once it compared the
+        retrieved parents (record_semantic).
+        """
+        query = self._unit(vector)
+        numbers = _NUMBER.findall(normalize_text(question))
+        with self._lock:
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries)
+                self._matrix = np.stack([self._entries[k]["vector"] for k in self._matrix_keys]) \
+                    if self._matrix_keys else None
+            if self._matrix is not None and self._matrix.shape[1] == query.shape[0]:
+                similarities = self._matrix @ query
+                for i in np.argsort(-similarities):
+                    if similarities[i] < self.threshold:
+                        break
+                    key = self._matrix_keys[i]
+                    entry = self._entries.get(key)
+                    if entry is None or self._expired(entry) or entry["numbers"] != numbers:
+                        continue
+                    self._entries.move_to_end(key)
+                    return self._public(entry, similarity=round(float(similarities[i]), 4))
+        return None
+
+    def record_semantic(self, hit: bool):
+        with self._lock:
+            self._stats["semantic_hits" if hit else "misses"] += 1
+
+    def _put_memory(self, question: str, vector: Sequence[float], answer: str, pipeline: str,
+                    docs: List[Dict]) -> Tuple[List[Tuple], List[str]]:
+        """Adds the entry in memory; returns (rows to write, keys evicted) for _persist."""
+        key = question_key(question)
+        entry = {
+            "question": question,
+            "numbers": _NUMBER.findall(normalize_text(question)),
+            "answer": answer,
+            "pipeline": pipeline,
+            "parent_ids": [d["parent_id"] for d in docs],
+            "evidence_sources": [d["metadata"] for d in docs],
+            "retrieved_docs": docs,
+        }
+        created = time.time()
+        unit = self._unit(vector)
+        row = (self.namespace, key, unit.tobytes(), json.dumps(entry, ensure_ascii=False, default=str), created)
+        evicted = []
+        with self._lock:
+            self._entries[key] = {**entry, "vector": unit, "created": created}
+            self._entries.move_to_end(key)
+            self._matrix = None
+            while len(self._entries) > self.max_items:
+                evicted.append(next(iter(self._entries)))
+                self._drop(evicted[-1])
+        return [row], evicted
+
+    def put(self, question: str, vector: Sequence[float], answer: str, pipeline: str, docs: List[Dict]):
+        self._persist(*self._put_memory(question, vector, answer, pipeline, docs))
+
+    async def aput(self, question: str, vector: Sequence[float], answer: str, pipeline: str, docs: List[Dict]):
+        await self._apersist(*self._put_memory(question, vector, answer, pipeline, docs))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        total = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["exact_hits"] + stats["semantic_hits"]) / total, 4) if total else 0.0
+        return stats
+
+    def close(self):
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+                self._conn = None
+
+
+def build_answer_cache(namespace: str) -> Optional[AnswerCache]:
+    """
+    Default config:
+    - RAG_ANSWER_CACHE=1 enables the cache (off by default: a semantic hit
+      returns an answer generated for a differently worded question)
+    - ANSWER_CACHE_THRESHOLD minimum cosine similarity for a semantic hit
+    - ANSWER_CACHE_SIZE / ANSWER_CACHE_TTL capacity (answers) and lifetime (seconds)
+    - ANSWER_CACHE_PATH enables SQLite persistence at that path
+    """
+    if os.getenv("RAG_ANSWER_CACHE", "0") != "1":
+        return None
+    return AnswerCache(
+        namespace=namespace,
+        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+        max_items=int(os.getenv("ANSWER_CACHE_SIZE", DEFAULT_MAX_ITEMS)),
+        ttl_s=float(os.getenv("ANSWER_CACHE_TTL", DEFAULT_TTL_S)),
+        path=os.getenv("ANSWER_CACHE_PATH") or None
+    )
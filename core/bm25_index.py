@@ -0,0 +1,194 @@
+"""
+In-process BM25 keyword engine (KEYWORD_BACKEND=bm25).
+
+The children are tokenized with the same CJK bigrams as the FTS5 index and
+stored as a sparse (children x terms) matrix of precomputed BM25 term
+weights in CSC layout, so a query only touches its terms' columns:
+
+    index/bm25/
+        data.npy, indices.npy, indptr.npy   CSC arrays (np.load mmap_mode='r')
+        vocab.json                          term list (column order) + doc freqs
+        docs.bin                            child contents, UTF-8, back to back (mmap)
+        doc_offsets.npy                     int64[n + 1] byte range of each row in docs.bin
+        doc_sources.npy                     int32[n] row -> entry of doc_sources.json
+        doc_sources.json                    distinct (parent_id, metadata) of the rows
+
+Like the parent store (core.parent_store), the per-row text stays in the
+page cache shared by all processes: a hit decodes only its own slice. The
+(parent_id, metadata) list is per parent, not per child, and small.
+Index dirs from before docs.bin (docs.jsonl) are still read, into memory.
+"""
+import os
+import json
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from core.cjk_tokenize import tokenize, query_terms
+
+BM25_INDEX_DIR = os.path.join("index", "bm25")
+K1 = 1.2
+B = 0.75
+
+_ARRAYS = ("data", "indices", "indptr")
+
+
+class BM25Docs:
+    """Row -> (parent_id, content, metadata) over a UTF-8 blob and offsets (both may be mmap-ed)."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, sources: np.ndarray, source_list: List[Dict]):
+        self.blob = blob
+        self.offsets = offsets
+        self.sources = sources
+        self.source_list = source_list
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> "BM25Docs":
+        """rows: dicts with parent_id / content / metadata."""
+        chunks = [row['content'].encode('utf-8') for row in rows]
+        offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(c) for c in chunks])
+        interned: Dict[str, int] = {}
+        source_list, sources = [], []
+        for row in rows:
+            source = {"parent_id": row['parent_id'], "metadata": row.get('metadata', {})}
+            key = json.dumps(source, ensure_ascii=False, sort_keys=True)
+            if key not in interned:
+                interned[key] = len(source_list)
+                source_list.append(source)
+            sources.append(interned[key])
+        blob = np.frombuffer(b"".join(chunks), dtype=np.uint8)
+        return cls(blob, offsets, np.array(sources, dtype=np.int32), source_list)
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def row(self, i: int) -> Tuple[str, str, Dict]:
+        source = self.source_list[self.sources[i]]
+        content = self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+        return source['parent_id'], content, dict(source['metadata'])
+
+    def save(self, index_dir: str):
+        with open(os.path.join(index_dir, "docs.bin"), 'wb') as f:
+            f.write(self.blob.tobytes())
+        np.save(os.path.join(index_dir, "doc_offsets.npy"), self.offsets)
+        np.save(os.path.join(index_dir, "doc_sources.npy"), self.sources)
+        with open(os.path.join(index_dir, "doc_sources.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.source_list, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, index_dir: str, mmap: bool = True) -> "BM25Docs":
+        blob_path = os.path.join(index_dir, "docs.bin")
+        if not os.path.exists(blob_path):
+            with open(os.path.join(index_dir, "docs.jsonl"), 'r', encoding='utf-8') as f:
+                return cls.from_rows([json.loads(line) for line in f])
+        mode = 'r' if mmap else None
+        # np.memmap rejects empty files
+        blob = np.memmap(blob_path, dtype=np.uint8, mode='r') if mmap and os.path.getsize(blob_path) \
+            else np.fromfile(blob_path, dtype=np.uint8)
+        with open(os.path.join(index_dir, "doc_sources.json"), 'r', encoding='utf-8') as f:
+            source_list = json.load(f)
+        return cls(blob, np.load(os.path.join(index_dir, "doc_offsets.npy"), mmap_mode=mode),
+                   np.load(os.path.join(index_dir, "doc_sources.npy"), mmap_mode=mode), source_list)
+
+
+class BM25Index:
+
+    def __init__(self, weights: sparse.csc_matrix, vocab: List[str], doc_freq: List[int], docs: BM25Docs):
+        self.weights = weights
+        self.vocab = {term: col for col, term in enumerate(vocab)}
+        self.doc_freq = dict(zip(vocab, doc_freq))
+        self.docs = docs
+
+    @classmethod
+    def build(cls, children: List[Dict], k1: float = K1, b: float = B) -> "BM25Index":
+        """children: dicts with content / parent_id / metadata (children.jsonl rows)."""
+        counts = [Counter(tokenize(c['content'])) for c in children]
+        lengths = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        avg_len = float(lengths.mean()) if len(lengths) else 0.0
+
+        vocab: Dict[str, int] = {}
+        rows, cols, tfs = [], [], []
+        for row, counter in enumerate(counts):
+            for term, tf in counter.items():
+                rows.append(row)
+                cols.append(vocab.setdefault(term, len(vocab)))
+                tfs.append(tf)
+        rows = np.array(rows, dtype=np.int32)
+        cols = np.array(cols, dtype=np.int32)
+        tfs = np.array(tfs, dtype=np.float32)
+
+        n_docs = len(children)
+        doc_freq = np.bincount(cols, minlength=len(vocab))
+        # Lucene-style idf (never negative)
+        idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        norm = k1 * (1 - b + b * lengths[rows] / avg_len) if avg_len else k1
+        data = idf[cols] * tfs * (k1 + 1) / (tfs + norm)
+
+        weights = sparse.csc_matrix((data.astype(np.float32), (rows, cols)), shape=(n_docs, len(vocab)))
+        return cls(weights, list(vocab), doc_freq.tolist(), BM25Docs.from_rows(children))
+
+    def save(self, index_dir: str = BM25_INDEX_DIR):
+        os.makedirs(index_dir, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(index_dir, f"{name}.npy"), getattr(self.weights, name))
+        terms = sorted(self.vocab, key=self.vocab.get)
+        with open(os.path.join(index_dir, "vocab.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                "shape": list(self.weights.shape),
+                "terms": terms,
+                "doc_freq": [self.doc_freq[t] for t in terms],
+            }, f, ensure_ascii=False)
+        self.docs.save(index_dir)
+        legacy_docs = os.path.join(index_dir, "docs.jsonl")
+        if os.path.exists(legacy_docs):
+            os.remove(legacy_docs)
+
+    @classmethod
+    def load(cls, index_dir: str = BM25_INDEX_DIR, mmap: bool = True) -> "BM25Index":
+        arrays = {
+            name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode='r' if mmap else None)
+            for name in _ARRAYS
+        }
+        with open(os.path.join(index_dir, "vocab.json"), 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+        weights = sparse.csc_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]), shape=tuple(vocab["shape"]), copy=False
+        )
+        return cls(weights, vocab["terms"], vocab["doc_freq"], BM25Docs.load(index_dir, mmap))
+
+    @staticmethod
+    def exists(index_dir: str = BM25_INDEX_DIR) -> bool:
+        return os.path.exists(os.path.join(index_dir, "vocab.json"))
+
+    def search(self, query: str, k: int = 5) -> List[Dict]:
+        """Top-k children by BM25 as keyword-leg hits (score = -bm25, lower is better like FTS5)."""
+        terms = query_terms(query, self.doc_freq, len(self.docs), max_postings=None)
+        cols = [self.vocab[t] for t in terms]
+        if not cols:
+            return []
+
+        # Sum the query terms' columns: one slice-add per term over the CSC arrays
+        indptr, indices, data = self.weights.indptr, self.weights.indices, self.weights.data
+        scores = np.zeros(self.weights.shape[0], dtype=np.float32)
+        for col in cols:
+            start, end = indptr[col], indptr[col + 1]
+            scores[indices[start:end]] += data[start:end]
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = matched[np.argsort(-scores[matched], kind="stable")]
+
+        hits = []
+        for row in top:
+            parent_id, content, metadata = self.docs.row(row)
+            hits.append({
+                "parent_id": parent_id,
+                "child_content": content,
+                "metadata": metadata,
+                "score": -float(scores[row]),
+                "source": "keyword"
+            })
+        return hits
@@ -0,0 +1,97 @@
+"""
+CJK-aware tokenization for the FTS5 keyword leg.
+
+FTS5's unicode61 tokenizer keeps a whole run of Chinese characters as one
+token, so a Chinese question only matches as an exact phrase. Instead both
+sides are reduced to the same overlapping character bigrams:
+
+- build time: `index_text(content)` is stored in the `content_tokens` column
+- query time: `match_expression(question)` ORs the informative query bigrams
+
+Latin words and numbers are kept whole (lower-cased).
+"""
+import os
+import re
+from typing import Dict, List, Optional
+
+from core.text_utils import normalize_text
+
+# CJK unified ideographs (+ extension A, compatibility ideographs)
+_CJK_RUN = r'[㐀-䶿一-鿿豈-﫿]+'
+# Digits and Latin letters split the same way FTS5's unicode61 splits them ("1.5%" -> 1, 5)
+_TOKEN_RE = re.compile(rf'({_CJK_RUN})|([0-9]+|[a-zA-Z]+)')
+
+# Question boilerplate that says nothing about the topic; cut out of the query
+# before tokenizing so no bigram spans a boilerplate boundary
+QUERY_STOP_PHRASES = [
+    "下列", "以下", "关于", "说法", "不正确", "正确", "错误", "的是", "哪个", "哪些", "哪项",
+    "选项", "不属于", "属于", "不包括", "包括", "是指", "为什么", "什么", "如何", "请问",
+    "根据", "其中", "应该", "可以", "一般", "通常", "主要", "的", "了",
+]
+_STOP_RE = re.compile("|".join(sorted(QUERY_STOP_PHRASES, key=len, reverse=True)))
+
+# Query terms in more than this share of children carry little bm25 weight but cost the most
+MAX_DF_RATIO = 0.2
+MAX_QUERY_TERMS = 12
+# bm25 cost grows with the rows matched: stop adding (ever more common) terms past this
+# many postings, once MIN_QUERY_TERMS are in
+MAX_POSTINGS = int(os.getenv("KEYWORD_MAX_POSTINGS", "500"))
+MIN_QUERY_TERMS = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """Overlapping bigrams for CJK runs (a lone character stays a unigram), whole Latin words / numbers."""
+    tokens = []
+    for match in _TOKEN_RE.finditer(normalize_text(text)):
+        cjk, other = match.groups()
+        if cjk:
+            if len(cjk) == 1:
+                tokens.append(cjk)
+            else:
+                tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        else:
+            tokens.append(other.lower())
+    return tokens
+
+
+def index_text(text: str) -> str:
+    """Space-separated tokens for the FTS5 `content_tokens` column (unicode61 splits on spaces)."""
+    return " ".join(tokenize(text))
+
+
+def query_terms(query: str, doc_freq: Optional[Dict[str, int]] = None, n_docs: int = 0,
+                max_terms: int = MAX_QUERY_TERMS, max_postings: Optional[int] = MAX_POSTINGS) -> List[str]:
+    """
+    Informative, distinct query tokens: boilerplate phrases are dropped and,
+    when document frequencies are known, tokens absent from the index or present
+    in more than MAX_DF_RATIO of the children. The rarest terms are kept, up to
+    `max_terms` and a budget of `max_postings` matched rows (None: no budget).
+    """
+    terms = []
+    for token in tokenize(_STOP_RE.sub(" ", normalize_text(query))):
+        if token in terms:
+            continue
+        if len(token) == 1 and not token.isascii():
+            continue  # lone CJK characters match almost everything
+        terms.append(token)
+
+    if doc_freq is not None and n_docs:
+        known = [t for t in terms if doc_freq.get(t, 0) > 0]
+        selective = [t for t in known if doc_freq[t] <= n_docs * MAX_DF_RATIO]
+        # Keep something to search for even if every term is common
+        ranked = sorted(selective or known, key=lambda t: doc_freq[t])
+        terms, postings = [], 0
+        for term in ranked:
+            if max_postings is not None and len(terms) >= MIN_QUERY_TERMS and postings + doc_freq[term] > max_postings:
+                break
+            terms.append(term)
+            postings += doc_freq[term]
+    return terms[:max_terms]
+
+
+def match_expression(terms: List[str]) -> str:
+    """FTS5 MATCH expression: any of the terms, each quoted, scoped to content_tokens."""
+    if not terms:
+        return ""
+    quoted = " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+    return f"content_tokens : ({quoted})"
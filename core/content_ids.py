@@ -0,0 +1,55 @@
+"""
+Deterministic, content-addressed ids for parents and children.
+
+    parent_id = sha256(metadata JSON + content)[:32]
+    child_id  = sha256(parent_id + content)[:32]
+
+Re-running the chunking pipeline on unchanged text reproduces the same ids,
+so an incremental index build (core.index_update) can diff by id and caches
+keyed on parent ids (rerank scores) stay valid. Exact duplicates get a "-2",
+"-3", ... suffix in document order.
+"""
+import json
+import hashlib
+from typing import Dict, List, Set
+
+ID_LENGTH = 32
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:ID_LENGTH]
+
+
+def _unique(base: str, seen: Set[str]) -> str:
+    uid, n = base, 1
+    while uid in seen:
+        n += 1
+        uid = f"{base}-{n}"
+    seen.add(uid)
+    return uid
+
+
+def parent_uid(content: str, metadata: Dict) -> str:
+    return _digest(json.dumps(metadata, ensure_ascii=False, sort_keys=True), content)
+
+
+def child_uid(parent_id: str, content: str) -> str:
+    return _digest(parent_id, content)
+
+
+def assign_parent_ids(parents: List[Dict]) -> List[Dict]:
+    """Parent dicts (content + metadata) with their content id as parent_id."""
+    seen: Set[str] = set()
+    return [{"parent_id": _unique(parent_uid(p['content'], p['metadata']), seen), **p} for p in parents]
+
+
+def child_ids(children: List[Dict]) -> List[str]:
+    """Content ids for children (parent_id + content), in order."""
+    seen: Set[str] = set()
+    return [_unique(child_uid(c['parent_id'], c['content']), seen) for c in children]
+
+
+def has_content_ids(parents: List[Dict]) -> bool:
+    """True if every parent_id is the content id (older parents.jsonl used random uuid4 ids)."""
+    expected = assign_parent_ids([{"content": p['content'], "metadata": p['metadata']} for p in parents])
+    return all(p['parent_id'] == e['parent_id'] for p, e in zip(parents, expected))
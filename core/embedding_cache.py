@@ -0,0 +1,397 @@
+import os
+import array
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from core.text_utils import normalize_text
+
+# Config (env overridable)
+DEFAULT_CACHE_PATH = os.path.join("index", "embedding_cache.db")   # SQLiteEmbeddingStore (blobs)
+DEFAULT_STORE_DIR = os.path.join("index", "embedding_store")       # MemmapEmbeddingStore
+DEFAULT_MEMORY_ITEMS = 4096
+# Bounded pool for persistent-store I/O from the async methods: a store write can wait on
+# another process's write lock (e.g. an index build) and must not block the event loop
+STORE_IO_WORKERS = int(os.getenv("EMBEDDING_STORE_IO_WORKERS", "4"))
+_store_io = ThreadPoolExecutor(max_workers=STORE_IO_WORKERS, thread_name_prefix="embedding-store")
+
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class SQLiteEmbeddingStore:
+    """
+    Persistent embedding tier: key -> float32 vector blob in a small SQLite file.
+    Any object with the same mget/mset methods can be plugged into CachedEmbeddings.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        db_dir = os.path.dirname(path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB
+            )
+        """)
+        self._conn.commit()
+
+    def mget(self, keys: List[str]) -> List[Optional[List[float]]]:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's host parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ','.join(['?'] * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array.array('f', blob).tolist()
+        return [found.get(k) for k in keys]
+
+    def mset(self, items: List[Tuple[str, List[float]]]):
+        if not items:
+            return
+        rows = [(k, array.array('f', v).tobytes()) for k, v in items]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MemmapEmbeddingStore:
+    """
+    Persistent embedding tier shared by index builds, the question filter and
+    queries (same mget/mset interface as SQLiteEmbeddingStore):
+
+        <dir>/keys.db          SQLite: key -> (dim, row)
+        <dir>/vectors-<dim>.f32  append-only float32 rows, read through np.memmap
+
+    Writers append under the keys.db write lock (BEGIN IMMEDIATE), so several
+    processes can fill the store; a torn tail from a crashed writer is
+    truncated by the next append. Readers remap when a file has grown.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps: Dict[int, np.memmap] = {}
+        self._conn = sqlite3.connect(os.path.join(store_dir, "keys.db"), check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                key TEXT PRIMARY KEY,
+                dim INTEGER,
+                row INTEGER
+            ) WITHOUT ROWID
+        """)
+
+    def _path(self, dim: int) -> str:
+        return os.path.join(self.store_dir, f"vectors-{dim}.f32")
+
+    def _rows(self, dim: int, min_rows: int) -> np.ndarray:
+        """Memmap of the dim file covering at least min_rows rows (remapped after appends)."""
+        mapped = self._maps.get(dim)
+        if mapped is None or len(mapped) < min_rows:
+            n_rows = os.path.getsize(self._path(dim)) // (dim * 4)
+            mapped = np.memmap(self._path(dim), dtype=np.float32, mode='r', shape=(n_rows, dim))
+            self._maps[dim] = mapped
+        return mapped
+
+    def get_arrays(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Bulk lookup as float32 rows (views into the memmap)."""
+        found: Dict[str, Tuple[int, int]] = {}
+        with self._lock:
+            # Stay well below SQLite's host parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ','.join(['?'] * len(batch))
+                for key, dim, row in self._conn.execute(
+                    f"SELECT key, dim, row FROM vectors WHERE key IN ({placeholders})", batch
+                ):
+                    found[key] = (dim, row)
+            maps = {}
+            for dim, row in found.values():
+                maps[dim] = max(maps.get(dim, 0), row + 1)
+            maps = {dim: self._rows(dim, n) for dim, n in maps.items()}
+        return [maps[found[k][0]][found[k][1]] if k in found else None for k in keys]
+
+    def mget(self, keys: List[str]) -> List[Optional[List[float]]]:
+        return [v.tolist() if v is not None else None for v in self.get_arrays(keys)]
+
+    def mset(self, items: List[Tuple[str, List[float]]]):
+        if not items:
+            return
+        by_dim: Dict[int, List[Tuple[str, List[float]]]] = {}
+        for key, vector in dict(items).items():
+            by_dim.setdefault(len(vector), []).append((key, vector))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # cross-process writer lock
+            try:
+                for dim, entries in by_dim.items():
+                    placeholders = ','.join(['?'] * len(entries))
+                    known = {k for k, in self._conn.execute(
+                        f"SELECT key FROM vectors WHERE key IN ({placeholders})", [k for k, _ in entries]
+                    )}
+                    entries = [(k, v) for k, v in entries if k not in known]
+                    if not entries:
+                        continue
+                    with open(self._path(dim), 'ab+') as f:
+                        start = f.seek(0, os.SEEK_END) // (dim * 4)
+                        f.truncate(start * dim * 4)  # drop a torn row left by a crashed writer
+                        f.seek(start * dim * 4)
+                        f.write(np.asarray([v for _, v in entries], dtype=np.float32).tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._conn.executemany("INSERT INTO vectors VALUES (?, ?, ?)", [
+                        (key, dim, start + i) for i, (key, _) in enumerate(entries)
+                    ])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def import_sqlite(self, path: str) -> int:
+        """Copies a SQLiteEmbeddingStore file (key -> blob) into this store; returns vectors read."""
+        conn = sqlite3.connect(path)
+        n = 0
+        try:
+            cursor = conn.execute("SELECT key, vector FROM embeddings")
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                self.mset([(key, array.array('f', blob).tolist()) for key, blob in rows])
+                n += len(rows)
+        finally:
+            conn.close()
+        return n
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._maps.clear()
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Two-tier cache in front of any LangChain Embeddings:
+    1. in-process LRU (per process, thread-safe), holding float32 arrays
+       (~6 KB per 1536-dim vector instead of ~50 KB as a list of floats);
+       the Embeddings methods still return lists
+    2. optional persistent store (shared across runs / processes)
+    Keys are sha256(model name + normalized text); cached_embeddings puts the
+    dimensions in the model name when they are set. A model that embeds
+    queries differently from documents (a `query_instruction`, as
+    LocalEmbeddings has) keys queries under its own name + instruction, so a
+    query never gets a document's vector or the other way round.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str,
+                 store: Optional[SQLiteEmbeddingStore] = None,
+                 max_memory_items: int = DEFAULT_MEMORY_ITEMS):
+        self.underlying = underlying
+        self.model_name = model_name
+        instruction = getattr(underlying, "query_instruction", "")
+        self.query_model_name = f"{model_name}|query|{instruction}" if instruction else model_name
+        self.store = store
+        self.max_memory_items = max_memory_items
+
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    # --- LRU helpers ---
+    def _lru_get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is None:
+                return None
+            self._lru.move_to_end(key)
+        return vector.tolist()
+
+    def _lru_put(self, key: str, vector: List[float]):
+        vector = np.array(vector, dtype=np.float32)
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_memory_items:
+                self._lru.popitem(last=False)
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _lookup_memory(self, keys: List[str]) -> List[Optional[List[float]]]:
+        vectors = [self._lru_get(k) for k in keys]
+        self._count("memory_hits", sum(v is not None for v in vectors))
+        return vectors
+
+    def _lookup_store(self, keys: List[str], vectors: List[Optional[List[float]]]) -> List[Optional[List[float]]]:
+        """Fills memory misses from the persistent store (promoting hits into memory)."""
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing and self.store is not None:
+            stored = self.store.mget([keys[i] for i in missing])
+            for i, vector in zip(missing, stored):
+                if vector is not None:
+                    vectors[i] = vector
+                    self._lru_put(keys[i], vector)
+                    self._count("disk_hits")
+        return vectors
+
+    def _lookup(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Memory first, then the persistent store."""
+        return self._lookup_store(keys, self._lookup_memory(keys))
+
+    async def _alookup(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Memory on the loop; the store only for misses, on the store I/O pool."""
+        vectors = self._lookup_memory(keys)
+        if self.store is not None and any(v is None for v in vectors):
+            vectors = await asyncio.get_running_loop().run_in_executor(
+                _store_io, self._lookup_store, keys, vectors
+            )
+        return vectors
+
+    def _remember_memory(self, keys: List[str], vectors: List[List[float]]):
+        for key, vector in zip(keys, vectors):
+            self._lru_put(key, vector)
+
+    def _remember(self, keys: List[str], vectors: List[List[float]]):
+        self._remember_memory(keys, vectors)
+        if self.store is not None:
+            self.store.mset(list(zip(keys, vectors)))
+
+    async def _aremember(self, keys: List[str], vectors: List[List[float]]):
+        self._remember_memory(keys, vectors)
+        if self.store is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                _store_io, self.store.mset, list(zip(keys, vectors))
+            )
+
+    @staticmethod
+    def _distinct_misses(keys: List[str], texts: List[str],
+                         vectors: List[Optional[List[float]]]) -> Dict[str, str]:
+        """key -> text for each distinct key that still needs embedding."""
+        todo: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None and key not in todo:
+                todo[key] = text
+        return todo
+
+    def _fill(self, keys: List[str], vectors: List[Optional[List[float]]],
+              todo: Dict[str, str], new_vectors: List[List[float]]) -> List[List[float]]:
+        self._count("misses", len(todo))
+        self._remember(list(todo.keys()), new_vectors)
+        return self._merge(keys, vectors, todo, new_vectors)
+
+    @staticmethod
+    def _merge(keys: List[str], vectors: List[Optional[List[float]]],
+               todo: Dict[str, str], new_vectors: List[List[float]]) -> List[List[float]]:
+        fresh = dict(zip(todo.keys(), new_vectors))
+        return [v if v is not None else fresh[k] for k, v in zip(keys, vectors)]
+
+    # --- Embeddings interface ---
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.model_name, t) for t in texts]
+        vectors = self._lookup(keys)
+        todo = self._distinct_misses(keys, texts, vectors)
+        if todo:
+            vectors = self._fill(keys, vectors, todo, self.underlying.embed_documents(list(todo.values())))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        key = cache_key(self.query_model_name, text)
+        vector = self._lookup([key])[0]
+        if vector is None:
+            self._count("misses")
+            vector = self.underlying.embed_query(text)
+            self._remember([key], [vector])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.model_name, t) for t in texts]
+        vectors = await self._alookup(keys)
+        todo = self._distinct_misses(keys, texts, vectors)
+        if todo:
+            new_vectors = await self.underlying.aembed_documents(list(todo.values()))
+            self._count("misses", len(todo))
+            await self._aremember(list(todo.keys()), new_vectors)
+            vectors = self._merge(keys, vectors, todo, new_vectors)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """LRU hits are served on the loop; store reads / writes run on the store I/O pool."""
+        key = cache_key(self.query_model_name, text)
+        vector = (await self._alookup([key]))[0]
+        if vector is None:
+            self._count("misses")
+            vector = await self.underlying.aembed_query(text)
+            await self._aremember([key], [vector])
+        return vector
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((total - stats["misses"]) / total, 4) if total else 0.0
+        return stats
+
+
+def cached_embeddings(underlying: Embeddings, model_name: str) -> CachedEmbeddings:
+    """
+    Wraps embeddings with the default cache config:
+    - EMBEDDING_CACHE=0 disables the persistent tier (memory LRU only)
+    - EMBEDDING_CACHE_BACKEND=memmap (default, EMBEDDING_STORE_DIR) | sqlite (EMBEDDING_CACHE_PATH)
+    - EMBEDDING_CACHE_SIZE sets the LRU capacity
+    Keys cover (model, dimensions, text): a reduced-dimension model gets its own vectors.
+    """
+    dimensions = getattr(underlying, "dimensions", None)
+    key_model = f"{model_name}@{dimensions}" if dimensions else model_name
+    store = None
+    if os.getenv("EMBEDDING_CACHE", "1") != "0":
+        legacy_path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+        if os.getenv("EMBEDDING_CACHE_BACKEND", "memmap") == "sqlite":
+            store = SQLiteEmbeddingStore(legacy_path)
+        else:
+            store = _shared_memmap_store(os.getenv("EMBEDDING_STORE_DIR", DEFAULT_STORE_DIR), legacy_path)
+    max_items = int(os.getenv("EMBEDDING_CACHE_SIZE", DEFAULT_MEMORY_ITEMS))
+    return CachedEmbeddings(underlying, key_model, store=store, max_memory_items=max_items)
+
+
+_stores: Dict[str, MemmapEmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+
+def _shared_memmap_store(store_dir: str, legacy_path: str) -> MemmapEmbeddingStore:
+    """One store per directory and process; a new store first takes over the old SQLite cache."""
+    with _stores_lock:
+        store = _stores.get(store_dir)
+        if store is None:
+            store = MemmapEmbeddingStore(store_dir)
+            if len(store) == 0 and os.path.exists(legacy_path):
+                print(f"Embedding store: imported {store.import_sqlite(legacy_path)} vectors from {legacy_path}")
+            _stores[store_dir] = store
+        return store
@@ -0,0 +1,215 @@
+"""
+Batched, concurrent, resumable embedding for index builds.
+
+FAISS.from_documents embeds every child in one call: a rate limit or network
+error late in the run throws away everything embedded so far. EmbeddingPipeline
+instead:
+
+- splits texts into batches of at most `max_batch_tokens` (estimated) / `max_batch_size` texts
+- runs up to `concurrency` batches at once; 429 / 5xx / connection errors are
+  retried with exponential backoff, and a 429 (honouring Retry-After) pauses
+  every worker, not just the one that hit it
+- writes each finished batch to `checkpoint_dir` as batch-<sha256>.npy, named by
+  the model and the batch's texts, so a re-run skips batches already embedded;
+  the checkpoints are removed once the whole run succeeds
+
+Wrapping a CachedEmbeddings (core.embedding_cache) also puts every vector in the
+shared embedding store; the checkpoints cover EMBEDDING_CACHE=0 builds too.
+"""
+import os
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from core.text_utils import estimate_tokens
+
+# Config (env overridable)
+DEFAULT_CHECKPOINT_DIR = os.path.join("index", "embedding_checkpoints")
+DEFAULT_BATCH_TOKENS = 20000      # well below the 300k tokens / request API limit
+DEFAULT_BATCH_SIZE = 256          # texts per request (API limit: 2048)
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 8
+
+# HTTP statuses worth retrying; anything else (400, 401, ...) fails the run at once
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+def token_batches(texts: List[str], max_tokens: int = DEFAULT_BATCH_TOKENS, max_size: int = DEFAULT_BATCH_SIZE,
+                  count_tokens: Callable[[str], int] = estimate_tokens) -> List[List[int]]:
+    """Consecutive index ranges of texts, each within the token and size budgets (an oversized text goes alone)."""
+    batches, current, tokens = [], [], 0
+    for i, text in enumerate(texts):
+        n = count_tokens(text)
+        if current and (tokens + n > max_tokens or len(current) >= max_size):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(i)
+        tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _status(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Rate limits, server errors and connection / timeout errors (no HTTP status)."""
+    status = _status(exc)
+    if status is None:
+        name = type(exc).__name__
+        return isinstance(exc, (ConnectionError, TimeoutError)) or "Connection" in name or "Timeout" in name
+    return status in RETRYABLE_STATUS
+
+
+class EmbeddingPipeline:
+
+    def __init__(self, embeddings: Embeddings, model_name: Optional[str] = None,
+                 checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR,
+                 max_batch_tokens: int = DEFAULT_BATCH_TOKENS, max_batch_size: int = DEFAULT_BATCH_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY, max_retries: int = DEFAULT_MAX_RETRIES,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(embeddings, "model_name", None) or getattr(embeddings, "model", "")
+        self.checkpoint_dir = checkpoint_dir
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._stats: Dict[str, float] = {}
+
+    @classmethod
+    def from_env(cls, embeddings: Embeddings, model_name: Optional[str] = None) -> "EmbeddingPipeline":
+        """EMBED_BATCH_TOKENS / EMBED_BATCH_SIZE / EMBED_CONCURRENCY / EMBED_MAX_RETRIES / EMBED_CHECKPOINT_DIR"""
+        return cls(
+            embeddings, model_name,
+            checkpoint_dir=os.getenv("EMBED_CHECKPOINT_DIR", DEFAULT_CHECKPOINT_DIR),
+            max_batch_tokens=int(os.getenv("EMBED_BATCH_TOKENS", DEFAULT_BATCH_TOKENS)),
+            max_batch_size=int(os.getenv("EMBED_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+            concurrency=int(os.getenv("EMBED_CONCURRENCY", DEFAULT_CONCURRENCY)),
+            max_retries=int(os.getenv("EMBED_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+        )
+
+    def _checkpoint_path(self, texts: List[str]) -> str:
+        digest = hashlib.sha256("\n\x00".join([self.model_name] + texts).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.checkpoint_dir, f"batch-{digest}.npy")
+
+    def _count(self, name: str, n: float = 1):
+        with self._lock:
+            self._stats[name] = self._stats.get(name, 0) + n
+
+    def _wait_for_pause(self):
+        while True:
+            with self._lock:
+                delay = self._paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_pause()
+            try:
+                return np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            except Exception as exc:
+                if attempt == self.max_retries or not is_retryable(exc):
+                    raise
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt) * (0.5 + random.random() / 2)
+                self._count("retries")
+                if _status(exc) == 429:
+                    delay = max(delay, _retry_after(exc) or 0.0)
+                    self._count("rate_limited")
+                    # Every worker holds off: the limit is per account, not per connection
+                    with self._lock:
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                else:
+                    time.sleep(delay)
+
+    def _run_batch(self, texts: List[str]) -> np.ndarray:
+        path = self._checkpoint_path(texts)
+        if os.path.exists(path):
+            try:
+                vectors = np.load(path)
+                if len(vectors) == len(texts):
+                    self._count("resumed_batches")
+                    return vectors
+            except (OSError, ValueError):
+                pass  # torn checkpoint: embed again
+        vectors = self._embed_batch(texts)
+        if len(vectors) != len(texts):
+            raise ValueError(f"embedding batch returned {len(vectors)} vectors for {len(texts)} texts")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.save(f, vectors)
+        os.replace(tmp, path)
+        self._count("embedded_batches")
+        self._count("embedded_texts", len(texts))
+        self._count("embedded_tokens", sum(estimate_tokens(t) for t in texts))
+        return vectors
+
+    def embed(self, texts: List[str], keep_checkpoints: bool = False) -> np.ndarray:
+        """float32 [len(texts), dim] in input order; resumes from checkpoints of an interrupted run."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        batches = token_batches(texts, self.max_batch_tokens, self.max_batch_size)
+        self._stats = {"texts": len(texts), "batches": len(batches)}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed") as pool:
+            futures = [pool.submit(self._run_batch, [texts[i] for i in batch]) for batch in batches]
+            try:
+                parts = [f.result() for f in futures]
+            except BaseException:
+                for f in futures:
+                    f.cancel()
+                raise
+
+        self._stats["seconds"] = time.perf_counter() - start
+        if not keep_checkpoints:
+            for batch in batches:
+                path = self._checkpoint_path([texts[i] for i in batch])
+                if os.path.exists(path):
+                    os.remove(path)
+            if not os.listdir(self.checkpoint_dir):
+                os.rmdir(self.checkpoint_dir)
+        return np.concatenate(parts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings-style entry point (e.g. for core.index_update)."""
+        return self.embed(texts).tolist()
+
+    def stats(self) -> Dict[str, float]:
+        """Counts for the last embed() call; throughput only counts texts actually sent to the model."""
+        with self._lock:
+            stats = dict(self._stats)
+        seconds = stats.get("seconds") or 0.0
+        for key in ("retries", "rate_limited", "resumed_batches", "embedded_batches", "embedded_texts",
+                    "embedded_tokens"):
+            stats.setdefault(key, 0)
+        stats["seconds"] = round(seconds, 2)
+        stats["texts_per_s"] = round(stats["embedded_texts"] / seconds, 1) if seconds else 0.0
+        stats["tokens_per_s"] = round(stats["embedded_tokens"] / seconds, 1) if seconds else 0.0
+        return stats
@@ -0,0 +1,110 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from core.embedding_cache import CachedEmbeddings, cached_embeddings
+
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Local model location (relative to the repo root, like the reranker)
+LOCAL_EMBEDDING_HF_NAME = "BAAI/bge-small-zh-v1.5"
+LOCAL_EMBEDDING_DIR = os.path.join("models", "bge-small-zh-v1.5")
+# bge-zh retrieval instruction: prefixed to queries only, not to indexed passages
+BGE_QUERY_INSTRUCTION = "为这个句子生成表示以用于检索相关文章："
+
+PROVIDERS = ("openai", "local")
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    sentence-transformers Chinese embedding model on CPU: no network round trip per query.
+    Documents are encoded in batches of `batch_size`; torch spreads each batch over
+    EMBEDDING_LOCAL_THREADS intra-op threads. Vectors are L2-normalized.
+    """
+
+    def __init__(self, model_dir: str = LOCAL_EMBEDDING_DIR, batch_size: int = 32,
+                 query_instruction: str = BGE_QUERY_INSTRUCTION):
+        try:
+            from sentence_transformers import SentenceTransformer
+            import torch
+        except ImportError as e:
+            raise ImportError(
+                "Local embedding provider needs `sentence-transformers` (pip install sentence-transformers)"
+            ) from e
+
+        threads = os.getenv("EMBEDDING_LOCAL_THREADS")
+        if threads:
+            torch.set_num_threads(int(threads))
+
+        model_name_or_path = LOCAL_EMBEDDING_HF_NAME
+        if os.path.exists(model_dir):
+            print(f"Loading local embedding model from: {model_dir}")
+            model_name_or_path = model_dir
+        else:
+            print(f"Local model not found at {model_dir}, downloading/loading from HuggingFace...")
+
+        self.model = SentenceTransformer(model_name_or_path, device="cpu")
+        self.model_name = os.path.basename(model_name_or_path.rstrip('/'))
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+        self.batch_size = batch_size
+        self.query_instruction = query_instruction
+        # One encode at a time: concurrent calls would only compete for the same cores
+        self._lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            vectors = self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                        convert_to_numpy=True, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([self.query_instruction + text])[0]
+
+
+def provider_spec(embeddings: Embeddings, provider: str) -> Dict:
+    """Manifest fields identifying the vector space an index was built in."""
+    model = getattr(embeddings, "model_name", None) or getattr(embeddings, "model", "")
+    return {"embedding_provider": provider, "embedding_model": model}
+
+
+def load_embeddings(provider: Optional[str] = None) -> Tuple[CachedEmbeddings, Dict]:
+    """
+    Builds the (cached) embedding provider selected by EMBEDDING_PROVIDER:
+    - openai (default): text-embedding-3-small over the API
+    - local: sentence-transformers model from models/ (LOCAL_EMBEDDING_DIR)
+    Returns the embeddings and their manifest spec (see check_index_embeddings).
+    """
+    provider = (provider or os.getenv("EMBEDDING_PROVIDER", "openai")).lower()
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings  # ~1 s import, only this provider needs it
+        underlying = OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL)
+    elif provider == "local":
+        underlying = LocalEmbeddings(os.getenv("EMBEDDING_LOCAL_DIR", LOCAL_EMBEDDING_DIR))
+    else:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{provider}', expected one of {PROVIDERS}")
+    spec = provider_spec(underlying, provider)
+    # Cache keys are per model: switching provider never returns the other model's vectors
+    return cached_embeddings(underlying, spec["embedding_model"]), spec
+
+
+def check_index_embeddings(manifest: Dict, spec: Dict):
+    """
+    Raises ValueError if the index was built with another embedding model: its
+    vectors would be searched with query vectors from a different space.
+    Indexes built before providers existed record only the (OpenAI) model name.
+    """
+    built_model = manifest.get("embedding_model")
+    if not built_model:
+        return
+    built_provider = manifest.get("embedding_provider", "openai")
+    if (built_provider, built_model) != (spec["embedding_provider"], spec["embedding_model"]):
+        raise ValueError(
+            f"Index was built with {built_provider}:{built_model} embeddings, but EMBEDDING_PROVIDER gives "
+            f"{spec['embedding_provider']}:{spec['embedding_model']}; set EMBEDDING_PROVIDER={built_provider} "
+            f"or rebuild the index (scripts/build_index_v2.py)"
+        )
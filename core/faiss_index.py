@@ -0,0 +1,213 @@
+"""
+FAISS index types for the child vector store (FAISS_INDEX_TYPE).
+
+LangChain's FAISS.from_documents always builds an exact IndexFlatL2. For
+larger corpora the builder can swap that for an approximate index over the
+same vectors (same row order, so the docstore mapping is unchanged):
+
+    flat       exact search, baseline
+    hnsw       IndexHNSWFlat: graph search, no training, efSearch trades recall for latency
+    ivf_flat   IndexIVFFlat: k-means coarse quantizer (trained), nprobe lists scanned
+    ivf_pq     IndexIVFPQ: IVF + product-quantized codes, far less memory, lossy distances
+
+All use squared L2 like the flat index, so distance thresholds (adaptive pool,
+fusion) keep their meaning. The resolved parameters are written next to the
+index as faiss_params.json; search-time knobs (nprobe, efSearch) are applied
+again on load and can be overridden with FAISS_NPROBE / FAISS_EF_SEARCH.
+"""
+import os
+import json
+import math
+from typing import Dict, Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+PARAMS_FILE = "faiss_params.json"
+
+DEFAULT_PARAMS = {
+    "hnsw_m": 32,              # graph neighbours per node
+    "ef_construction": 200,
+    "ef_search": 64,
+    "nlist": None,             # IVF lists; None: 4 * sqrt(n)
+    "nprobe": 16,
+    "pq_m": 48,                # PQ sub-quantizers (must divide the dimension)
+    "pq_nbits": 8,
+    "pq_refine": 0,            # >0: re-rank pq_refine * k PQ hits with exact distances (keeps full vectors)
+}
+
+# Clustering wants ~39 training points per centroid (faiss warns below that)
+_MIN_POINTS_PER_CENTROID = 39
+
+
+def params_from_env(index_type: Optional[str] = None) -> Dict:
+    """Index type + parameters from FAISS_* env vars (unset ones keep DEFAULT_PARAMS)."""
+    params = dict(DEFAULT_PARAMS)
+    params["index_type"] = (index_type or os.getenv("FAISS_INDEX_TYPE", "flat")).lower()
+    for key, env in (("hnsw_m", "FAISS_HNSW_M"), ("ef_construction", "FAISS_EF_CONSTRUCTION"),
+                     ("ef_search", "FAISS_EF_SEARCH"), ("nlist", "FAISS_NLIST"),
+                     ("nprobe", "FAISS_NPROBE"), ("pq_m", "FAISS_PQ_M"), ("pq_nbits", "FAISS_PQ_NBITS"),
+                     ("pq_refine", "FAISS_PQ_REFINE")):
+        if os.getenv(env):
+            params[key] = int(os.getenv(env))
+    return params
+
+
+def resolve_params(params: Dict, n: int, dim: int) -> Dict:
+    """Fills in / clamps size-dependent parameters for n vectors of dimension dim."""
+    params = dict(params)
+    index_type = params.get("index_type", "flat")
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{index_type}' (expected one of {INDEX_TYPES})")
+
+    if index_type.startswith("ivf"):
+        nlist = params.get("nlist") or int(4 * math.sqrt(n))
+        params["nlist"] = max(1, min(nlist, n // _MIN_POINTS_PER_CENTROID))
+        params["nprobe"] = min(params["nprobe"], params["nlist"])
+    if index_type == "ivf_pq":
+        if dim % params["pq_m"]:
+            raise ValueError(f"pq_m={params['pq_m']} must divide the embedding dimension {dim}")
+        # Each sub-quantizer trains 2^nbits centroids on the n vectors
+        params["pq_nbits"] = max(1, min(params["pq_nbits"], int(math.log2(max(n // _MIN_POINTS_PER_CENTROID, 2)))))
+    params["dim"] = dim
+    params["ntotal"] = n
+    return params
+
+
+def build_index(vectors: np.ndarray, params: Dict, ids: Optional[np.ndarray] = None) -> faiss.Index:
+    """
+    Builds (and trains, for IVF) an index of the given type over vectors (n x dim, float32).
+    With `ids` the index is id-mapped: search returns these labels and remove_ids / add_with_ids
+    take them (IVF stores ids natively, other types are wrapped in IndexIDMap2).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index_type, dim = params["index_type"], vectors.shape[1]
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["hnsw_m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+    else:
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, params["nlist"])
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["pq_m"], params["pq_nbits"])
+            if params.get("pq_refine"):
+                index = faiss.IndexRefineFlat(index)
+        index.train(vectors)
+    if ids is None:
+        index.add(vectors)
+    else:
+        if not isinstance(index, faiss.IndexIVF):
+            index = faiss.IndexIDMap2(index)
+        index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    configure_search(index, params)
+    return index
+
+
+def _base_index(index: faiss.Index) -> faiss.Index:
+    """The index inside an IndexIDMap2 wrapper (or the index itself)."""
+    return faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+
+
+def configure_search(index: faiss.Index, params: Dict):
+    """Applies the search-time knobs (nprobe for IVF, efSearch for HNSW)."""
+    index_type, base = params.get("index_type", "flat"), _base_index(index)
+    if index_type.startswith("ivf"):
+        faiss.extract_index_ivf(base).nprobe = params["nprobe"]
+        if isinstance(base, faiss.IndexRefine):
+            base.k_factor = params["pq_refine"]
+    elif index_type == "hnsw":
+        base.hnsw.efSearch = params["ef_search"]
+
+
+def rebuild_vector_store(vector_store, params: Dict) -> Dict:
+    """
+    Replaces a LangChain FAISS store's flat index with the configured type,
+    rebuilt from its own vectors (row order, and so the docstore mapping, is kept).
+    Returns the resolved parameters.
+    """
+    flat = vector_store.index
+    params = resolve_params(params, flat.ntotal, flat.d)
+    if params["index_type"] != "flat":
+        vector_store.index = build_index(flat.reconstruct_n(0, flat.ntotal), params)
+    return params
+
+
+def index_ids(index: faiss.Index) -> np.ndarray:
+    """Labels stored in an id-mapped index (see as_id_mapped)."""
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map)
+    # IVF keeps the labels in its inverted lists
+    invlists = faiss.extract_index_ivf(index).invlists
+    return np.concatenate([np.zeros(0, dtype=np.int64)] + [
+        faiss.rev_swig_ptr(invlists.get_ids(i), invlists.list_size(i)).copy() for i in range(invlists.nlist)
+    ])
+
+
+def _vectors_and_ids(index: faiss.Index, row_ids: Optional[np.ndarray] = None):
+    """All stored vectors with their labels; row_ids gives the labels of a row-addressed index."""
+    if row_ids is not None:
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None and not isinstance(index, faiss.IndexRefine):
+            ivf.make_direct_map()
+        return index.reconstruct_n(0, index.ntotal), np.asarray(row_ids, dtype=np.int64)
+    ids = index_ids(index)
+    if isinstance(index, faiss.IndexIDMap):
+        return _base_index(index).reconstruct_n(0, index.ntotal), ids
+    ivf = faiss.extract_index_ivf(index)
+    ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return ivf.reconstruct_batch(ids), ids
+
+
+def as_id_mapped(index: faiss.Index, params: Dict, row_ids: np.ndarray) -> faiss.Index:
+    """
+    Rebuilds a row-addressed index (as written by a full build) id-mapped with
+    row_ids[row] as labels, from its own vectors. Already id-mapped indexes are returned as is.
+    """
+    if params.get("id_mapped"):
+        return index
+    vectors, ids = _vectors_and_ids(index, row_ids)
+    params["id_mapped"] = True
+    return build_index(vectors, params, ids)
+
+
+def update_index(index: faiss.Index, params: Dict, remove_ids, add_vectors: np.ndarray, add_ids) -> faiss.Index:
+    """
+    Removes / adds vectors by label on an id-mapped index (see as_id_mapped).
+    Index types without remove support (HNSW, refined IVF-PQ) are rebuilt from
+    their remaining vectors, no re-embedding. Returns the updated index.
+    """
+    remove_ids = np.asarray(remove_ids, dtype=np.int64)
+    add_ids = np.asarray(add_ids, dtype=np.int64)
+    if len(remove_ids):
+        try:
+            index.remove_ids(remove_ids)
+        except RuntimeError:
+            vectors, ids = _vectors_and_ids(index)
+            keep = ~np.isin(ids, remove_ids)
+            index = build_index(vectors[keep], params, ids[keep])
+    if len(add_ids):
+        index.add_with_ids(np.ascontiguousarray(add_vectors, dtype=np.float32), add_ids)
+    return index
+
+
+def save_params(index_dir: str, params: Dict):
+    with open(os.path.join(index_dir, PARAMS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(params, f, indent=2)
+
+
+def load_params(index_dir: str) -> Dict:
+    """Persisted parameters with FAISS_NPROBE / FAISS_EF_SEARCH overrides; flat for older indexes."""
+    path = os.path.join(index_dir, PARAMS_FILE)
+    params = {"index_type": "flat"}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+    for key, env in (("nprobe", "FAISS_NPROBE"), ("ef_search", "FAISS_EF_SEARCH")):
+        if os.getenv(env):
+            params[key] = int(os.getenv(env))
+    return params
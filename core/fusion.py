@@ -0,0 +1,78 @@
+import os
+import math
+from typing import Dict, List
+
+# Reciprocal rank fusion constant (Cormack et al. use 60)
+RRF_K = int(os.getenv("FUSION_RRF_K", "60"))
+VECTOR_WEIGHT = float(os.getenv("FUSION_VECTOR_WEIGHT", "1.0"))
+KEYWORD_WEIGHT = float(os.getenv("FUSION_KEYWORD_WEIGHT", "1.0"))
+# Weight of the min-max normalized raw scores (FAISS distance, FTS5 bm25) on top of RRF
+SCORE_WEIGHT = float(os.getenv("FUSION_SCORE_WEIGHT", "0.5"))
+# Parents passed on to the reranker
+SHORTLIST = int(os.getenv("FUSION_SHORTLIST", "12"))
+
+
+def _best_per_parent(hits: List[Dict]) -> Dict[str, float]:
+    """Best (lowest) score per parent, in rank order. Both legs are 'lower is better'."""
+    best: Dict[str, float] = {}
+    for hit in hits:
+        pid = hit.get('parent_id')
+        if pid and (pid not in best or hit['score'] < best[pid]):
+            best[pid] = hit['score']
+    return best
+
+
+def _normalized_relevance(best: Dict[str, float]) -> Dict[str, float]:
+    """Maps 'lower is better' scores to 0..1 relevance (1 = best hit of this leg)."""
+    if not best:
+        return {}
+    lo, hi = min(best.values()), max(best.values())
+    if hi == lo:
+        return {pid: 1.0 for pid in best}
+    return {pid: (hi - score) / (hi - lo) for pid, score in best.items()}
+
+
+def fuse_parent_scores(vector_hits: List[Dict], keyword_hits: List[Dict],
+                       vector_weight: float = None, keyword_weight: float = None,
+                       score_weight: float = None, rrf_k: int = None) -> Dict[str, float]:
+    """
+    Fuses the two child-hit lists into one score per parent:
+
+        w_leg / (rrf_k + rank_leg) + score_weight * w_leg * relevance_leg
+
+    summed over the legs that found the parent. rank_leg is the parent's
+    1-based rank in that leg (by its best child); relevance_leg is the
+    min-max normalized FAISS distance / FTS5 bm25 of that child.
+    """
+    vector_weight = VECTOR_WEIGHT if vector_weight is None else vector_weight
+    keyword_weight = KEYWORD_WEIGHT if keyword_weight is None else keyword_weight
+    score_weight = SCORE_WEIGHT if score_weight is None else score_weight
+    rrf_k = RRF_K if rrf_k is None else rrf_k
+
+    fused: Dict[str, float] = {}
+    for hits, weight in ((vector_hits, vector_weight), (keyword_hits, keyword_weight)):
+        best = _best_per_parent(hits)
+        relevance = _normalized_relevance(best)
+        ranked = sorted(best, key=best.get)
+        for rank, pid in enumerate(ranked, start=1):
+            rrf = weight / (rrf_k + rank)
+            # Scale the score term to RRF's range so score_weight=1 means "as much as rank 1"
+            score_term = score_weight * weight * relevance[pid] / (rrf_k + 1)
+            fused[pid] = fused.get(pid, 0.0) + rrf + score_term
+    return fused
+
+
+def rank_parents(fused: Dict[str, float]) -> List[str]:
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+def shortlist_size(pool_size: int, default_pool: int, shortlist: int = None) -> int:
+    """
+    Parents passed on for a planned pool of `pool_size`: the shortlist, never
+    more than the pool. A pool widened past `default_pool` (adaptive "widen")
+    scales the shortlist by the same factor, so widening still reaches rerank.
+    """
+    shortlist = SHORTLIST if shortlist is None else shortlist
+    if pool_size > default_pool:
+        shortlist = math.ceil(shortlist * pool_size / default_pool)
+    return min(pool_size, shortlist)
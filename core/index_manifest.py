@@ -0,0 +1,72 @@
+import os
+import json
+import uuid
+import hashlib
+from datetime import datetime
+from typing import Dict, List
+
+MANIFEST_FILE = "manifest.json"
+
+
+def manifest_path(index_dir: str) -> str:
+    return os.path.join(index_dir, MANIFEST_FILE)
+
+
+def load_manifest(index_dir: str) -> Dict:
+    """Returns the index manifest, or {} for indexes built before manifests existed."""
+    path = manifest_path(index_dir)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(index_dir: str, updates: Dict) -> Dict:
+    """
+    Merges `updates` into the manifest and stamps a fresh build_id.
+    Anything keyed on the index (rerank/answer caches) treats a new build_id as invalidation.
+    """
+    manifest = load_manifest(index_dir)
+    manifest.update(updates)
+    manifest["build_id"] = uuid.uuid4().hex
+    manifest["built_at"] = datetime.now().isoformat(timespec="seconds")
+
+    os.makedirs(index_dir, exist_ok=True)
+    tmp_path = manifest_path(index_dir) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path(index_dir))
+    return manifest
+
+
+def index_fingerprint(index_dir: str, fallback_paths: List[str] = None) -> str:
+    """
+    Identifies the current index build: the manifest build_id, or for older
+    indexes a hash of the size/mtime of the given index files.
+    """
+    build_id = load_manifest(index_dir).get("build_id")
+    if build_id:
+        return build_id
+
+    h = hashlib.sha256()
+    for path in fallback_paths or []:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, name) for name in os.listdir(path))
+        else:
+            files = [path]
+        for file_path in files:
+            if os.path.exists(file_path):
+                st = os.stat(file_path)
+                h.update(f"{file_path}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def cache_fingerprint(index_dir: str, fallback_paths: List[str] = None) -> str:
+    """
+    Namespace for caches keyed on parent ids. With content-hash ids
+    (core.content_ids) an id always names the same text, so such caches stay
+    valid across builds; otherwise this is the index_fingerprint.
+    """
+    if load_manifest(index_dir).get("content_ids"):
+        return "content-ids"
+    return index_fingerprint(index_dir, fallback_paths)
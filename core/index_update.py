@@ -0,0 +1,173 @@
+"""
+Incremental index updates (build_index_v2.py --incremental).
+
+Parents and children carry content ids (core.content_ids), so a new
+parents.jsonl / children.jsonl is diffed against the current index by id
+instead of rebuilding it:
+
+- SQLite v3: removed children are deleted (FTS rows included), new parents,
+  sections and children are inserted with fresh integer ids. Child ids are
+  never reused (high-water mark in index_state): a process still serving the
+  old native store then finds no text for a deleted child instead of the
+  text of an unrelated new one
+- native vector store: only new children are embedded; vectors are removed
+  and added by children.id on an id-mapped FAISS index (core.faiss_index)
+
+Unchanged children keep their rows, ids and vectors.
+"""
+import os
+import time
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+import faiss
+import numpy as np
+
+from core.cjk_tokenize import index_text
+from core.content_ids import child_ids
+from core.faiss_index import as_id_mapped, update_index as update_faiss, index_ids, configure_search, load_params
+from core.sqlite_schema import SCHEMA_VERSION, schema_version, section_key, clean_chapter_name
+from core.vector_store import write_native_store, NATIVE_INDEX_DIR, INDEX_FILE
+
+
+def current_children(conn: sqlite3.Connection) -> Dict[str, Tuple[int, str]]:
+    """{child content id: (children.id, content)} for the children in a v3 DB."""
+    rows = conn.execute(
+        "SELECT c.id, p.uid, c.content FROM children c JOIN parents p ON p.id = c.parent_id ORDER BY c.id"
+    ).fetchall()
+    uids = child_ids([{"parent_id": uid, "content": content} for _, uid, content in rows])
+    return {uid: (cid, content) for uid, (cid, _, content) in zip(uids, rows)}
+
+
+def plan_update(conn: sqlite3.Connection, parents: List[Dict], children: List[Dict]) -> Dict:
+    """What changes between the indexed corpus and parents / children (jsonl rows)."""
+    old_parents = {uid for uid, in conn.execute("SELECT uid FROM parents")}
+    new_parents = {p['parent_id'] for p in parents}
+    old_children = current_children(conn)
+    new_children = dict(zip(child_ids(children), children))
+    return {
+        "add_parents": [p for p in parents if p['parent_id'] not in old_parents],
+        "remove_parents": sorted(old_parents - new_parents),
+        "add_children": [(uid, c) for uid, c in new_children.items() if uid not in old_children],
+        "remove_children": [row for uid, row in old_children.items() if uid not in new_children],
+        "kept_children": len(old_children.keys() & new_children.keys()),
+    }
+
+
+def next_child_id(conn: sqlite3.Connection) -> int:
+    """First children.id never handed out in this DB (deleted ids included)."""
+    conn.execute("CREATE TABLE IF NOT EXISTS index_state (key TEXT PRIMARY KEY, value INTEGER)")
+    row = conn.execute("SELECT value FROM index_state WHERE key = 'child_id_high_water'").fetchone()
+    current = conn.execute("SELECT COALESCE(MAX(id), 0) FROM children").fetchone()[0]
+    return max(row[0] if row else 0, current) + 1
+
+
+def apply_sqlite(conn: sqlite3.Connection, plan: Dict) -> List[int]:
+    """Applies the plan to a v3 DB; returns the children.id assigned to each of plan['add_children']."""
+    # Before the deletes: a DB without a recorded high-water mark still falls back to its current MAX(id)
+    next_child = next_child_id(conn)
+    # Contentless FTS5: a delete must repeat the indexed tokens
+    conn.executemany(
+        "INSERT INTO children_fts(children_fts, rowid, content_tokens) VALUES ('delete', ?, ?)",
+        [(cid, index_text(content)) for cid, content in plan["remove_children"]]
+    )
+    conn.executemany("DELETE FROM children WHERE id = ?", [(cid,) for cid, _ in plan["remove_children"]])
+    conn.executemany("DELETE FROM parents WHERE uid = ?", [(uid,) for uid in plan["remove_parents"]])
+
+    sections = {
+        tuple(row[1:]): row[0] for row in conn.execute(
+            "SELECT id, book, chapter, section, figure_ref, chunk_type, exam_priority FROM sections"
+        )
+    }
+    next_section = conn.execute("SELECT COALESCE(MAX(id), 0) FROM sections").fetchone()[0] + 1
+    next_parent = conn.execute("SELECT COALESCE(MAX(id), 0) FROM parents").fetchone()[0] + 1
+    for p in plan["add_parents"]:
+        key = section_key(p['metadata'])
+        if key not in sections:
+            conn.execute(
+                "INSERT INTO sections (id, book, chapter, chapter_clean, section, figure_ref, chunk_type, exam_priority) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (next_section, key[0], key[1], clean_chapter_name(key[1]), *key[2:])
+            )
+            sections[key] = next_section
+            next_section += 1
+        conn.execute("INSERT INTO parents VALUES (?, ?, ?, ?, ?)",
+                     (next_parent, p['parent_id'], sections[key], p['metadata'].get('split_part'), p['content']))
+        next_parent += 1
+
+    parent_rows = {uid: pid for pid, uid in conn.execute("SELECT id, uid FROM parents")}
+    new_ids, rows = [], []
+    for _, c in plan["add_children"]:
+        if c['parent_id'] not in parent_rows:
+            new_ids.append(None)  # child of an unknown parent: not indexed (as in a full build)
+            continue
+        new_ids.append(next_child)
+        rows.append((next_child, parent_rows[c['parent_id']], c['content']))
+        next_child += 1
+    conn.executemany("INSERT INTO children VALUES (?, ?, ?)", rows)
+    conn.executemany("INSERT INTO children_fts (rowid, content_tokens) VALUES (?, ?)",
+                     [(cid, index_text(content)) for cid, _, content in rows])
+    conn.execute("INSERT OR REPLACE INTO index_state VALUES ('child_id_high_water', ?)", (next_child - 1,))
+    conn.execute("DELETE FROM sections WHERE id NOT IN (SELECT section_id FROM parents)")
+    return new_ids
+
+
+def native_maps_from_db(conn: sqlite3.Connection) -> Tuple[np.ndarray, List[str]]:
+    """(child_parent, parent_ids) for the native store, from the v3 DB's current rows."""
+    parent_ids, parent_rows = [], {}
+    for pid, uid in conn.execute("SELECT id, uid FROM parents ORDER BY id"):
+        parent_rows[pid] = len(parent_ids)
+        parent_ids.append(uid)
+    rows = conn.execute("SELECT id, parent_id FROM children").fetchall()
+    child_parent = np.full(max([cid for cid, _ in rows] + [0]) + 1, -1, dtype=np.int32)
+    for cid, pid in rows:
+        child_parent[cid] = parent_rows[pid]
+    return child_parent, parent_ids
+
+
+def update_index(parents: List[Dict], children: List[Dict], embed_documents: Callable[[List[str]], List[List[float]]],
+                 db_path: str, native_dir: str = NATIVE_INDEX_DIR) -> Dict:
+    """
+    Brings the v3 DB and the native vector store in line with parents / children.
+    embed_documents is only called for new children. Returns counts and timings.
+    """
+    start = time.perf_counter()
+    index_path = os.path.join(native_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(f"{index_path} not found; run a full build (or convert_faiss_native.py) first")
+    conn = sqlite3.connect(db_path)
+    try:
+        if schema_version(conn) < SCHEMA_VERSION:
+            raise ValueError(f"{db_path} is not a v3 index; run a full build (or migrate_sqlite_v3.py) first")
+        plan = plan_update(conn, parents, children)
+
+        new_ids = apply_sqlite(conn, plan)
+        added = [(cid, c['content']) for cid, (_, c) in zip(new_ids, plan["add_children"]) if cid is not None]
+        t_embed = time.perf_counter()
+        vectors = np.array(embed_documents([content for _, content in added]), dtype=np.float32) if added else None
+        embed_s = time.perf_counter() - t_embed
+
+        params = load_params(native_dir)
+        index = as_id_mapped(faiss.read_index(index_path), params, np.load(os.path.join(native_dir, "row_child.npy")))
+        index = update_faiss(index, params, [cid for cid, _ in plan["remove_children"]],
+                             vectors, [cid for cid, _ in added])
+        configure_search(index, params)
+
+        # Commit only once the vectors are in hand: a failed embedding call leaves the DB untouched
+        conn.commit()
+        child_parent, parent_ids = native_maps_from_db(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    write_native_store(index, index_ids(index), child_parent, parent_ids, native_dir, params)
+
+    return {
+        "added_parents": len(plan["add_parents"]),
+        "removed_parents": len(plan["remove_parents"]),
+        "added_children": len(added),
+        "removed_children": len(plan["remove_children"]),
+        "kept_children": plan["kept_children"],
+        "embed_s": round(embed_s, 2),
+        "total_s": round(time.perf_counter() - start, 2),
+    }
@@ -0,0 +1,103 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+DEFAULT_LLM_CACHE_PATH = os.path.join("index", "llm_cache.db")
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Persistent LangChain LLM cache for offline reruns (evaluation, question generation).
+
+    Keyed by (llm_string, prompt): LangChain renders llm_string from the model
+    name and generation parameters (temperature, stop, ...) and prompt from the
+    final messages, so any change to the model, a parameter or the rendered
+    prompt is a miss and calls the API. Stored per hash of each, so keys stay
+    small whatever the context length.
+
+    Consulted by invoke / batch only: LangChain's stream / astream always call
+    the API (FundRAG switches to ainvoke while this cache is enabled).
+    """
+
+    def __init__(self, path: str = DEFAULT_LLM_CACHE_PATH):
+        self.path = path
+        db_dir = os.path.dirname(path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                llm_hash TEXT,
+                prompt_hash TEXT,
+                generations TEXT,
+                created REAL,
+                PRIMARY KEY (llm_hash, prompt_hash)
+            )
+        """)
+        self._conn.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations FROM llm_responses WHERE llm_hash = ? AND prompt_hash = ?",
+                (_sha256(llm_string), _sha256(prompt))
+            ).fetchone()
+            self._stats["hits" if row else "misses"] += 1
+        return loads(row[0], allowed_objects="core") if row else None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        generations = dumps(list(return_val))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?)",
+                (_sha256(llm_string), _sha256(prompt), generations, time.time())
+            )
+            self._conn.commit()
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self._conn.execute("SELECT count(*) FROM llm_responses").fetchone()[0]
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[SQLiteLLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def llm_response_cache() -> Optional[SQLiteLLMCache]:
+    """
+    Process-wide cache when LLM_CACHE=1 (for batch jobs; interactive use keeps
+    live, streamed answers). LLM_CACHE_PATH sets the SQLite file.
+    """
+    global _cache
+    if os.getenv("LLM_CACHE", "0") != "1":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SQLiteLLMCache(os.getenv("LLM_CACHE_PATH") or DEFAULT_LLM_CACHE_PATH)
+        return _cache
@@ -0,0 +1,43 @@
+import os
+from typing import Dict
+
+
+def chat_llm_kwargs(temperature: float = 0.0, verbose: bool = False) -> Dict:
+    """
+    Shared ChatOpenAI(model_name=..., **kwargs) settings: temperature, the
+    EFundGPT base URL / key / headers (EFUNDS_*; embeddings stay on OpenAI)
+    and, for deterministic (temperature 0) calls with LLM_CACHE=1, the
+    persistent response cache (core.llm_cache). Sampled calls are never
+    cached, a rerun should draw new outputs.
+    """
+    kwargs: Dict = {"temperature": temperature}
+
+    efund_base = os.getenv("EFUNDS_API_BASE")
+    if efund_base:
+        if verbose:
+            print(f"Using EFundGPT API Base: {efund_base}")
+        kwargs["base_url"] = efund_base
+    if os.getenv("EFUNDS_API_KEY"):
+        kwargs["api_key"] = os.getenv("EFUNDS_API_KEY")
+
+    # Headers for EFundGPT
+    extra_headers = {}
+    if os.getenv("EFUNDS_USER_NAME"):
+        extra_headers["Efunds-User-Name"] = os.getenv("EFUNDS_USER_NAME")
+    if os.getenv("EFUNDS_ACC_TOKEN"):
+        extra_headers["Efunds-Acc-Token"] = os.getenv("EFUNDS_ACC_TOKEN")
+    if os.getenv("EFUNDS_SOURCE"):
+        extra_headers["Efunds-Source"] = os.getenv("EFUNDS_SOURCE")
+    if extra_headers:
+        if verbose:
+            print("Injecting EFundGPT headers...")
+        kwargs["model_kwargs"] = {"extra_headers": extra_headers}
+
+    if temperature == 0.0:
+        from core.llm_cache import llm_response_cache
+        cache = llm_response_cache()
+        if cache is not None:
+            if verbose:
+                print(f"LLM response cache: {cache.path}")
+            kwargs["cache"] = cache
+    return kwargs
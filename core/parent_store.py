@@ -0,0 +1,164 @@
+"""
+Read-only, memory-mapped parent store (index/parent_store.bin).
+
+One file, written at index build time and swapped in with os.replace:
+
+    magic "FPS1" | uint64 header length | JSON header (array offsets, sections)
+    offsets     int64[n + 1]   byte range of each parent in the blob
+    id_keys     S<w>[n]        parent ids (UTF-8), sorted
+    id_rows     int32[n]       row of each sorted id
+    section_ids int32[n]       index into header["sections"] (interned metadata)
+    split_parts int32[n]       split_part, -1 if absent
+    blob        UTF-8 contents
+
+Readers mmap the file read-only, so worker processes share it through the page
+cache; fetching parents is a searchsorted + slices, no SQL and no JSON. A
+rebuilt file has a new inode; readers notice via stat and remap.
+"""
+import os
+import mmap
+import json
+import struct
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from core.sqlite_schema import SECTION_FIELDS
+
+PARENT_STORE_PATH = os.path.join("index", "parent_store.bin")
+MAGIC = b"FPS1"
+_ALIGN = 8
+
+
+def write_parent_store(parents: List[Dict], path: str = PARENT_STORE_PATH):
+    """parents: parents.jsonl rows (parent_id, content, metadata)."""
+    sections: Dict[Tuple, int] = {}
+    section_ids, split_parts, chunks = [], [], []
+    for p in parents:
+        key = tuple(p['metadata'].get(field) for field in SECTION_FIELDS)
+        section_ids.append(sections.setdefault(key, len(sections)))
+        split_parts.append(p['metadata'].get('split_part', -1))
+        chunks.append(p['content'].encode('utf-8'))
+
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(c) for c in chunks])
+    encoded_ids = [p['parent_id'].encode('utf-8') for p in parents]
+    ids = np.array(encoded_ids, dtype=f"S{max([len(i) for i in encoded_ids] + [1])}")
+    order = np.argsort(ids, kind="stable")
+    arrays = {
+        "offsets": offsets,
+        "id_keys": ids[order],
+        "id_rows": order.astype(np.int32),
+        "section_ids": np.array(section_ids, dtype=np.int32),
+        "split_parts": np.array(split_parts, dtype=np.int32),
+    }
+
+    # Lay out arrays after the header, each 8-byte aligned
+    layout, position = {}, 0
+    for name, arr in arrays.items():
+        layout[name] = {"offset": position, "dtype": arr.dtype.str, "count": len(arr)}
+        position += -(-arr.nbytes // _ALIGN) * _ALIGN
+    layout["blob"] = {"offset": position, "count": int(offsets[-1])}
+
+    header = json.dumps({
+        "count": len(parents),
+        "arrays": layout,
+        "sections": [dict(zip(SECTION_FIELDS, key)) for key in sections],
+    }, ensure_ascii=False).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+    tmp_path = path + ".tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(arr.tobytes())
+        f.seek(data_start + layout["blob"]["offset"])
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    # Atomic swap: processes holding the old mapping keep reading the old inode
+    os.replace(tmp_path, path)
+
+
+class ParentStore:
+
+    def __init__(self, path: str = PARENT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._identity = None
+        self._open()
+
+    @staticmethod
+    def exists(path: str = PARENT_STORE_PATH) -> bool:
+        return os.path.exists(path)
+
+    def _open(self):
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a parent store")
+        (header_len,) = struct.unpack_from("<Q", mm, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        header = json.loads(bytes(mm[header_start:header_start + header_len]).decode('utf-8'))
+        data_start = -(-(header_start + header_len) // _ALIGN) * _ALIGN
+
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            if name == "blob":
+                continue
+            arrays[name] = np.frombuffer(
+                mm, dtype=np.dtype(spec["dtype"]), count=spec["count"], offset=data_start + spec["offset"]
+            )
+        blob_start = data_start + header["arrays"]["blob"]["offset"]
+
+        # Swap in one assignment so concurrent readers see either the old or the new state
+        self._state = (mm, arrays, blob_start, header["sections"])
+        self._identity = (st.st_ino, st.st_mtime_ns)
+
+    def _current(self):
+        try:
+            st = os.stat(self.path)
+            if (st.st_ino, st.st_mtime_ns) != self._identity:
+                with self._lock:
+                    if (st.st_ino, st.st_mtime_ns) != self._identity:
+                        self._open()  # index rebuilt; old mapping is released once unreferenced
+        except FileNotFoundError:
+            pass
+        return self._state
+
+    def __len__(self) -> int:
+        return len(self._current()[1]["offsets"]) - 1
+
+    def get(self, parent_ids: List[str]) -> Dict[str, Dict]:
+        """Same shape as FundRAG.get_parents: {parent_id: {content, metadata}}; unknown ids are skipped."""
+        mm, arrays, blob_start, sections = self._current()
+        keys, offsets = arrays["id_keys"], arrays["offsets"]
+        if not parent_ids or len(keys) == 0:
+            return {}
+        encoded = [pid.encode('utf-8') for pid in parent_ids]
+        # Longer ids than the widest stored one cannot match (and must not be truncated into a match)
+        encoded = [e if len(e) <= keys.itemsize else b"" for e in encoded]
+        wanted = np.array(encoded, dtype=keys.dtype)
+        pos = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        found = (keys[pos] == wanted) & (wanted != b"")
+
+        # Vectorized lookups, then plain Python ints for the slicing
+        rows = arrays["id_rows"][pos[found]]
+        starts = (offsets[rows] + blob_start).tolist()
+        ends = (offsets[rows + 1] + blob_start).tolist()
+        section_ids = arrays["section_ids"][rows].tolist()
+        split_parts = arrays["split_parts"][rows].tolist()
+
+        parents = {}
+        hits = [pid for pid, ok in zip(parent_ids, found.tolist()) if ok]
+        for pid, start, end, section_id, split_part in zip(hits, starts, ends, section_ids, split_parts):
+            meta = dict(sections[section_id])
+            if split_part >= 0:
+                meta['split_part'] = split_part
+            parents[pid] = {"content": mm[start:end].decode('utf-8'), "metadata": meta}
+        return parents
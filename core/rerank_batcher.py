@@ -0,0 +1,220 @@
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Batch size histogram buckets (pairs per forward pass)
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+DEFAULT_SCORE_TIMEOUT_S = 30.0
+
+
+class _RerankRequest:
+    __slots__ = ("pairs", "future", "enqueued_at")
+
+    def __init__(self, pairs: List[Sequence[str]]):
+        self.pairs = pairs
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class RerankBatcher:
+    """
+    In-process reranker service with cross-request micro-batching.
+
+    Callers submit (query, passage) pairs; a single worker thread collects
+    requests for up to `max_wait_ms` (or until `max_batch_size` pairs are
+    queued), runs ONE predict call over all of them and hands each caller
+    back its slice of the scores. On CPU one larger batch is much cheaper
+    than several small ones running in parallel.
+
+    A request that would push a batch past `max_batch_size` starts the next
+    batch; a single request larger than that is scored in chunks of
+    `max_batch_size` pairs.
+
+    Requests whose future was cancelled before their batch starts (an
+    abandoned ascore, a timed-out score) are dropped without scoring.
+    """
+
+    def __init__(self, predict_fn: Callable[[List[Sequence[str]]], Sequence[float]],
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 score_timeout_s: float = DEFAULT_SCORE_TIMEOUT_S, name: str = "rerank-batcher"):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.score_timeout_s = score_timeout_s
+
+        self._queue: "queue.Queue[_RerankRequest]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "requests_batched": 0,
+            "requests_cancelled": 0,
+            "batches": 0,
+            "pairs_scored": 0,
+            "queue_depth": 0,        # pairs waiting right now
+            "queue_depth_peak": 0,
+            "max_batch_pairs": 0,
+            "queue_wait_ms_total": 0.0,
+            "predict_ms_total": 0.0,
+        }
+        self._batch_hist = {b: 0 for b in BATCH_SIZE_BUCKETS}
+        self._batch_hist["+Inf"] = 0
+
+        # Request held back from a full batch; only touched by the worker thread
+        self._held = None
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    # --- Public API ---
+    def submit(self, pairs: List[Sequence[str]]) -> Future:
+        """Queues pairs for scoring; the future resolves to a list of floats."""
+        request = _RerankRequest(list(pairs))
+        if not request.pairs:
+            request.future.set_result([])
+            return request.future
+        if self._closed:
+            raise RuntimeError("RerankBatcher is closed")
+
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._metrics["queue_depth"] += len(request.pairs)
+            self._metrics["queue_depth_peak"] = max(
+                self._metrics["queue_depth_peak"], self._metrics["queue_depth"]
+            )
+        self._queue.put(request)
+        return request.future
+
+    def score(self, pairs: List[Sequence[str]], timeout: Optional[float] = None) -> List[float]:
+        """
+        Blocking: scores pairs as part of the next batch. Raises
+        concurrent.futures.TimeoutError after `timeout` (default
+        score_timeout_s); the request is then cancelled.
+        """
+        future = self.submit(pairs)
+        try:
+            return future.result(timeout=self.score_timeout_s if timeout is None else timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    async def ascore(self, pairs: List[Sequence[str]]) -> List[float]:
+        """Awaitable: the event loop is free while the batch runs."""
+        return await asyncio.wrap_future(self.submit(pairs))
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            m = dict(self._metrics)
+            hist = dict(self._batch_hist)
+        batches = m["batches"]
+        m["avg_batch_pairs"] = round(m["pairs_scored"] / batches, 2) if batches else 0.0
+        m["avg_requests_per_batch"] = round(m["requests_batched"] / batches, 2) if batches else 0.0
+        m["batch_size_histogram"] = hist
+        return m
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+
+    # --- Worker ---
+    def _claim(self, request: _RerankRequest) -> bool:
+        """Marks the request running; False (and off the queue depth) if its caller already cancelled it."""
+        if request.future.set_running_or_notify_cancel():
+            return True
+        with self._lock:
+            self._metrics["requests_cancelled"] += 1
+            self._metrics["queue_depth"] -= len(request.pairs)
+        return False
+
+    @staticmethod
+    def _deliver(request: _RerankRequest, result=None, error: Optional[BaseException] = None):
+        """Resolves one future; a future that can no longer be set must not stop the worker."""
+        try:
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _next_request(self) -> Optional[_RerankRequest]:
+        """Held request or the next live one from the queue (blocking); None on shutdown."""
+        while True:
+            request, self._held = self._held or self._queue.get(), None
+            if request is None or self._claim(request):
+                return request
+
+    def _collect_batch(self, first: _RerankRequest) -> List[_RerankRequest]:
+        batch = [first]
+        n_pairs = len(first.pairs)
+        deadline = time.perf_counter() + self.max_wait
+
+        while n_pairs < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    request = self._queue.get(timeout=remaining)
+                else:
+                    # Wait is over, but still take whatever is already queued
+                    request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # Re-post shutdown for the outer loop
+                break
+            if n_pairs + len(request.pairs) > self.max_batch_size:
+                self._held = request  # Would overflow this batch: it starts the next one
+                break
+            if not self._claim(request):
+                continue
+            batch.append(request)
+            n_pairs += len(request.pairs)
+        return batch
+
+    def _record_batch(self, batch: List[_RerankRequest], n_pairs: int, started: float, predict_ms: float):
+        with self._lock:
+            m = self._metrics
+            m["batches"] += 1
+            m["requests_batched"] += len(batch)
+            m["pairs_scored"] += n_pairs
+            m["queue_depth"] -= n_pairs
+            m["max_batch_pairs"] = max(m["max_batch_pairs"], n_pairs)
+            m["queue_wait_ms_total"] += sum((started - r.enqueued_at) * 1000 for r in batch)
+            m["predict_ms_total"] += predict_ms
+            for bucket in BATCH_SIZE_BUCKETS:
+                if n_pairs <= bucket:
+                    self._batch_hist[bucket] += 1
+                    break
+            else:
+                self._batch_hist["+Inf"] += 1
+
+    def _run(self):
+        while True:
+            first = self._next_request()
+            if first is None:
+                break
+
+            batch = self._collect_batch(first)
+            all_pairs = [pair for request in batch for pair in request.pairs]
+
+            started = time.perf_counter()
+            try:
+                scores = []
+                for i in range(0, len(all_pairs), self.max_batch_size):
+                    scores += [float(s) for s in self.predict_fn(all_pairs[i:i + self.max_batch_size])]
+            except Exception as e:
+                self._record_batch(batch, len(all_pairs), started, 0.0)
+                for request in batch:
+                    self._deliver(request, error=e)
+                continue
+            predict_ms = (time.perf_counter() - started) * 1000
+            self._record_batch(batch, len(all_pairs), started, predict_ms)
+
+            offset = 0
+            for request in batch:
+                n = len(request.pairs)
+                self._deliver(request, scores[offset:offset + n])
+                offset += n
@@ -0,0 +1,214 @@
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from core.text_utils import normalize_text
+
+DEFAULT_MAX_ITEMS = 50000
+DEFAULT_MAX_DISK_ITEMS = 1000000
+DEFAULT_MAX_AGE_S = 30 * 24 * 3600
+PRUNE_EVERY_PUTS = 1000
+# SQLite reads / writes from aget_many / aput_many: a write can wait on another
+# process's lock and must not stall the event loop
+_disk_io = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rerank-cache")
+
+
+class RerankScoreCache:
+    """
+    Bounded cache of CrossEncoder scores keyed by (normalized query, parent_id).
+
+    All entries live under one `namespace` (reranker model version + index
+    build fingerprint), so a rebuilt index or a swapped model never serves
+    stale scores. Several namespaces can share one persistent file (e.g.
+    processes running different reranker backends); rows are evicted by age
+    (max_age_s) and, oldest first, beyond max_disk_items, not by namespace.
+
+    aget_many / aput_many are the event-loop variants: the in-memory LRU is
+    served on the loop, the SQLite tier runs on a small thread pool. The
+    connection has its own lock, so a slow write never holds up LRU hits.
+    """
+
+    def __init__(self, namespace: str, max_items: int = DEFAULT_MAX_ITEMS, path: Optional[str] = None,
+                 max_disk_items: int = DEFAULT_MAX_DISK_ITEMS, max_age_s: float = DEFAULT_MAX_AGE_S):
+        self.namespace = namespace
+        self.max_items = max_items
+        self.path = path
+        self.max_disk_items = max_disk_items
+        self.max_age_s = max_age_s
+        self._puts = 0
+
+        self._lru: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()     # LRU + stats
+        self._db_lock = threading.Lock()  # SQLite connection
+        self._stats = {"hits": 0, "misses": 0}
+
+        self._conn = None
+        if path:
+            db_dir = os.path.dirname(path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rerank_scores (
+                    namespace TEXT,
+                    query_hash TEXT,
+                    parent_id TEXT,
+                    score REAL,
+                    created REAL,
+                    PRIMARY KEY (namespace, query_hash, parent_id)
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(rerank_scores)")}
+            if "created" not in columns:
+                # Files from before age-based eviction: their rows count as expired
+                self._conn.execute("ALTER TABLE rerank_scores ADD COLUMN created REAL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS rerank_scores_created ON rerank_scores (created)")
+            self._prune()
+
+    def _prune(self):
+        """Drops rows older than max_age_s, then the oldest beyond max_disk_items (any namespace)."""
+        self._conn.execute("DELETE FROM rerank_scores WHERE created < ?", (time.time() - self.max_age_s,))
+        excess = self._conn.execute("SELECT count(*) FROM rerank_scores").fetchone()[0] - self.max_disk_items
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM rerank_scores WHERE rowid IN "
+                "(SELECT rowid FROM rerank_scores ORDER BY created, rowid LIMIT ?)", (excess,)
+            )
+        self._conn.commit()
+
+    @staticmethod
+    def _query_hash(query: str) -> str:
+        return hashlib.sha256(normalize_text(query).encode("utf-8")).hexdigest()
+
+    def _get_memory(self, qh: str, parent_ids: List[str]) -> Dict[str, float]:
+        found: Dict[str, float] = {}
+        with self._lock:
+            for pid in parent_ids:
+                score = self._lru.get((qh, pid))
+                if score is not None:
+                    self._lru.move_to_end((qh, pid))
+                    found[pid] = score
+        return found
+
+    def _get_disk(self, qh: str, parent_ids: List[str]) -> Dict[str, float]:
+        """Persistent lookup for memory misses (promoted into memory)."""
+        placeholders = ','.join(['?'] * len(parent_ids))
+        with self._db_lock:
+            if self._conn is None:
+                return {}
+            rows = self._conn.execute(
+                f"SELECT parent_id, score FROM rerank_scores "
+                f"WHERE namespace = ? AND query_hash = ? AND parent_id IN ({placeholders})",
+                [self.namespace, qh] + parent_ids
+            ).fetchall()
+        with self._lock:
+            for pid, score in rows:
+                self._put_memory(qh, pid, score)
+        return dict(rows)
+
+    def _count(self, found: int, total: int):
+        with self._lock:
+            self._stats["hits"] += found
+            self._stats["misses"] += total - found
+
+    def get_many(self, query: str, parent_ids: List[str]) -> Dict[str, float]:
+        """Returns {parent_id: score} for the pairs that are cached."""
+        qh = self._query_hash(query)
+        found = self._get_memory(qh, parent_ids)
+        missing = [pid for pid in parent_ids if pid not in found]
+        if missing and self._conn is not None:
+            found.update(self._get_disk(qh, missing))
+        self._count(len(found), len(parent_ids))
+        return found
+
+    async def aget_many(self, query: str, parent_ids: List[str]) -> Dict[str, float]:
+        """get_many for the event loop: memory on the loop, the SQLite tier on the cache I/O pool."""
+        qh = self._query_hash(query)
+        found = self._get_memory(qh, parent_ids)
+        missing = [pid for pid in parent_ids if pid not in found]
+        if missing and self._conn is not None:
+            found.update(await asyncio.get_running_loop().run_in_executor(_disk_io, self._get_disk, qh, missing))
+        self._count(len(found), len(parent_ids))
+        return found
+
+    def _put_disk(self, qh: str, scores: Dict[str, float]):
+        with self._db_lock:
+            if self._conn is None:
+                return
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rerank_scores VALUES (?, ?, ?, ?, ?)",
+                [(self.namespace, qh, pid, float(score), now) for pid, score in scores.items()]
+            )
+            self._conn.commit()
+            self._puts += 1
+            if self._puts % PRUNE_EVERY_PUTS == 0:
+                self._prune()
+
+    def put_many(self, query: str, scores: Dict[str, float]):
+        if not scores:
+            return
+        qh = self._query_hash(query)
+        with self._lock:
+            for pid, score in scores.items():
+                self._put_memory(qh, pid, score)
+        if self._conn is not None:
+            self._put_disk(qh, scores)
+
+    async def aput_many(self, query: str, scores: Dict[str, float]):
+        """put_many for the event loop: the SQLite write (and its lock wait) runs on the cache I/O pool."""
+        if not scores:
+            return
+        qh = self._query_hash(query)
+        with self._lock:
+            for pid, score in scores.items():
+                self._put_memory(qh, pid, score)
+        if self._conn is not None:
+            await asyncio.get_running_loop().run_in_executor(_disk_io, self._put_disk, qh, scores)
+
+    def _put_memory(self, qh: str, pid: str, score: float):
+        self._lru[(qh, pid)] = float(score)
+        self._lru.move_to_end((qh, pid))
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._lru)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+        return stats
+
+    def close(self):
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+                self._conn = None
+
+
+def build_rerank_cache(model_version: str, index_fingerprint: str) -> Optional[RerankScoreCache]:
+    """
+    Default config:
+    - RERANK_CACHE=0 disables the cache
+    - RERANK_CACHE_SIZE sets the in-memory capacity (pairs)
+    - RERANK_CACHE_PATH enables SQLite persistence at that path
+    - RERANK_CACHE_DISK_SIZE / RERANK_CACHE_MAX_AGE bound the persistent rows
+      (count, seconds) across all namespaces
+    """
+    if os.getenv("RERANK_CACHE", "1") == "0":
+        return None
+    return RerankScoreCache(
+        namespace=f"{model_version}|{index_fingerprint}",
+        max_items=int(os.getenv("RERANK_CACHE_SIZE", DEFAULT_MAX_ITEMS)),
+        path=os.getenv("RERANK_CACHE_PATH") or None,
+        max_disk_items=int(os.getenv("RERANK_CACHE_DISK_SIZE", DEFAULT_MAX_DISK_ITEMS)),
+        max_age_s=float(os.getenv("RERANK_CACHE_MAX_AGE", DEFAULT_MAX_AGE_S))
+    )
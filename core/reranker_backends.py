@@ -0,0 +1,140 @@
+import os
+import hashlib
+from typing import List, Sequence
+
+import numpy as np
+
+# Model locations (relative to the repo root, like the rest of the pipeline)
+RERANKER_HF_NAME = "BAAI/bge-reranker-base"
+RERANKER_LOCAL_DIR = os.path.join("models", "bge-reranker-base")
+RERANKER_ONNX_DIR = os.path.join("models", "bge-reranker-base-onnx")
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model-int8.onnx"
+
+# Same limit CrossEncoder uses for bge-reranker-base
+MAX_LENGTH = 512
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+WEIGHT_SUFFIXES = (".safetensors", ".bin", ".onnx", ".pt")
+
+
+def weights_fingerprint(path: str) -> str:
+    """
+    Size + mtime of a model file (or of the weight files in a model dir):
+    re-exported or swapped weights get a new fingerprint, hence a new
+    model_version and rerank-cache namespace.
+    """
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(WEIGHT_SUFFIXES))
+    else:
+        files = [path] if os.path.exists(path) else []
+    h = hashlib.sha256()
+    for file_path in files:
+        st = os.stat(file_path)
+        h.update(f"{os.path.basename(file_path)}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def model_version(path: str, backend: str) -> str:
+    """Cache namespace of a loaded model: path, backend and weights fingerprint."""
+    return f"{os.path.normpath(path)}:{backend}:{weights_fingerprint(path)}"
+
+
+class TorchRerankerBackend:
+    """Float32 sentence-transformers CrossEncoder (original behaviour)."""
+
+    name = "torch"
+
+    def __init__(self, model_dir: str = RERANKER_LOCAL_DIR):
+        from sentence_transformers import CrossEncoder
+        import torch
+
+        model_name_or_path = RERANKER_HF_NAME
+        if os.path.exists(model_dir):
+            print(f"Loading local Rerank model from: {model_dir}")
+            model_name_or_path = model_dir
+        else:
+            print(f"Local model not found at {model_dir}, downloading/loading from HuggingFace...")
+
+        self.model = CrossEncoder(
+            model_name_or_path,
+            model_kwargs={"torch_dtype": torch.float32} # Use float32 for CPU compatibility
+        )
+        # Hub downloads have no local weights to fingerprint: the hub name (revision pinned by HF cache)
+        self.model_version = model_version(model_name_or_path, "torch-fp32") \
+            if model_name_or_path == model_dir else f"{RERANKER_HF_NAME}:torch-fp32"
+
+    def predict(self, pairs: List[Sequence[str]], batch_size: int = 32) -> np.ndarray:
+        return self.model.predict(pairs, batch_size=batch_size, show_progress_bar=False)
+
+
+class OnnxRerankerBackend:
+    """
+    ONNX Runtime export of the same model (see scripts/export_reranker_onnx.py).
+    Applies the same sigmoid CrossEncoder uses for single-label models, so
+    scores stay on the 0-1 scale shown in the UI.
+    """
+
+    def __init__(self, onnx_dir: str = RERANKER_ONNX_DIR, quantized: bool = False):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "ONNX reranker backend needs `onnxruntime` and `transformers` "
+                "(pip install onnxruntime transformers)"
+            ) from e
+
+        model_file = ONNX_INT8_FILE if quantized else ONNX_FP32_FILE
+        model_path = os.path.join(onnx_dir, model_file)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"ONNX reranker not found at {model_path}, run scripts/export_reranker_onnx.py first"
+            )
+
+        self.name = "onnx-int8" if quantized else "onnx"
+        print(f"Loading ONNX Rerank model from: {model_path}")
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        intra_threads = os.getenv("RERANKER_ONNX_THREADS")
+        if intra_threads:
+            options.intra_op_num_threads = int(intra_threads)
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.model_version = model_version(model_path, self.name)
+
+    def predict(self, pairs: List[Sequence[str]], batch_size: int = 32) -> np.ndarray:
+        scores = []
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            encoded = self.tokenizer(
+                [p[0] for p in batch], [p[1] for p in batch],
+                padding=True, truncation=True, max_length=MAX_LENGTH, return_tensors="np"
+            )
+            feed = {k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names}
+            logits = self.session.run(None, feed)[0]
+            scores.append(logits[:, 0])
+        if not scores:
+            return np.zeros(0, dtype=np.float32)
+        logits = np.concatenate(scores)
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+def load_reranker(backend: str = None):
+    """
+    Builds the reranker backend selected by RERANKER_BACKEND:
+    - torch (default): float32 CrossEncoder
+    - onnx: ONNX Runtime float32 export
+    - onnx-int8: dynamically int8-quantized ONNX export
+    """
+    backend = (backend or os.getenv("RERANKER_BACKEND", "torch")).lower()
+    if backend == "torch":
+        return TorchRerankerBackend()
+    if backend == "onnx":
+        return OnnxRerankerBackend(quantized=False)
+    if backend == "onnx-int8":
+        return OnnxRerankerBackend(quantized=True)
+    raise ValueError(f"Unknown RERANKER_BACKEND '{backend}', expected one of {BACKENDS}")
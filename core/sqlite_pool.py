@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Read-side tuning (per connection)
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024  # 256 MB, index DB is far smaller
+DEFAULT_CACHE_SIZE_KB = 64 * 1024      # 64 MB page cache
+DEFAULT_CACHED_STATEMENTS = 128        # sqlite3 prepared statement LRU per connection
+
+
+class SQLiteReadPool:
+    """
+    Thread-local, read-only SQLite connections for the retrieval path.
+
+    Each thread (e.g. a Gradio worker) lazily opens one connection with
+    `mode=ro` and keeps it, so schema parsing, page cache and prepared
+    statements survive across queries. Connections are reopened if the
+    DB file is replaced (index rebuild).
+    """
+
+    def __init__(self, db_path: str,
+                 mmap_size: int = DEFAULT_MMAP_SIZE,
+                 cache_size_kb: int = DEFAULT_CACHE_SIZE_KB,
+                 cached_statements: int = DEFAULT_CACHED_STATEMENTS):
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all_conns: List[sqlite3.Connection] = []
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_path)
+
+    def _file_signature(self) -> Tuple[int, int]:
+        st = os.stat(self.db_path)
+        return (st.st_ino, st.st_mtime_ns)
+
+    def _open(self) -> sqlite3.Connection:
+        uri = Path(self.db_path).absolute().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        # Negative value = size in KiB
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+
+        with self._lock:
+            self._all_conns.append(conn)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn in self._all_conns:
+                self._all_conns.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, opening (or reopening) it if needed."""
+        signature = self._file_signature()
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+
+        if conn is not None and self._local.signature != signature:
+            # DB file was rebuilt under us, drop the stale handle
+            self._discard(conn)
+            conn = None
+
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.signature = signature
+        return conn
+
+    def execute(self, sql: str, params=()) -> List[sqlite3.Row]:
+        """Runs a read query on this thread's connection and returns all rows."""
+        return self.connection().execute(sql, params).fetchall()
+
+    def close_all(self):
+        """Closes every connection opened by this pool (all threads)."""
+        with self._lock:
+            conns = list(self._all_conns)
+            self._all_conns.clear()
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
@@ -0,0 +1,190 @@
+"""
+SQLite schema v3: normalized metadata instead of per-row JSON blobs.
+
+    sections      interned (book, chapter, section, figure_ref, chunk_type, exam_priority),
+                  plus the cleaned chapter name used by the question generator
+    parents       integer id, uid (the parent_id string used by FAISS / the pipeline),
+                  section_id, split_part, content
+    children      integer id, parent_id -> parents.id, content
+    children_fts  contentless FTS5 over CJK bigrams, rowid = children.id
+    children_vocab fts5vocab (document frequencies for query term selection)
+
+Metadata dicts are rebuilt from columns (`row_metadata`), so reads need no JSON
+parsing and children no longer carry a copy of their parent's metadata.
+PRAGMA user_version = 3 marks the schema.
+"""
+import os
+import re
+import json
+import sqlite3
+from typing import Dict, List, Tuple
+
+from core.cjk_tokenize import index_text
+
+SCHEMA_VERSION = 3
+
+# Metadata keys stored on sections (in order); split_part lives on parents
+SECTION_FIELDS = ("book", "chapter", "section", "figure_ref", "chunk_type", "exam_priority")
+
+SCHEMA_SQL = """
+CREATE TABLE sections (
+    id INTEGER PRIMARY KEY,
+    book TEXT,
+    chapter TEXT,
+    chapter_clean TEXT,
+    section TEXT,
+    figure_ref TEXT,
+    chunk_type TEXT,
+    exam_priority INTEGER,
+    UNIQUE (book, chapter, section, figure_ref, chunk_type, exam_priority)
+);
+CREATE INDEX idx_sections_chapter_clean ON sections(chapter_clean);
+
+CREATE TABLE parents (
+    id INTEGER PRIMARY KEY,
+    uid TEXT NOT NULL UNIQUE,
+    section_id INTEGER NOT NULL REFERENCES sections(id),
+    split_part INTEGER,
+    content TEXT NOT NULL
+);
+
+CREATE TABLE children (
+    id INTEGER PRIMARY KEY,
+    parent_id INTEGER NOT NULL REFERENCES parents(id),
+    content TEXT NOT NULL
+);
+CREATE INDEX idx_children_parent ON children(parent_id);
+
+CREATE VIRTUAL TABLE children_fts USING fts5(content_tokens, content='');
+CREATE VIRTUAL TABLE children_vocab USING fts5vocab(children_fts, 'row');
+"""
+
+# Columns every metadata-bearing read selects (see row_metadata)
+METADATA_COLUMNS = "s.book, s.chapter, s.section, s.figure_ref, s.chunk_type, s.exam_priority, p.split_part"
+
+KEYWORD_SQL = f"""
+    SELECT c.content, p.uid AS parent_id, {METADATA_COLUMNS}, top.bm25
+    FROM (
+        SELECT rowid AS id, bm25(children_fts) AS bm25
+        FROM children_fts
+        WHERE children_fts MATCH ?
+        ORDER BY bm25
+        LIMIT ?
+    ) AS top
+    JOIN children c ON c.id = top.id
+    JOIN parents p ON p.id = c.parent_id
+    JOIN sections s ON s.id = p.section_id
+    ORDER BY top.bm25
+"""
+
+PARENTS_SQL = f"""
+    SELECT p.uid AS id, p.content, {METADATA_COLUMNS}
+    FROM parents p JOIN sections s ON s.id = p.section_id
+    WHERE p.uid IN ({{placeholders}})
+"""
+
+CHILDREN_SQL = "SELECT id, content FROM children WHERE id IN ({placeholders})"
+
+
+def clean_chapter_name(name: str) -> str:
+    """
+    Removes trailing numbers from chapter names to deduplicate.
+    Handles standard spaces, non-breaking spaces, full-width spaces.
+    Example: "第6章 投资管理基础 151" -> "第6章 投资管理基础"
+    """
+    if not name:
+        return "Unknown Chapter"
+    
+    # Regex explanation:
+    # [\s\xa0\u3000]+ : Match one or more whitespace characters (including NBSP \xa0 and full-width space \u3000)
+    # \d+             : Match one or more digits
+    # [\s\xa0\u3000]* : Match zero or more trailing whitespace characters
+    # $               : End of string
+    return re.sub(r'[\s\xa0\u3000]+\d+[\s\xa0\u3000]*$', '', name).strip()
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def row_metadata(row) -> Dict:
+    """Metadata dict (same shape as the v2 JSON) from a row selecting METADATA_COLUMNS."""
+    meta = {field: row[field] for field in SECTION_FIELDS}
+    if row['split_part'] is not None:
+        meta['split_part'] = row['split_part']
+    return meta
+
+
+def section_key(meta: Dict) -> Tuple:
+    """sections row identity for a metadata dict (SECTION_FIELDS values)."""
+    return tuple(meta.get(field) for field in SECTION_FIELDS)
+
+
+def write_v3(conn: sqlite3.Connection, parents: List[Dict], children: List[Dict]):
+    """
+    Creates the v3 schema and fills it. parents / children are parents.jsonl /
+    children.jsonl rows (parent_id, content, metadata).
+    """
+    conn.executescript(SCHEMA_SQL)
+
+    sections: Dict[Tuple, int] = {}
+    parent_rows = []
+    for p in parents:
+        key = section_key(p['metadata'])
+        if key not in sections:
+            sections[key] = len(sections) + 1
+        parent_rows.append((len(parent_rows) + 1, p['parent_id'], sections[key],
+                            p['metadata'].get('split_part'), p['content']))
+
+    conn.executemany(
+        "INSERT INTO sections (id, book, chapter, chapter_clean, section, figure_ref, chunk_type, exam_priority) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(sid, key[0], key[1], clean_chapter_name(key[1]), *key[2:]) for key, sid in sections.items()]
+    )
+    conn.executemany("INSERT INTO parents VALUES (?, ?, ?, ?, ?)", parent_rows)
+
+    parent_ids = {row[1]: row[0] for row in parent_rows}
+    child_rows = [
+        (i, parent_ids[c['parent_id']], c['content'])
+        for i, c in enumerate(children, start=1) if c['parent_id'] in parent_ids
+    ]
+    conn.executemany("INSERT INTO children VALUES (?, ?, ?)", child_rows)
+    conn.executemany(
+        "INSERT INTO children_fts (rowid, content_tokens) VALUES (?, ?)",
+        [(cid, index_text(content)) for cid, _, content in child_rows]
+    )
+    conn.execute("INSERT INTO children_fts(children_fts) VALUES ('optimize')")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def build_sqlite_v3(parents: List[Dict], children: List[Dict], db_path: str):
+    """Writes a fresh v3 DB at db_path (WAL, like v2, for the read-only pool)."""
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    write_v3(conn, parents, children)
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def read_v2(v2_path: str) -> Tuple[List[Dict], List[Dict]]:
+    """parents / children rows from a v2 DB (JSON metadata blobs)."""
+    conn = sqlite3.connect(v2_path)
+    parents = [
+        {"parent_id": pid, "content": content, "metadata": json.loads(meta)}
+        for pid, content, meta in conn.execute("SELECT id, content, metadata FROM doc_parents ORDER BY rowid")
+    ]
+    children = [
+        {"parent_id": pid, "content": content}
+        for content, pid in conn.execute("SELECT content, parent_id FROM doc_children_fts ORDER BY rowid")
+    ]
+    conn.close()
+    return parents, children
+
+
+def migrate_v2_to_v3(v2_path: str, v3_path: str):
+    parents, children = read_v2(v2_path)
+    build_sqlite_v3(parents, children, v3_path)
+    return len(parents), len(children)
@@ -0,0 +1,28 @@
+"""Shared FundRAG test double for the core/tests that exercise the query paths."""
+import threading
+
+from core.tracing import Tracer
+from core.warmup import Readiness
+from rag_pipeline_v3 import FundRAG
+
+
+def stub_rag(**components) -> FundRAG:
+    """
+    FundRAG without indexes, models or LLM clients. Every attribute __init__
+    sets gets an inert default (no trace log, reranker / caches / chains off,
+    fixed 20/20 pool, no fusion); `components` override attributes or
+    methods, e.g. stub_rag(std_chain=chain, _aretrieve_traced=retrieve).
+    A new FundRAG attribute gets its default here, not in every test file.
+    """
+    rag = FundRAG.__new__(FundRAG)
+    rag.__dict__.update(
+        embeddings=None, embedding_spec={}, vector_store=None, native_store=None,
+        parent_store=None, bm25_index=None, db=None, schema_version=0,
+        std_chain=None, calc_chain=None, llm_cache=None, _llm_lock=threading.Lock(),
+        reranker=None, rerank_cache=None, rerank_mode="parent", _reranker_lock=threading.Lock(),
+        rerank_batcher=None, adaptive_pool=False, fusion=False,
+        tracer=Tracer(None), readiness=Readiness(), answer_cache=None,
+    )
+    rag._init_executors()
+    rag.__dict__.update(components)
+    return rag
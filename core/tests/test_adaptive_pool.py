@@ -0,0 +1,41 @@
+import unittest
+from core.adaptive_pool import pool_signals, plan_pool, DEFAULT_POOL, SHRINK_POOL, WIDEN_POOL
+
+def vec(*pairs):
+    return [{"parent_id": pid, "score": dist} for pid, dist in pairs]
+
+def kw(*pids):
+    return [{"parent_id": pid, "score": 0.0} for pid in pids]
+
+class TestAdaptivePool(unittest.TestCase):
+
+    def test_signals_are_parent_level(self):
+        # Two children of p1 count as one parent
+        signals = pool_signals(vec(("p1", 0.5), ("p1", 0.55), ("p2", 0.7)), kw("p1", "p9"))
+        self.assertAlmostEqual(signals["gap"], 0.2)
+        self.assertTrue(signals["top_agree"])
+        self.assertAlmostEqual(signals["overlap"], 0.2)
+
+    def test_clear_winner_skips_rerank(self):
+        plan = plan_pool(pool_signals(vec(("p1", 0.5), ("p2", 0.9)), kw("p1")))
+        self.assertEqual(plan["path"], "skip_rerank")
+        self.assertFalse(plan["rerank"])
+
+    def test_gap_without_agreement_shrinks(self):
+        plan = plan_pool(pool_signals(vec(("p1", 0.5), ("p2", 0.9)), kw("p7")))
+        self.assertEqual(plan["path"], "shrink")
+        self.assertEqual(plan["pool_size"], SHRINK_POOL)
+
+    def test_flat_disjoint_widens(self):
+        hits = vec(*[(f"p{i}", 0.8 + i * 0.001) for i in range(12)])
+        plan = plan_pool(pool_signals(hits, kw("k1", "k2")))
+        self.assertEqual(plan["path"], "widen")
+        self.assertEqual(plan["pool_size"], WIDEN_POOL)
+
+    def test_missing_vector_leg_keeps_default(self):
+        plan = plan_pool(pool_signals([], kw("k1", "k2")))
+        self.assertEqual(plan["path"], "default")
+        self.assertEqual(plan["pool_size"], DEFAULT_POOL)
+
+if __name__ == '__main__':
+    unittest.main()
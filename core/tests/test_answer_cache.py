@@ -0,0 +1,126 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+
+from langchain_core.language_models import FakeStreamingListLLM
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+from core.answer_cache import AnswerCache, question_key
+from core.tests.rag_stub import stub_rag
+from rag_pipeline_v3 import FundRAG
+
+DOCS = [{"parent_id": "p1", "content": "申购费用按金额计算", "metadata": {"book": "上册"}}]
+
+
+class FakeEmbeddings:
+    """Questions mentioning 申购 point one way, everything else the other."""
+
+    def embed_query(self, text):
+        return [1.0, 0.1] if "申购" in text else [0.0, 1.0]
+
+
+def cached_rag(cache: AnswerCache, parents=("p1",)) -> FundRAG:
+    """FundRAG with stubbed retrieval (returning `parents`) and a fake LLM whose answers are numbered."""
+    async def retrieve(trace, question, timings):
+        rag.retrievals += 1
+        trace.attrs["pipeline"] = "std"
+        return "std", [{**DOCS[0], "parent_id": pid} for pid in rag.parents]
+
+    llm = FakeStreamingListLLM(responses=[f"答案{i}\n解析{i}" for i in range(10)])
+    chain = PromptTemplate.from_template("{context}{question}") | llm | StrOutputParser()
+    rag = stub_rag(answer_cache=cache, embeddings=FakeEmbeddings(), _aretrieve_traced=retrieve,
+                   std_chain=chain, calc_chain=chain)
+    rag.retrievals = 0
+    rag.parents = list(parents)
+    return rag
+
+
+class TestAnswerCache(unittest.TestCase):
+
+    def test_exact_key_ignores_whitespace_case_and_trailing_punctuation(self):
+        self.assertEqual(question_key(" 什么是ETF？ "), question_key("什么是etf"))
+        self.assertNotEqual(question_key("什么是ETF"), question_key("什么是LOF"))
+
+    def test_similarity_threshold_and_numbers(self):
+        cache = AnswerCache("ns", threshold=0.9)
+        cache.put("申购10000元的费用是多少", [1.0, 0.0], "A", "calc", DOCS)
+        self.assertEqual(cache.get_similar("申购 10000 元费用是多少？", [0.99, 0.1])["answer"], "A")
+        self.assertIsNone(cache.get_similar("申购20000元的费用是多少", [0.99, 0.1]))  # other amount
+        self.assertIsNone(cache.get_similar("申购10000元的费用是多少", [0.5, 0.8]))   # below threshold
+        self.assertEqual(cache.get_exact("申购10000元的费用是多少")["parent_ids"], ["p1"])
+
+    def test_ttl_and_lru_eviction(self):
+        cache = AnswerCache("ns", max_items=2, ttl_s=0.05)
+        for q in ("q1", "q2"):
+            cache.put(q, [1.0, 0.0], q, "std", DOCS)
+        cache.get_exact("q1")
+        cache.put("q3", [1.0, 0.0], "q3", "std", DOCS)
+        self.assertIsNone(cache.get_exact("q2"))  # least recently used
+        self.assertIsNotNone(cache.get_exact("q1"))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get_exact("q3"))
+
+    def test_persistent_namespace_invalidation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "answers.db")
+            cache = AnswerCache("build-1", path=path)
+            cache.put("什么是ETF", [1.0, 0.0], "A", "std", DOCS)
+            cache.close()
+
+            reopened = AnswerCache("build-1", path=path)
+            self.assertEqual(reopened.get_exact("什么是ETF")["retrieved_docs"], DOCS)
+            self.assertEqual(reopened.get_similar("ETF是什么", [1.0, 0.0])["answer"], "A")
+            reopened.close()
+
+            rebuilt = AnswerCache("build-2", path=path)
+            self.assertIsNone(rebuilt.get_exact("什么是ETF"))
+            self.assertEqual(rebuilt.stats()["size"], 0)
+            rebuilt.close()
+
+    def test_query_persists_off_the_event_loop(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = AnswerCache("ns", path=os.path.join(tmp, "answers.db"), ttl_s=0.05)
+            threads = []
+            persist = cache._persist
+            cache._persist = lambda *a: threads.append(threading.current_thread().name) or persist(*a)
+            rag = cached_rag(cache)
+            rag.query("什么是ETF")   # new answer written
+            time.sleep(0.06)
+            rag.query("什么是ETF")   # expired exact entry deleted, new answer written
+            self.assertEqual(len(threads), 3)
+            self.assertTrue(all(name.startswith("answer-cache") for name in threads), threads)
+            cache.close()
+
+    def test_query_serves_exact_and_semantic_hits(self):
+        rag = cached_rag(AnswerCache("ns", threshold=0.9))
+        first = rag.query("基金申购费用如何计算？")
+        self.assertNotIn("answer_cache", first)
+
+        exact = rag.query("基金申购费用如何计算")
+        self.assertEqual((exact["answer_cache"], exact["full_response"]), ("exact", first["full_response"]))
+        self.assertEqual(rag.retrievals, 1)
+
+        semantic = rag.query("申购基金的费用怎么算")
+        self.assertEqual((semantic["answer_cache"], semantic["full_response"]), ("semantic", first["full_response"]))
+        self.assertEqual(rag.retrievals, 2)  # retrieval still runs to compare parents
+
+        rag.parents = ["p2"]
+        other = rag.query("申购费用怎样计算呢")
+        self.assertNotIn("answer_cache", other)
+        self.assertNotEqual(other["full_response"], first["full_response"])
+        self.assertEqual(rag.answer_cache.stats()["semantic_hits"], 1)
+
+    def test_stream_replays_cached_answer_in_chunks(self):
+        rag = cached_rag(AnswerCache("ns"))
+        answer = rag.query("什么是ETF")["full_response"]
+        chunks = list(rag.query_stream("什么是ETF？"))
+        self.assertEqual(chunks[0]["answer_cache"], "exact")
+        self.assertEqual("".join(c["content"] for c in chunks if c["type"] == "chunk"), answer)
+        self.assertEqual(chunks[-1]["type"], "sources")
+        self.assertEqual(chunks[-1]["trace"]["answer_cache"], "exact")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import json
+import tempfile
+import unittest
+import numpy as np
+from core.bm25_index import BM25Index
+
+CHILDREN = [
+    {"parent_id": "p1", "content": "开放式基金的申购费率一般较低", "metadata": {"book": "上册"}},
+    {"parent_id": "p2", "content": "封闭式基金在交易所上市交易", "metadata": {"book": "上册"}},
+    {"parent_id": "p3", "content": "货币市场基金不收取申购费", "metadata": {"book": "下册"}},
+]
+
+class TestBM25Index(unittest.TestCase):
+
+    def test_ranks_best_match_first(self):
+        hits = BM25Index.build(CHILDREN).search("关于开放式基金申购费率的说法正确的是", k=3)
+        self.assertEqual([h["parent_id"] for h in hits][:2], ["p1", "p3"])
+        self.assertEqual(hits[0]["metadata"], {"book": "上册"})
+        self.assertEqual(hits[0]["source"], "keyword")
+        # Lower is better, like FTS5 bm25()
+        self.assertLess(hits[0]["score"], hits[1]["score"])
+
+    def test_k_and_no_match(self):
+        index = BM25Index.build(CHILDREN)
+        self.assertEqual(len(index.search("基金", k=1)), 1)
+        self.assertEqual(index.search("债券回购", k=5), [])
+
+    def test_saved_index_is_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            built = BM25Index.build(CHILDREN)
+            built.save(tmp)
+            loaded = BM25Index.load(tmp)
+            self.assertFalse(loaded.weights.data.flags.owndata)
+            self.assertIsInstance(loaded.docs.blob, np.memmap)  # child texts are not parsed per process
+            self.assertEqual(len(loaded.docs.source_list), 3)
+            self.assertEqual(built.search("上市交易"), loaded.search("上市交易"))
+            np.testing.assert_allclose(built.weights.toarray(), loaded.weights.toarray())
+            del loaded  # release the mmaps before cleanup
+
+    def test_reads_legacy_docs_jsonl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            built = BM25Index.build(CHILDREN)
+            built.save(tmp)
+            for name in ("docs.bin", "doc_offsets.npy", "doc_sources.npy", "doc_sources.json"):
+                os.remove(os.path.join(tmp, name))
+            with open(os.path.join(tmp, "docs.jsonl"), 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(c, ensure_ascii=False) + "\n" for c in CHILDREN)
+            self.assertEqual(BM25Index.load(tmp).search("上市交易"), built.search("上市交易"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import sqlite3
+import unittest
+from core.cjk_tokenize import tokenize, index_text, query_terms, match_expression
+
+class TestCJKTokenize(unittest.TestCase):
+
+    def test_bigrams_and_latin_words(self):
+        self.assertEqual(tokenize("开放式基金ETF"), ["开放", "放式", "式基", "基金", "etf"])
+        self.assertEqual(tokenize("费率1.5%"), ["费率", "1", "5"])
+        self.assertEqual(tokenize("股，债"), ["股", "债"])
+
+    def test_query_drops_boilerplate(self):
+        terms = query_terms("关于申购费率，下列说法正确的是？")
+        self.assertEqual(terms, ["申购", "购费", "费率"])
+
+    def test_query_prefers_rare_terms(self):
+        df = {"基金": 900, "申购": 40, "购费": 5, "费率": 60}
+        terms = query_terms("基金申购费率", doc_freq=df, n_docs=1000)
+        # 基金 is in 90% of docs -> dropped; the rest rarest first
+        self.assertEqual(terms, ["购费", "申购", "费率"])
+
+    def test_fts5_roundtrip(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(content UNINDEXED, content_tokens)")
+        docs = ["开放式基金的申购费率一般较低", "封闭式基金在交易所上市交易", "货币市场基金不收取申购费"]
+        conn.executemany("INSERT INTO t VALUES (?, ?)", [(d, index_text(d)) for d in docs])
+        expr = match_expression(query_terms("关于开放式基金申购费率的说法正确的是"))
+        rows = conn.execute("SELECT content FROM t WHERE t MATCH ? ORDER BY bm25(t)", (expr,)).fetchall()
+        self.assertEqual(rows[0][0], docs[0])
+        self.assertEqual(len(rows), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import os
+import asyncio
+import tempfile
+import threading
+import unittest
+from typing import List
+from langchain_core.embeddings import Embeddings
+from unittest import mock
+import numpy as np
+from core.embedding_cache import (
+    CachedEmbeddings, SQLiteEmbeddingStore, MemmapEmbeddingStore, cached_embeddings, normalize_text
+)
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic fake: vector = [len(text), number of calls so far]"""
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls.append([text])
+        return [float(len(text)), 1.0]
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store_path = os.path.join(self.tmp.name, "emb.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("  基金\n\t申购  "), "基金 申购")
+        self.assertEqual(normalize_text("ＡＢＣ"), "ABC") # NFKC full-width
+
+    def test_memory_hits(self):
+        fake = CountingEmbeddings()
+        emb = CachedEmbeddings(fake, "m")
+        emb.embed_query("什么是基金？")
+        emb.embed_query(" 什么是基金？ ")
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual(emb.stats()["memory_hits"], 1)
+        self.assertEqual(emb.stats()["misses"], 1)
+
+    def test_documents_only_embed_misses_once(self):
+        fake = CountingEmbeddings()
+        emb = CachedEmbeddings(fake, "m")
+        emb.embed_query("a")
+        vectors = emb.embed_documents(["a", "bb", "bb", "ccc"])
+        self.assertEqual(fake.calls[-1], ["bb", "ccc"])
+        self.assertEqual([v[0] for v in vectors], [1.0, 2.0, 2.0, 3.0])
+
+    def test_disk_tier_survives_new_instance(self):
+        store = SQLiteEmbeddingStore(self.store_path)
+        CachedEmbeddings(CountingEmbeddings(), "m", store=store).embed_documents(["x", "yy"])
+        store.close()
+
+        fake = CountingEmbeddings()
+        emb = CachedEmbeddings(fake, "m", store=SQLiteEmbeddingStore(self.store_path))
+        self.assertEqual(emb.embed_query("yy"), [2.0, 1.0])
+        self.assertEqual(fake.calls, [])
+        self.assertEqual(emb.stats()["disk_hits"], 1)
+
+    def test_model_name_in_key(self):
+        store = SQLiteEmbeddingStore(self.store_path)
+        CachedEmbeddings(CountingEmbeddings(), "m1", store=store).embed_query("x")
+        fake = CountingEmbeddings()
+        CachedEmbeddings(fake, "m2", store=store).embed_query("x")
+        self.assertEqual(len(fake.calls), 1)
+        store.close()
+
+    def test_instructed_queries_keyed_apart_from_documents(self):
+        class InstructedEmbeddings(CountingEmbeddings):
+            query_instruction = "为这个句子生成表示以用于检索相关文章："
+
+            def embed_query(self, text):
+                self.calls.append([text])
+                return [float(len(text)), 2.0]
+
+        store = SQLiteEmbeddingStore(self.store_path)
+        fake = InstructedEmbeddings()
+        emb = CachedEmbeddings(fake, "m", store=store)
+        self.assertEqual(emb.embed_documents(["ab"]), [[2.0, 1.0]])
+        self.assertEqual(emb.embed_query("ab"), [2.0, 2.0])
+        self.assertEqual(asyncio.run(emb.aembed_query("ab")), [2.0, 2.0])
+        # Across processes too: a document sharing a past query's text gets the document vector
+        fresh = CachedEmbeddings(InstructedEmbeddings(), "m", store=store)
+        self.assertEqual(fresh.embed_documents(["ab"]), [[2.0, 1.0]])
+        self.assertEqual(len(fake.calls), 2)
+        store.close()
+
+    def test_lru_eviction(self):
+        fake = CountingEmbeddings()
+        emb = CachedEmbeddings(fake, "m", max_memory_items=2)
+        for t in ["a", "b", "c", "a"]:
+            emb.embed_query(t)
+        self.assertEqual(len(fake.calls), 4) # "a" was evicted by "c"
+
+    def test_lru_holds_float32_arrays(self):
+        emb = CachedEmbeddings(CountingEmbeddings(), "m")
+        emb.embed_documents(["ab", "cde"])
+        self.assertTrue(all(v.dtype == np.float32 for v in emb._lru.values()))
+        self.assertEqual(emb.embed_query("ab"), [2.0, 1.0])
+        self.assertIsInstance(emb.embed_query("ab"), list)
+
+    def test_async_shares_cache_with_sync(self):
+        fake = CountingEmbeddings()
+        emb = CachedEmbeddings(fake, "m")
+        emb.embed_query("abc")
+        self.assertEqual(asyncio.run(emb.aembed_query("abc")), [3.0, 1.0])
+        asyncio.run(emb.aembed_documents(["abc", "de"]))
+        self.assertEqual(fake.calls, [["abc"], ["de"]])
+
+    def test_async_store_io_runs_off_the_event_loop(self):
+        threads = []
+
+        class RecordingStore:
+            def mget(self, keys):
+                threads.append(threading.current_thread())
+                return [None] * len(keys)
+
+            def mset(self, items):
+                threads.append(threading.current_thread())
+
+        emb = CachedEmbeddings(CountingEmbeddings(), "m", store=RecordingStore())
+
+        async def run():
+            await emb.aembed_query("abc")
+            await emb.aembed_documents(["de", "f"])
+            await emb.aembed_query("abc")  # LRU hit: no store access
+            return threading.current_thread()
+
+        loop_thread = asyncio.run(run())
+        self.assertEqual(len(threads), 4)
+        self.assertNotIn(loop_thread, threads)
+
+class TestMemmapEmbeddingStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store_dir = os.path.join(self.tmp.name, "store")
+
+    def test_bulk_round_trip_across_instances(self):
+        store = MemmapEmbeddingStore(self.store_dir)
+        store.mset([("a", [1.0, 2.0]), ("b", [3.0, 4.0]), ("c", [5.0, 6.0, 7.0])])
+        store.mset([("a", [9.0, 9.0])])  # already stored: kept, not appended
+        self.assertEqual(store.mget(["b", "x", "a", "c"]), [[3.0, 4.0], None, [1.0, 2.0], [5.0, 6.0, 7.0]])
+        store.close()
+
+        reopened = MemmapEmbeddingStore(self.store_dir)
+        self.assertEqual(len(reopened), 3)
+        self.assertIsInstance(reopened.get_arrays(["b"])[0].base, np.memmap)
+        reopened.mset([("d", [7.0, 8.0])])  # remaps after the file grows
+        self.assertEqual(reopened.mget(["d", "a"]), [[7.0, 8.0], [1.0, 2.0]])
+        self.assertEqual(os.path.getsize(os.path.join(self.store_dir, "vectors-2.f32")), 3 * 2 * 4)
+        reopened.close()
+
+    def test_torn_tail_is_truncated(self):
+        store = MemmapEmbeddingStore(self.store_dir)
+        store.mset([("a", [1.0, 2.0])])
+        with open(os.path.join(self.store_dir, "vectors-2.f32"), 'ab') as f:
+            f.write(b"\x00" * 5)  # crashed writer
+        store.mset([("b", [3.0, 4.0])])
+        self.assertEqual(store.mget(["a", "b"]), [[1.0, 2.0], [3.0, 4.0]])
+        store.close()
+
+    def test_cached_embeddings_imports_sqlite_cache_and_keys_dimensions(self):
+        legacy = os.path.join(self.tmp.name, "emb.db")
+        CachedEmbeddings(CountingEmbeddings(), "m", store=SQLiteEmbeddingStore(legacy)).embed_query("xyz")
+        env = {"EMBEDDING_CACHE_PATH": legacy, "EMBEDDING_STORE_DIR": self.store_dir}
+        with mock.patch.dict(os.environ, env):
+            fake = CountingEmbeddings()
+            self.assertEqual(cached_embeddings(fake, "m").embed_query("xyz"), [3.0, 1.0])
+            self.assertEqual(fake.calls, [])
+            # Same model at reduced dimensions: separate vectors
+            fake.dimensions = 256
+            cached_embeddings(fake, "m").embed_query("xyz")
+            self.assertEqual(fake.calls, [["xyz"]])
+
+if __name__ == '__main__':
+    unittest.main()
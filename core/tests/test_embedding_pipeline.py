@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from langchain_openai import OpenAIEmbeddings
+
+from core.embedding_pipeline import EmbeddingPipeline, estimate_tokens, token_batches
+from scripts.fake_openai_server import FakeEmbeddingServer, fake_vector
+
+TEXTS = [f"基金子块{i}：申购赎回规则" * (1 + i % 3) for i in range(40)]
+
+
+def openai_embeddings(server):
+    # No tokenizer download, no client-side retries: the pipeline does the retrying
+    return OpenAIEmbeddings(model="text-embedding-3-small", base_url=server.url, api_key="test",
+                            check_embedding_ctx_length=False, max_retries=0)
+
+
+class TestEmbeddingPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.checkpoint_dir = os.path.join(self.tmp.name, "checkpoints")
+
+    def serve(self, **kwargs):
+        server = FakeEmbeddingServer(dim=8, **kwargs).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def pipeline(self, server, **kwargs):
+        kwargs = dict(dict(max_batch_tokens=60, concurrency=4, base_delay=0.01), **kwargs)
+        return EmbeddingPipeline(openai_embeddings(server), checkpoint_dir=self.checkpoint_dir, **kwargs)
+
+    def test_token_batches(self):
+        batches = token_batches(TEXTS, max_tokens=60, max_size=5)
+        self.assertEqual(sum(batches, []), list(range(len(TEXTS))))
+        for batch in batches:
+            self.assertLessEqual(len(batch), 5)
+            self.assertTrue(len(batch) == 1 or sum(estimate_tokens(TEXTS[i]) for i in batch) <= 60)
+        self.assertEqual(token_batches(["长" * 100, "a"], max_tokens=10), [[0], [1]])
+
+    def test_concurrent_batches_survive_rate_limits(self):
+        server = self.serve(rate_limit_every=3)
+        pipeline = self.pipeline(server)
+        vectors = pipeline.embed(TEXTS)
+
+        np.testing.assert_allclose(vectors, [fake_vector(t, 8) for t in TEXTS], rtol=1e-6)
+        stats = pipeline.stats()
+        self.assertGreater(stats["batches"], 1)
+        self.assertGreater(stats["rate_limited"], 0)
+        self.assertEqual((stats["embedded_texts"], server.texts), (len(TEXTS), len(TEXTS)))
+        self.assertGreater(stats["texts_per_s"], 0)
+        self.assertFalse(os.path.exists(self.checkpoint_dir))  # checkpoints cleared after success
+
+    def test_interrupted_run_resumes_from_checkpoints(self):
+        down = self.serve(fail_after=2)
+        with self.assertRaises(Exception):
+            self.pipeline(down, concurrency=1, max_retries=1).embed(TEXTS)
+        self.assertEqual(len(os.listdir(self.checkpoint_dir)), 2)
+
+        server = self.serve()
+        pipeline = self.pipeline(server, concurrency=1)
+        vectors = pipeline.embed(TEXTS)
+        np.testing.assert_allclose(vectors, [fake_vector(t, 8) for t in TEXTS], rtol=1e-6)
+        stats = pipeline.stats()
+        self.assertEqual(stats["resumed_batches"], 2)
+        self.assertEqual(server.texts + down.texts, len(TEXTS))  # nothing embedded twice
+
+    def test_client_errors_are_not_retried(self):
+        class Rejecting:
+            calls = 0
+
+            def embed_documents(self, texts):
+                Rejecting.calls += 1
+                error = ValueError("invalid input")
+                error.status_code = 400
+                raise error
+
+        with self.assertRaises(ValueError):
+            EmbeddingPipeline(Rejecting(), "m", checkpoint_dir=self.checkpoint_dir, base_delay=0.01).embed(TEXTS[:3])
+        self.assertEqual(Rejecting.calls, 1)
+
+if __name__ == '__main__':
+    unittest.main()
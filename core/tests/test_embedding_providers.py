@@ -0,0 +1,49 @@
+import os
+import importlib.util
+import unittest
+from unittest import mock
+
+from core.embedding_providers import (
+    LOCAL_EMBEDDING_DIR, OPENAI_EMBEDDING_MODEL, LocalEmbeddings, check_index_embeddings, load_embeddings
+)
+
+OPENAI = {"embedding_provider": "openai", "embedding_model": OPENAI_EMBEDDING_MODEL}
+LOCAL = {"embedding_provider": "local", "embedding_model": "bge-small-zh-v1.5"}
+
+
+class TestEmbeddingProviders(unittest.TestCase):
+
+    @mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test", "EMBEDDING_CACHE": "0"})
+    def test_openai_is_default(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("EMBEDDING_PROVIDER", None)
+            embeddings, spec = load_embeddings()
+        self.assertEqual(spec, OPENAI)
+        self.assertEqual(embeddings.model_name, OPENAI_EMBEDDING_MODEL)  # cache keys unchanged
+
+    def test_unknown_provider(self):
+        with self.assertRaises(ValueError):
+            load_embeddings("word2vec")
+
+    def test_manifest_mismatch_fails_fast(self):
+        check_index_embeddings({}, LOCAL)  # no manifest: nothing to compare
+        check_index_embeddings(dict(OPENAI, build_id="x"), OPENAI)
+        # Manifests written before providers existed record only the OpenAI model
+        check_index_embeddings({"embedding_model": OPENAI_EMBEDDING_MODEL}, OPENAI)
+        with self.assertRaisesRegex(ValueError, "EMBEDDING_PROVIDER=openai"):
+            check_index_embeddings({"embedding_model": OPENAI_EMBEDDING_MODEL}, LOCAL)
+        with self.assertRaises(ValueError):
+            check_index_embeddings(LOCAL, OPENAI)
+
+    @unittest.skipUnless(importlib.util.find_spec("sentence_transformers") and os.path.exists(LOCAL_EMBEDDING_DIR),
+                         "needs sentence-transformers and the local model (scripts/download_model.py --embedding)")
+    def test_local_embeddings(self):
+        local = LocalEmbeddings()
+        docs = local.embed_documents(["基金的申购", "基金的赎回"])
+        query = local.embed_query("基金的申购")
+        self.assertEqual(len(docs[0]), local.dimensions)
+        self.assertEqual(len(query), local.dimensions)
+        self.assertAlmostEqual(sum(x * x for x in query), 1.0, places=4)
+
+if __name__ == '__main__':
+    unittest.main()
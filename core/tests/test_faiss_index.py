@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from core.faiss_index import (
+    DEFAULT_PARAMS, resolve_params, build_index, rebuild_vector_store, save_params, load_params
+)
+
+
+def clustered(n=4000, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((20, dim))
+    return (centres[rng.integers(0, 20, n)] + 0.3 * rng.standard_normal((n, dim))).astype(np.float32)
+
+
+class TestFaissIndex(unittest.TestCase):
+
+    def test_types_recall_against_flat(self):
+        vectors = clustered()
+        queries = vectors[:50] + 0.01
+        exact = faiss.IndexFlatL2(vectors.shape[1])
+        exact.add(vectors)
+        _, truth = exact.search(queries, 10)
+        for index_type, overrides, min_recall in (
+            ("hnsw", {}, 0.95), ("ivf_flat", {"nprobe": 8}, 0.9), ("ivf_pq", {"pq_m": 8, "pq_refine": 4}, 0.9)
+        ):
+            params = resolve_params(dict(DEFAULT_PARAMS, index_type=index_type, **overrides), *vectors.shape)
+            index = build_index(vectors, params)
+            self.assertEqual(index.ntotal, len(vectors))
+            _, ids = index.search(queries, 10)
+            recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(ids, truth)])
+            self.assertGreaterEqual(recall, min_recall, index_type)
+
+    def test_resolve_params_clamps_to_corpus_size(self):
+        params = resolve_params(dict(DEFAULT_PARAMS, index_type="ivf_pq", pq_m=8), n=400, dim=32)
+        self.assertEqual(params["nlist"], 400 // 39)
+        self.assertLessEqual(params["nprobe"], params["nlist"])
+        self.assertLess(params["pq_nbits"], 8)
+        with self.assertRaises(ValueError):
+            resolve_params(dict(DEFAULT_PARAMS, index_type="ivf_pq", pq_m=7), n=400, dim=32)
+        with self.assertRaises(ValueError):
+            resolve_params(dict(DEFAULT_PARAMS, index_type="lsh"), n=400, dim=32)
+
+    def test_rebuild_keeps_docstore_mapping(self):
+        texts = [f"基金条款第{i}条" for i in range(500)]
+        store = FAISS.from_texts(texts, DeterministicFakeEmbedding(size=32),
+                                 metadatas=[{"parent_id": f"p{i}"} for i in range(500)])
+        expected = store.similarity_search(texts[123], k=1)[0].metadata
+        params = rebuild_vector_store(store, dict(DEFAULT_PARAMS, index_type="hnsw"))
+        self.assertIsInstance(store.index, faiss.IndexHNSWFlat)
+        self.assertEqual(params["ntotal"], 500)
+        self.assertEqual(store.similarity_search(texts[123], k=1)[0].metadata, expected)
+
+    def test_params_round_trip_with_search_overrides(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(load_params(tmp), {"index_type": "flat"})
+            save_params(tmp, dict(DEFAULT_PARAMS, index_type="ivf_flat", nlist=64))
+            with mock.patch.dict(os.environ, {"FAISS_NPROBE": "32"}):
+                params = load_params(tmp)
+            self.assertEqual((params["index_type"], params["nlist"], params["nprobe"]), ("ivf_flat", 64, 32))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from core.fusion import fuse_parent_scores, rank_parents, shortlist_size
+
+def hits(*pairs):
+    return [{"parent_id": pid, "score": score} for pid, score in pairs]
+
+class TestFusion(unittest.TestCase):
+
+    def test_found_by_both_legs_ranks_first(self):
+        vector = hits(("p1", 0.5), ("p2", 0.6), ("p3", 0.7))
+        keyword = hits(("p3", -8.0), ("p4", -3.0))
+        ranked = rank_parents(fuse_parent_scores(vector, keyword))
+        self.assertEqual(ranked[0], "p3")
+        self.assertEqual(set(ranked), {"p1", "p2", "p3", "p4"})
+
+    def test_parent_scored_by_best_child(self):
+        # p1 has a weak and a strong child; duplicates do not add up within a leg
+        fused = fuse_parent_scores(hits(("p2", 0.4), ("p1", 0.45), ("p1", 0.9)), [], score_weight=0.0)
+        self.assertAlmostEqual(fused["p1"], 1.0 / 62)
+
+    def test_weights(self):
+        vector = hits(("p1", 0.5))
+        keyword = hits(("p2", -5.0))
+        ranked = rank_parents(fuse_parent_scores(vector, keyword, vector_weight=0.2, keyword_weight=1.0))
+        self.assertEqual(ranked, ["p2", "p1"])
+
+    def test_raw_scores_separate_close_and_distant_hits(self):
+        # p2 is almost as close as p1, p3 is far away: pure RRF only sees ranks 2 vs 3
+        vector = hits(("p1", 0.50), ("p2", 0.51), ("p3", 0.90))
+        rrf_only = fuse_parent_scores(vector, [], score_weight=0.0)
+        with_scores = fuse_parent_scores(vector, [], score_weight=1.0)
+        self.assertGreater(with_scores["p2"] - with_scores["p3"], 10 * (rrf_only["p2"] - rrf_only["p3"]))
+
+    def test_shortlist_follows_adaptive_pool(self):
+        self.assertEqual(shortlist_size(20, 20, shortlist=12), 12)  # default pool
+        self.assertEqual(shortlist_size(8, 20, shortlist=12), 8)    # shrink: the pool is smaller
+        self.assertEqual(shortlist_size(30, 20, shortlist=12), 18)  # widen: scaled, not capped at 12
+
+if __name__ == '__main__':
+    unittest.main()
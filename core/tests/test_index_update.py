@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from core.content_ids import assign_parent_ids, child_ids
+from core.faiss_index import DEFAULT_PARAMS, resolve_params, build_index
+from core.index_update import update_index
+from core.sqlite_schema import build_sqlite_v3, KEYWORD_SQL
+from core.cjk_tokenize import match_expression, tokenize
+from core.vector_store import NativeVectorStore, native_maps, write_native_store
+
+EMBEDDING = DeterministicFakeEmbedding(size=16)
+
+
+def corpus(chapters):
+    parents = assign_parent_ids([
+        {"content": f"{name}第{i}段：基金{name}相关规定{i}", "metadata": {"book": "上册", "chapter": name}}
+        for name in chapters for i in range(3)
+    ])
+    children = [{"parent_id": p['parent_id'], "content": text, "metadata": p['metadata']}
+                for p in parents for text in (p['content'][:9], p['content'][6:])]
+    return parents, children
+
+
+class TestIndexUpdate(unittest.TestCase):
+
+    def build(self, parents, children, index_type="flat"):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db = os.path.join(self.tmp.name, "sqlite_v3.db")
+        self.native = os.path.join(self.tmp.name, "faiss_native")
+        build_sqlite_v3(parents, children, self.db)
+        vectors = np.array(EMBEDDING.embed_documents([c['content'] for c in children]), dtype=np.float32)
+        params = resolve_params(dict(DEFAULT_PARAMS, index_type=index_type), *vectors.shape)
+        write_native_store(build_index(vectors, params), *native_maps(parents, children), self.native, params)
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return EMBEDDING.embed_documents(texts)
+
+    def search(self, text):
+        conn = sqlite3.connect(self.db)
+        conn.row_factory = sqlite3.Row
+
+        def texts(ids):
+            marks = ','.join('?' * len(ids))
+            return dict(conn.execute(f"SELECT id, content FROM children WHERE id IN ({marks})", ids).fetchall())
+
+        hit = NativeVectorStore(self.native, child_texts=texts).search_by_vector(EMBEDDING.embed_query(text), 1)[0]
+        keyword = conn.execute(KEYWORD_SQL, (match_expression(tokenize(text)), 5)).fetchall()
+        conn.close()
+        return hit, {row['parent_id'] for row in keyword}
+
+    def test_content_ids_are_deterministic(self):
+        self.assertEqual(corpus(["第1章"]), corpus(["第1章"]))
+        parents, children = corpus(["第1章"])
+        self.assertEqual(len(set(child_ids(children))), len(children))
+
+    def check_update(self, index_type):
+        self.embedded = []
+        parents, children = corpus(["第1章", "第2章"])
+        self.build(parents, children, index_type)
+
+        new_parents, new_children = corpus(["第1章", "第3章"])  # chapter 2 dropped, chapter 3 added
+        stats = update_index(new_parents, new_children, self.embed, self.db, self.native)
+        self.assertEqual((stats["added_parents"], stats["removed_parents"]), (3, 3))
+        self.assertEqual((stats["added_children"], stats["removed_children"], stats["kept_children"]), (6, 6, 6))
+        # Only the new chapter is embedded
+        self.assertEqual(sorted(self.embedded), sorted(c['content'] for c in new_children if "第3章" in c['content']))
+
+        added = new_children[-1]
+        hit, keyword_parents = self.search(added['content'])
+        self.assertEqual((hit["parent_id"], hit["child_content"]), (added['parent_id'], added['content']))
+        self.assertIn(added['parent_id'], keyword_parents)
+        removed = children[-1]
+        hit, keyword_parents = self.search(removed['content'])
+        self.assertNotEqual(hit["parent_id"], removed['parent_id'])
+        self.assertNotIn(removed['parent_id'], keyword_parents)
+
+        conn = sqlite3.connect(self.db)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM children").fetchone()[0], len(new_children))
+        self.assertEqual({r[0] for r in conn.execute("SELECT chapter FROM sections")}, {"第1章", "第3章"})
+        conn.close()
+
+        # A second run with the same corpus is a no-op
+        self.embedded = []
+        stats = update_index(new_parents, new_children, self.embed, self.db, self.native)
+        self.assertEqual((stats["added_children"], stats["removed_children"], self.embedded), (0, 0, []))
+        self.assertEqual(len(NativeVectorStore(self.native)), len(new_children))
+
+    def test_update_flat(self):
+        self.check_update("flat")
+
+    def test_update_hnsw_rebuilds_without_reembedding(self):
+        self.check_update("hnsw")
+
+    def test_deleted_child_ids_are_not_reused(self):
+        self.embedded = []
+        parents, children = corpus(["第1章", "第2章"])
+        self.build(parents, children)
+
+        # Drop the highest children (chapter 2), then add chapter 3 in a later run
+        update_index(*corpus(["第1章"]), self.embed, self.db, self.native)
+        update_index(*corpus(["第1章", "第3章"]), self.embed, self.db, self.native)
+        conn = sqlite3.connect(self.db)
+        new_ids = [cid for cid, in conn.execute("SELECT c.id FROM children c JOIN parents p ON p.id = c.parent_id "
+                                                "JOIN sections s ON s.id = p.section_id WHERE s.chapter = '第3章'")]
+        conn.close()
+        self.assertEqual(len(new_ids), 6)
+        self.assertGreater(min(new_ids), len(children))
+
+if __name__ == '__main__':
+    unittest.main()
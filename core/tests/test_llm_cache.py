@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+import core.llm_cache
+from core.llm_cache import SQLiteLLMCache
+from core.llm_factory import chat_llm_kwargs
+from core.tests.rag_stub import stub_rag
+
+
+def fake_llm(cache, responses=("答案A", "答案B", "答案C")):
+    return FakeListChatModel(responses=list(responses), cache=cache)
+
+
+class TestLLMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "llm_cache.db")
+
+    def test_repeated_prompt_is_served_from_disk(self):
+        cache = SQLiteLLMCache(self.path)
+        llm = fake_llm(cache)
+        self.assertEqual(llm.invoke("什么是ETF").content, "答案A")
+        self.assertEqual(llm.invoke("什么是ETF").content, "答案A")
+        self.assertEqual(llm.invoke("什么是LOF").content, "答案B")  # changed prompt: API call
+        cache.close()
+
+        # New process, same model and parameters
+        reopened = SQLiteLLMCache(self.path)
+        self.assertEqual(fake_llm(reopened).invoke("什么是ETF").content, "答案A")
+        # Other generation parameters are another key
+        self.assertEqual(fake_llm(reopened, responses=("答案X",)).invoke("什么是ETF").content, "答案X")
+        self.assertEqual(reopened.stats()["hits"], 1)
+        reopened.close()
+
+    def test_factory_caches_deterministic_calls_only(self):
+        with mock.patch.object(core.llm_cache, "_cache", None), \
+                mock.patch.dict(os.environ, {"LLM_CACHE": "1", "LLM_CACHE_PATH": self.path}):
+            self.assertIsInstance(chat_llm_kwargs(0.0)["cache"], SQLiteLLMCache)
+            self.assertNotIn("cache", chat_llm_kwargs(0.7))
+            core.llm_cache._cache.close()
+        with mock.patch.dict(os.environ, {"LLM_CACHE": "0"}):
+            self.assertNotIn("cache", chat_llm_kwargs(0.0))
+
+    def test_query_uses_cache_instead_of_streaming(self):
+        cache = SQLiteLLMCache(self.path)
+        self.addCleanup(cache.close)
+
+        async def retrieve(trace, question, timings):
+            return "std", [{"parent_id": "p1", "content": "正文", "metadata": {}}]
+
+        chain = PromptTemplate.from_template("{context}{question}") | fake_llm(cache) | StrOutputParser()
+        rag = stub_rag(llm_cache=cache, _aretrieve_traced=retrieve, std_chain=chain, calc_chain=chain)
+
+        first = rag.query("什么是ETF")
+        self.assertEqual(rag.query("什么是ETF")["full_response"], first["full_response"])
+        self.assertEqual(cache.stats()["hits"], 1)
+        chunks = list(rag.query_stream("什么是ETF"))
+        self.assertEqual([c["content"] for c in chunks if c["type"] == "chunk"], [first["full_response"]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import time
+import tempfile
+import unittest
+from multiprocessing import get_context
+from core.parent_store import ParentStore, write_parent_store
+
+META = {"book": "证券投资基金上册", "chapter": "第1章", "section": "第一节",
+        "figure_ref": None, "chunk_type": "text", "exam_priority": 1}
+
+PARENTS = [
+    {"parent_id": "b-2", "content": "封闭式基金在交易所上市交易。", "metadata": dict(META, split_part=2)},
+    {"parent_id": "a-1", "content": "开放式基金的申购费率一般较低。", "metadata": META},
+    {"parent_id": "c-3", "content": "ETF 申购赎回清单", "metadata": dict(META, section="第二节")},
+]
+
+def _read_in_child(path, queue):
+    queue.put(ParentStore(path).get(["c-3"])["c-3"]["content"])
+
+class TestParentStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "parent_store.bin")
+        write_parent_store(PARENTS, self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_matches_get_parents_shape(self):
+        store = ParentStore(self.path)
+        self.assertEqual(len(store), 3)
+        found = store.get(["a-1", "b-2", "missing", "a-1-but-longer"])
+        self.assertEqual(set(found), {"a-1", "b-2"})
+        self.assertEqual(found["a-1"], {"content": PARENTS[1]["content"], "metadata": META})
+        self.assertEqual(found["b-2"]["metadata"]["split_part"], 2)
+        self.assertEqual(store.get([]), {})
+
+    def test_empty_store(self):
+        write_parent_store([], self.path)
+        self.assertEqual(ParentStore(self.path).get(["a-1"]), {})
+
+    def test_rebuild_is_picked_up(self):
+        store = ParentStore(self.path)
+        time.sleep(0.01)
+        write_parent_store([dict(PARENTS[0], content="新内容")], self.path)
+        self.assertEqual(store.get(["b-2"])["b-2"]["content"], "新内容")
+        self.assertEqual(store.get(["a-1"]), {})
+
+    def test_shared_across_processes(self):
+        ctx = get_context("spawn")
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_read_in_child, args=(self.path, queue))
+        proc.start()
+        self.assertEqual(queue.get(timeout=60), "ETF 申购赎回清单")
+        proc.join()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import time
+import asyncio
+import threading
+import unittest
+from concurrent.futures import TimeoutError as FutureTimeout
+from core.rerank_batcher import RerankBatcher
+
+class TestRerankBatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        def predict(pairs):
+            self.calls.append(len(pairs))
+            time.sleep(0.01) # Simulate a forward pass
+            return [float(len(doc)) for _, doc in pairs]
+        self.predict = predict
+
+    def test_scores_map_back_to_callers(self):
+        batcher = RerankBatcher(self.predict, max_batch_size=64, max_wait_ms=20)
+        results = {}
+        def worker(i):
+            results[i] = batcher.score([("q", "x" * i), ("q", "y" * (i + 1))])
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(1, 9)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        batcher.close()
+
+        for i in range(1, 9):
+            self.assertEqual(results[i], [float(i), float(i + 1)])
+        # 8 concurrent requests coalesced into fewer forward passes
+        self.assertLess(len(self.calls), 8)
+        m = batcher.metrics()
+        self.assertEqual(m["requests"], 8)
+        self.assertEqual(m["pairs_scored"], 16)
+        self.assertEqual(m["queue_depth"], 0)
+
+    def test_max_batch_size_caps_collection(self):
+        # Requests that don't divide the cap: appending whole requests would overshoot it
+        batcher = RerankBatcher(self.predict, max_batch_size=64, max_wait_ms=50)
+        futures = [batcher.submit([("q", "x" * i)] * 20) for i in range(8)]
+        for i, f in enumerate(futures):
+            self.assertEqual(f.result(timeout=5), [float(i)] * 20)
+        batcher.close()
+        self.assertTrue(all(n <= 64 for n in self.calls), self.calls)
+        self.assertEqual(sum(self.calls), 160)
+        self.assertEqual(batcher.metrics()["queue_depth"], 0)
+
+    def test_oversized_request_is_chunked(self):
+        batcher = RerankBatcher(self.predict, max_batch_size=4, max_wait_ms=1)
+        self.assertEqual(batcher.score([("q", "ab")] * 10), [2.0] * 10)
+        batcher.close()
+        self.assertEqual(self.calls, [4, 4, 2])
+
+    def test_async_and_empty(self):
+        batcher = RerankBatcher(self.predict, max_wait_ms=1)
+        async def run():
+            return await asyncio.gather(batcher.ascore([("q", "abc")]), batcher.ascore([]))
+        self.assertEqual(asyncio.run(run()), [[3.0], []])
+        batcher.close()
+
+    def test_cancelled_requests_do_not_stop_the_worker(self):
+        started, release = threading.Event(), threading.Event()
+        def predict(pairs):
+            started.set()
+            release.wait(5)
+            return [1.0] * len(pairs)
+        batcher = RerankBatcher(predict, max_wait_ms=1)
+
+        async def run():
+            in_flight = asyncio.ensure_future(batcher.ascore([("q", "a")]))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            queued = asyncio.ensure_future(batcher.ascore([("q", "b")]))
+            await asyncio.sleep(0.01)
+            in_flight.cancel()  # e.g. a client dropped mid-stream
+            queued.cancel()
+            await asyncio.gather(in_flight, queued, return_exceptions=True)
+            release.set()
+            return await asyncio.wait_for(batcher.ascore([("q", "c")]), 5)
+
+        self.assertEqual(asyncio.run(run()), [1.0])
+        self.assertTrue(batcher._worker.is_alive())
+        m = batcher.metrics()
+        self.assertEqual((m["requests_cancelled"], m["queue_depth"]), (1, 0))
+        batcher.close()
+
+    def test_score_times_out(self):
+        release = threading.Event()
+        batcher = RerankBatcher(lambda pairs: release.wait(5) and [0.0] * len(pairs), max_wait_ms=1)
+        with self.assertRaises(FutureTimeout):
+            batcher.score([("q", "a")], timeout=0.05)
+        release.set()
+        self.assertEqual(batcher.score([("q", "b")]), [0.0])
+        batcher.close()
+
+    def test_error_propagates(self):
+        def boom(pairs):
+            raise ValueError("model error")
+        batcher = RerankBatcher(boom, max_wait_ms=1)
+        with self.assertRaises(ValueError):
+            batcher.score([("q", "a")])
+        self.assertEqual(batcher.metrics()["queue_depth"], 0)
+        batcher.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import asyncio
+import tempfile
+import threading
+import unittest
+from core.rerank_cache import RerankScoreCache
+from core.index_manifest import write_manifest, load_manifest, index_fingerprint
+
+class TestRerankScoreCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "rerank.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_memory_hits_use_normalized_query(self):
+        cache = RerankScoreCache("m|b1")
+        cache.put_many("开放式基金 申购费率？", {"p1": 0.9, "p2": 0.1})
+        found = cache.get_many("  开放式基金\n申购费率？", ["p1", "p2", "p3"])
+        self.assertEqual(found, {"p1": 0.9, "p2": 0.1})
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_bounded(self):
+        cache = RerankScoreCache("m|b1", max_items=2)
+        cache.put_many("q", {"p1": 1.0, "p2": 2.0, "p3": 3.0})
+        self.assertEqual(cache.get_many("q", ["p1", "p2", "p3"]), {"p2": 2.0, "p3": 3.0})
+
+    def test_persistent_same_namespace(self):
+        RerankScoreCache("m|b1", path=self.path).put_many("q", {"p1": 0.5})
+        cache = RerankScoreCache("m|b1", path=self.path)
+        self.assertEqual(cache.get_many("q", ["p1"]), {"p1": 0.5})
+
+    def test_namespaces_share_a_file(self):
+        RerankScoreCache("torch|b1", path=self.path).put_many("q", {"p1": 0.5})
+        # Another backend / index build sees nothing, and opening it keeps the other rows
+        onnx = RerankScoreCache("onnx-int8|b1", path=self.path)
+        self.assertEqual(onnx.get_many("q", ["p1"]), {})
+        onnx.put_many("q", {"p1": 0.7})
+        self.assertEqual(RerankScoreCache("torch|b1", path=self.path).get_many("q", ["p1"]), {"p1": 0.5})
+        self.assertEqual(RerankScoreCache("onnx-int8|b1", path=self.path).get_many("q", ["p1"]), {"p1": 0.7})
+
+    def test_disk_rows_evicted_by_age_and_count(self):
+        cache = RerankScoreCache("m|b1", path=self.path)
+        cache.put_many("q1", {"p1": 0.1})
+        cache.put_many("q2", {"p1": 0.2})
+        cache.put_many("q3", {"p1": 0.3})
+        cache.close()
+        trimmed = RerankScoreCache("m|b2", path=self.path, max_disk_items=2)
+        trimmed.close()
+        fresh = RerankScoreCache("m|b1", path=self.path)
+        self.assertEqual(fresh.get_many("q1", ["p1"]), {})  # oldest beyond the limit
+        self.assertEqual(fresh.get_many("q3", ["p1"]), {"p1": 0.3})
+        fresh.close()
+        expired = RerankScoreCache("m|b1", path=self.path, max_age_s=0)
+        self.assertEqual(expired.get_many("q3", ["p1"]), {})
+
+    def test_async_disk_tier_runs_off_the_event_loop(self):
+        threads = []
+
+        def record_disk_calls(cache):
+            for name in ("_get_disk", "_put_disk"):
+                method = getattr(cache, name)
+                setattr(cache, name, lambda *a, m=method: threads.append(threading.current_thread()) or m(*a))
+            return cache
+
+        cache = record_disk_calls(RerankScoreCache("m|b1", path=self.path))
+
+        async def run():
+            await cache.aput_many("q", {"p1": 0.5})
+            return await cache.aget_many("q", ["p1"])
+
+        self.assertEqual(asyncio.run(run()), {"p1": 0.5})
+        self.assertEqual(len(threads), 1)  # the write; the read was a memory hit
+        cold = record_disk_calls(RerankScoreCache("m|b1", path=self.path))
+        self.assertEqual(asyncio.run(cold.aget_many("q", ["p1", "p2"])), {"p1": 0.5})
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.main_thread(), threads)
+        cache.close()
+        cold.close()
+
+class TestIndexManifest(unittest.TestCase):
+
+    def test_build_id_changes_per_write(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.assertEqual(load_manifest(d), {})
+            first = write_manifest(d, {"embedding_model": "m"})
+            second = write_manifest(d, {"children": 3})
+            self.assertNotEqual(first["build_id"], second["build_id"])
+            self.assertEqual(load_manifest(d)["embedding_model"], "m")
+            self.assertEqual(index_fingerprint(d), second["build_id"])
+
+    def test_fallback_fingerprint(self):
+        with tempfile.TemporaryDirectory() as d:
+            db = os.path.join(d, "x.db")
+            with open(db, "w") as f:
+                f.write("a")
+            fp1 = index_fingerprint(d, [db])
+            with open(db, "w") as f:
+                f.write("abc")
+            self.assertNotEqual(fp1, index_fingerprint(d, [db]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import time
+import tempfile
+import unittest
+
+from core.reranker_backends import model_version, weights_fingerprint
+
+
+class TestModelVersion(unittest.TestCase):
+
+    def test_version_changes_with_weights_and_path(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, "model.onnx")
+            with open(model_path, 'wb') as f:
+                f.write(b"v1")
+            before = model_version(model_path, "onnx")
+            self.assertIn("model.onnx:onnx:", before)
+
+            # Re-exported in place: same path, new weights
+            time.sleep(0.01)
+            with open(model_path, 'wb') as f:
+                f.write(b"v2-longer")
+            self.assertNotEqual(model_version(model_path, "onnx"), before)
+            self.assertNotEqual(model_version(model_path, "onnx-int8"), model_version(model_path, "onnx"))
+
+    def test_directory_fingerprint_covers_weight_files_only(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "model.safetensors"), 'wb') as f:
+                f.write(b"weights")
+            fingerprint = weights_fingerprint(tmp)
+            with open(os.path.join(tmp, "README.md"), 'w') as f:
+                f.write("notes")
+            self.assertEqual(weights_fingerprint(tmp), fingerprint)
+            with open(os.path.join(tmp, "model.safetensors"), 'ab') as f:
+                f.write(b"+")
+            self.assertNotEqual(weights_fingerprint(tmp), fingerprint)
+
+if __name__ == '__main__':
+    unittest.main()
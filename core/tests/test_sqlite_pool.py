@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from core.sqlite_pool import SQLiteReadPool
+
+class TestSQLiteReadPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "test.db")
+        self._create_db("v1")
+        self.pool = SQLiteReadPool(self.db_path)
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def _create_db(self, value: str):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE t (v TEXT)")
+        conn.execute("INSERT INTO t VALUES (?)", (value,))
+        conn.commit()
+        conn.close()
+
+    def test_connection_reused_within_thread(self):
+        self.assertIs(self.pool.connection(), self.pool.connection())
+        rows = self.pool.execute("SELECT v FROM t")
+        self.assertEqual(rows[0]['v'], "v1")
+
+    def test_connection_per_thread(self):
+        conns = []
+        def worker():
+            conns.append(self.pool.connection())
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        self.assertIsNot(conns[0], self.pool.connection())
+
+    def test_read_only(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            self.pool.execute("INSERT INTO t VALUES ('x')")
+
+    def test_reopens_after_rebuild(self):
+        self.assertEqual(self.pool.execute("SELECT v FROM t")[0]['v'], "v1")
+        os.remove(self.db_path)
+        self._create_db("v2")
+        self.assertEqual(self.pool.execute("SELECT v FROM t")[0]['v'], "v2")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import json
+import sqlite3
+import tempfile
+import unittest
+from core.sqlite_schema import (
+    migrate_v2_to_v3, schema_version, row_metadata, clean_chapter_name, KEYWORD_SQL, PARENTS_SQL
+)
+from core.cjk_tokenize import match_expression, query_terms
+
+META_A = {"book": "证券投资基金上册", "chapter": "第6章 投资管理基础 151", "section": "第一节",
+          "figure_ref": None, "chunk_type": "text", "exam_priority": 1}
+META_B = dict(META_A, section="第二节", split_part=2)
+
+PARENTS = [
+    {"parent_id": "uuid-a", "content": "开放式基金的申购费率一般较低。", "metadata": META_A},
+    {"parent_id": "uuid-b", "content": "封闭式基金在交易所上市交易。", "metadata": META_B},
+]
+
+def build_v2(path):
+    """Minimal build_index_v2.build_sqlite_v2 layout (JSON metadata on every row)."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE doc_parents (id TEXT PRIMARY KEY, content TEXT, metadata TEXT)")
+    conn.execute("CREATE VIRTUAL TABLE doc_children_fts USING fts5(content, parent_id, metadata)")
+    for p in PARENTS:
+        meta = json.dumps(p["metadata"], ensure_ascii=False)
+        conn.execute("INSERT INTO doc_parents VALUES (?, ?, ?)", (p["parent_id"], p["content"], meta))
+        conn.execute("INSERT INTO doc_children_fts VALUES (?, ?, ?)", (p["content"], p["parent_id"], meta))
+    conn.commit()
+    conn.close()
+
+class TestSchemaV3(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.v2 = os.path.join(self.tmp.name, "sqlite_v2.db")
+        self.v3 = os.path.join(self.tmp.name, "sqlite_v3.db")
+        build_v2(self.v2)
+        self.assertEqual(migrate_v2_to_v3(self.v2, self.v3), (2, 2))
+        self.conn = sqlite3.connect(self.v3)
+        self.conn.row_factory = sqlite3.Row
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_version_and_interned_sections(self):
+        self.assertEqual(schema_version(self.conn), 3)
+        rows = self.conn.execute("SELECT chapter_clean FROM sections").fetchall()
+        self.assertEqual([r[0] for r in rows], ["第6章 投资管理基础"] * 2)
+        # Children reference parents by integer id
+        self.assertEqual(self.conn.execute("SELECT typeof(parent_id) FROM children").fetchone()[0], "integer")
+
+    def test_parents_metadata_roundtrip(self):
+        rows = self.conn.execute(PARENTS_SQL.format(placeholders="?,?"), ["uuid-a", "uuid-b"]).fetchall()
+        by_id = {r["id"]: row_metadata(r) for r in rows}
+        self.assertEqual(by_id, {"uuid-a": META_A, "uuid-b": META_B})
+
+    def test_keyword_search(self):
+        expr = match_expression(query_terms("关于封闭式基金上市交易的说法正确的是"))
+        rows = self.conn.execute(KEYWORD_SQL, (expr, 5)).fetchall()
+        self.assertEqual(rows[0]["parent_id"], "uuid-b")
+        self.assertEqual(rows[0]["content"], PARENTS[1]["content"])
+        self.assertEqual(row_metadata(rows[0]), META_B)
+
+    def test_clean_chapter_name(self):
+        self.assertEqual(clean_chapter_name("第6章 投资管理基础　151 "), "第6章 投资管理基础")
+        self.assertEqual(clean_chapter_name(""), "Unknown Chapter")
+
+if __name__ == '__main__':
+    unittest.main()
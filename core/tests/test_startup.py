@@ -0,0 +1,18 @@
+import sys
+import subprocess
+import unittest
+
+# Imported on first use, not by `import rag_pipeline_v3` (see scripts/profile_startup.py)
+HEAVY = ("faiss", "langchain_openai", "langchain_community", "openai")
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_pipeline_import_is_lazy(self):
+        code = ("import sys, rag_pipeline_v3\n"
+                f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))")
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "")
+
+if __name__ == '__main__':
+    unittest.main()
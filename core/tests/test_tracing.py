@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+import unittest
+import urllib.request
+
+from langchain_core.language_models import FakeStreamingListLLM
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+from core.tracing import RequestTrace, Tracer, TraceLogWriter, current_trace, trace_span
+from core.tests.rag_stub import stub_rag
+from rag_pipeline_v3 import FundRAG
+
+STAGES = {"classify", "vector_leg", "keyword_leg", "get_parents", "rerank", "format_context",
+          "llm_ttft", "llm_generation"}
+
+
+def traced_rag(tracer: Tracer, answer: str = "答案：A\n解析：申购按金额") -> FundRAG:
+    """FundRAG with stubbed legs / parents / rerank and a fake streaming LLM."""
+    async def vector(query, k=5):
+        await asyncio.sleep(0.01)
+        return [{"parent_id": "p1", "child_content": "申购", "source": "vector", "score": 0.1}]
+
+    async def keyword(query, k=5):
+        return [{"parent_id": "p2", "child_content": "赎回", "source": "keyword", "score": -3.0}]
+
+    async def rerank(query, docs):
+        return docs
+
+    chain = PromptTemplate.from_template("{context}{question}") | FakeStreamingListLLM(responses=[answer]) \
+        | StrOutputParser()
+    return stub_rag(
+        tracer=tracer, asearch_child_vector=vector, asearch_child_keyword=keyword, _arerank_docs=rerank,
+        get_parents=lambda ids: {pid: {"content": f"{pid}正文", "metadata": {"book": "上册"}} for pid in ids},
+        std_chain=chain, calc_chain=chain
+    )
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.log_path = os.path.join(self.tmp.name, "traces.jsonl")
+
+    def test_spans_and_histograms(self):
+        tracer = Tracer(self.log_path)
+        trace = RequestTrace()
+        trace.attrs["pipeline"] = "std"
+        with trace.span("classify"):
+            pass
+        with trace.span("rerank", docs=3) as span:
+            time.sleep(0.02)
+            span["cached"] = 1
+        tracer.record(trace)
+
+        spans = {s["name"]: s for s in trace.to_dict()["spans"]}
+        self.assertGreaterEqual(spans["rerank"]["duration_ms"], 20)
+        self.assertEqual((spans["rerank"]["docs"], spans["rerank"]["cached"]), (3, 1))
+        text = tracer.prometheus_text()
+        self.assertIn('fundrag_stage_duration_seconds_bucket{stage="rerank",le="0.025"} 1', text)
+        self.assertIn('fundrag_stage_duration_seconds_count{stage="classify"} 1', text)
+        self.assertIn('fundrag_request_duration_seconds_count{pipeline="std"} 1', text)
+        self.assertTrue(tracer.flush(timeout=5))
+        with open(self.log_path, encoding='utf-8') as f:
+            self.assertEqual(json.loads(f.readline())["trace_id"], trace.trace_id)
+
+    def test_trace_span_without_trace_is_noop(self):
+        self.assertIsNone(current_trace.get())
+        with trace_span("get_parents") as span:
+            span["parents"] = 1
+
+    def test_query_and_stream_carry_every_stage(self):
+        tracer = Tracer(self.log_path)
+        rag = traced_rag(tracer)
+
+        result = rag.query("开放式基金的申购费用如何计算？")
+        self.assertEqual(result["full_response"], "答案：A\n解析：申购按金额")
+        trace = result["trace"]
+        self.assertEqual(trace["pipeline"], result["pipeline"])
+        self.assertEqual({s["name"] for s in trace["spans"]}, STAGES)
+        generation = next(s for s in trace["spans"] if s["name"] == "llm_generation")
+        self.assertGreater(generation["output_tokens"], 0)
+
+        chunks = list(rag.query_stream("基金的赎回"))
+        self.assertEqual("".join(c["content"] for c in chunks if c["type"] == "chunk"), "答案：A\n解析：申购按金额")
+        self.assertEqual({s["name"] for s in chunks[-1]["trace"]["spans"]}, STAGES)
+
+        self.assertTrue(tracer.flush(timeout=5))
+        with open(self.log_path, encoding='utf-8') as f:
+            self.assertEqual([json.loads(line)["request"] for line in f], ["query", "query_stream"])
+        self.assertIn('fundrag_stage_duration_seconds_count{stage="vector_leg"} 2', tracer.prometheus_text())
+
+    def test_log_rotates_by_size(self):
+        writer = TraceLogWriter(self.log_path, max_bytes=100, backups=2)
+        for i in range(8):
+            writer.write(json.dumps({"i": i, "pad": "x" * 40}) + "\n")
+            self.assertTrue(writer.flush(timeout=5))
+        files = sorted(os.listdir(self.tmp.name))
+        self.assertEqual(files, ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"])
+        with open(self.log_path, encoding='utf-8') as f:
+            self.assertEqual([json.loads(line)["i"] for line in f], [6, 7])
+
+    def test_metrics_endpoint(self):
+        tracer = Tracer(None)
+        server = tracer.serve(0, host="127.0.0.1")
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            self.assertIn("text/plain", response.headers["Content-Type"])
+            self.assertIn(b"# TYPE fundrag_stage_duration_seconds histogram", response.read())
+
+if __name__ == '__main__':
+    unittest.main()
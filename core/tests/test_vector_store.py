@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from core.faiss_index import DEFAULT_PARAMS, rebuild_vector_store
+from core.vector_store import NativeVectorStore, native_maps, write_native_store
+
+PARENTS = [{"parent_id": f"p{i}", "content": f"父块{i}", "metadata": {}} for i in range(30)]
+CHILDREN = [{"parent_id": f"p{i // 4}", "content": f"基金子块{i}"} for i in range(120)]
+EMBEDDING = DeterministicFakeEmbedding(size=16)
+
+
+def langchain_store():
+    return FAISS.from_texts([c['content'] for c in CHILDREN], EMBEDDING,
+                            metadatas=[{"parent_id": c['parent_id']} for c in CHILDREN])
+
+
+class TestNativeVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        # children.id = position + 1, as in SQLite v3
+        self.texts = {i + 1: c['content'] for i, c in enumerate(CHILDREN)}
+
+    def test_hits_match_langchain_store(self):
+        store = langchain_store()
+        write_native_store(store.index, *native_maps(PARENTS, CHILDREN), self.tmp.name)
+        native = NativeVectorStore(self.tmp.name, child_texts=lambda ids: {i: self.texts[i] for i in ids})
+
+        vec = EMBEDDING.embed_query("基金子块42")
+        expected = store.similarity_search_with_score_by_vector(vec, 5)
+        hits = native.search_by_vector(vec, 5)
+        self.assertEqual([(h["parent_id"], h["child_content"]) for h in hits],
+                         [(d.metadata["parent_id"], d.page_content) for d, _ in expected])
+        self.assertAlmostEqual(hits[0]["score"], float(expected[0][1]), places=4)
+        self.assertEqual(hits[0]["source"], "vector")
+        self.assertIsInstance(native.row_child, np.memmap)
+
+    def test_without_child_texts_and_unmapped_rows(self):
+        store = langchain_store()
+        row_child, child_parent, parent_ids = native_maps(PARENTS[:10], CHILDREN)  # p10.. unknown
+        write_native_store(store.index, row_child, child_parent, parent_ids, self.tmp.name)
+        hits = NativeVectorStore(self.tmp.name).search_by_vector(EMBEDDING.embed_query("基金子块100"), 1)
+        self.assertEqual((hits[0]["child_id"], hits[0]["parent_id"], hits[0]["child_content"]), (101, None, None))
+
+    def test_approximate_index_params_reapplied(self):
+        store = langchain_store()
+        params = rebuild_vector_store(store, dict(DEFAULT_PARAMS, index_type="hnsw", ef_search=48))
+        write_native_store(store.index, *native_maps(PARENTS, CHILDREN), self.tmp.name, params)
+        native = NativeVectorStore(self.tmp.name)
+        self.assertEqual(native.index.hnsw.efSearch, 48)
+        self.assertEqual(len(native), len(CHILDREN))
+
+    def test_row_count_mismatch_rejected(self):
+        store = langchain_store()
+        with self.assertRaises(ValueError):
+            write_native_store(store.index, *native_maps(PARENTS, CHILDREN[:-1]), self.tmp.name)
+
+if __name__ == '__main__':
+    unittest.main()
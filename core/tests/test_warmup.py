@@ -0,0 +1,74 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from core.tests.rag_stub import stub_rag
+from core.warmup import Readiness, touch_pages
+from rag_pipeline_v3 import WARMUP_RERANK_PAIRS
+
+
+class SlowReranker:
+    model_version = "fake-reranker"
+    loads = 0
+
+    def __init__(self):
+        SlowReranker.loads += 1
+        time.sleep(0.1)
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32):
+        self.batches.append(len(pairs))
+        return [0.0] * len(pairs)
+
+
+class TestWarmup(unittest.TestCase):
+
+    def test_readiness_states(self):
+        readiness = Readiness()
+        self.assertEqual(readiness.status(), {"state": "ready", "tasks": {}})
+        gate = threading.Event()
+        readiness.start("slow", lambda: gate.wait() and {"n": 1})
+        readiness.start("broken", lambda: 1 / 0)
+        self.assertEqual(readiness.state, "warming")
+        self.assertFalse(readiness.wait(timeout=0.05))
+        gate.set()
+        self.assertTrue(readiness.wait(timeout=5))
+        status = readiness.status()
+        self.assertEqual(status["state"], "degraded")
+        self.assertEqual((status["tasks"]["slow"]["state"], status["tasks"]["slow"]["n"]), ("done", 1))
+        self.assertIn("division", status["tasks"]["broken"]["error"])
+
+    def test_touch_pages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "index"))
+            with open(os.path.join(tmp, "index", "a.bin"), 'wb') as f:
+                f.write(b"x" * 3000)
+            with open(os.path.join(tmp, "db"), 'wb') as f:
+                f.write(b"y" * 100)
+            paths = [os.path.join(tmp, "index"), os.path.join(tmp, "db"), os.path.join(tmp, "missing")]
+            self.assertEqual(touch_pages(paths), 3100)
+
+    def test_query_during_warmup_waits_for_single_load(self):
+        SlowReranker.loads = 0
+        rag = stub_rag()
+        with mock.patch("core.reranker_backends.load_reranker", SlowReranker), \
+                mock.patch.dict(os.environ, {"RERANK_CACHE": "0"}):
+            rag.start_warmup()
+            self.assertEqual(rag.readiness.state, "warming")
+            time.sleep(0.02)
+            rag.ensure_reranker()  # a query's lazy load: blocks on the warm-up load
+            self.assertIsNotNone(rag.reranker)
+            self.assertTrue(rag.readiness.wait(timeout=5))
+
+        self.assertEqual(SlowReranker.loads, 1)
+        # The dummy batch ran before the reranker was handed to queries
+        self.assertEqual(rag.reranker.batches, [len(WARMUP_RERANK_PAIRS)])
+        status = rag.readiness.status()
+        self.assertEqual(status["state"], "ready")
+        self.assertEqual(status["tasks"]["reranker"]["backend"], "fake-reranker")
+
+if __name__ == '__main__':
+    unittest.main()
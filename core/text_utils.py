@@ -0,0 +1,23 @@
+"""
+Text helpers shared by the caches, the keyword index and tracing.
+
+Standard library only: modules that need them (core.cjk_tokenize,
+core.rerank_cache, core.tracing) stay cheap to import.
+"""
+import re
+import unicodedata
+
+# CJK punctuation, unified ideographs (+ extension A) and full-width forms
+_CJK = re.compile("[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+
+def normalize_text(text: str) -> str:
+    """NFKC + collapse whitespace, so trivially different inputs share a cache key."""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough cl100k count without the tokenizer download: ~1 token per CJK char, ~4 chars per token otherwise."""
+    cjk = len(_CJK.findall(text))
+    return max(1, cjk + (len(text) - cjk + 3) // 4)
@@ -0,0 +1,318 @@
+"""
+Per-request stage timing for FundRAG.
+
+Each query gets a RequestTrace; stages record spans into it (start offset and
+duration in ms, plus attributes such as hit counts or tokens/s):
+
+    classify, vector_leg, keyword_leg, get_parents, rerank, format_context,
+    llm_ttft (request to first token), llm_generation (whole generation)
+
+The trace is returned with the result, appended to a JSONL log (RAG_TRACE_LOG)
+and aggregated into Prometheus histograms (Tracer.prometheus_text, served on
+/metrics when RAG_METRICS_PORT is set). The log is written by a background
+thread (record() never touches the disk) and rotates by size
+(RAG_TRACE_LOG_MAX_MB, RAG_TRACE_LOG_BACKUPS).
+
+Spans are recorded through a context variable, so the retrieval helpers do not
+need a trace argument; without a current trace they cost nothing.
+"""
+import os
+import json
+import atexit
+import time
+import uuid
+import queue
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_TRACE_LOG = os.path.join("logs", "rag_traces.jsonl")
+DEFAULT_LOG_MAX_BYTES = 50 << 20  # rotate the JSONL log at 50 MB
+DEFAULT_LOG_BACKUPS = 3           # rotated files kept: <log>.1 (newest) .. <log>.3
+LOG_QUEUE_SIZE = 10000            # pending lines; beyond that records are dropped, not waited on
+
+# Histogram buckets: stage durations (seconds) and LLM generation speed (tokens/s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKENS_PER_S_BUCKETS = (1, 5, 10, 20, 40, 80, 160, 320)
+
+current_trace: contextvars.ContextVar[Optional["RequestTrace"]] = contextvars.ContextVar(
+    "fundrag_trace", default=None
+)
+
+
+class RequestTrace:
+
+    def __init__(self, request: str = "query"):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.request = request
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.attrs: Dict = {}
+        self.spans: List[Dict] = []
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, end: Optional[float] = None, **attrs) -> Dict:
+        """Records a stage that ran from perf_counter() `start` to `end` (default: now)."""
+        end = time.perf_counter() if end is None else end
+        span = {
+            "name": name,
+            "start_ms": round((start - self._t0) * 1000, 2),
+            "duration_ms": round((end - start) * 1000, 2),
+            **attrs
+        }
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Times the block; attributes can be added to the yielded dict inside it."""
+        start = time.perf_counter()
+        extra = dict(attrs)
+        try:
+            yield extra
+        finally:
+            self.add_span(name, start, **extra)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "request": self.request,
+            "started_at": self.started_at,
+            "total_ms": round((time.perf_counter() - self._t0) * 1000, 2),
+            **self.attrs,
+            "spans": spans,
+        }
+
+
+def stage_ms(trace: Dict) -> Dict[str, float]:
+    """{stage: total ms} of a trace dict (a stage that ran twice, e.g. a widened search, is summed)."""
+    totals: Dict[str, float] = {}
+    for span in trace.get("spans", []):
+        totals[span["name"]] = round(totals.get(span["name"], 0.0) + span["duration_ms"], 2)
+    return totals
+
+
+@contextmanager
+def trace_span(name: str, **attrs):
+    """Span on the current request's trace; a no-op outside a traced request."""
+    trace = current_trace.get()
+    if trace is None:
+        yield dict(attrs)
+        return
+    with trace.span(name, **attrs) as extra:
+        yield extra
+
+
+def add_span(name: str, start: float, end: Optional[float] = None, **attrs):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add_span(name, start, end, **attrs)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        sep = "," if labels else ""
+        out, cumulative = [], 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            out.append(f'{name}_bucket{{{labels}{sep}le="{bound:g}"}} {cumulative}')
+        out.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        out.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        out.append(f"{name}_count{suffix} {self.count}")
+        return out
+
+
+class TraceLogWriter:
+    """
+    Appends JSON lines to a file from a daemon thread. At max_bytes the file
+    rotates (path -> path.1 -> ... -> path.<backups>, the oldest dropped), so
+    the log's disk use stays under (backups + 1) * max_bytes. If the disk
+    stalls and LOG_QUEUE_SIZE lines are pending, new lines are dropped and
+    counted instead of blocking the caller.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_LOG_MAX_BYTES, backups: int = DEFAULT_LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="rag-trace-log", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str):
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until the lines queued so far are on disk; False on timeout."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = [item for item in items if isinstance(item, str)]
+            if lines:
+                self._append(lines)
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _append(self, lines: List[str]):
+        try:
+            log_dir = os.path.dirname(self.path)
+            if log_dir:
+                os.makedirs(log_dir, exist_ok=True)
+            if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("".join(lines))
+        except OSError as e:
+            print(f"Trace log write failed: {e}")
+
+    def _rotate(self):
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class Tracer:
+    """Process-wide sink for finished traces: JSONL log + Prometheus histograms."""
+
+    def __init__(self, log_path: Optional[str] = DEFAULT_TRACE_LOG,
+                 log_max_bytes: int = DEFAULT_LOG_MAX_BYTES, log_backups: int = DEFAULT_LOG_BACKUPS):
+        self.log_path = log_path
+        self._log = TraceLogWriter(log_path, log_max_bytes, log_backups) if log_path else None
+        self._lock = threading.Lock()
+        self._stages: Dict[str, _Histogram] = {}
+        self._requests: Dict[str, _Histogram] = {}
+        self._tokens_per_s = _Histogram(TOKENS_PER_S_BUCKETS)
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """
+        RAG_TRACE_LOG: JSONL path (default logs/rag_traces.jsonl), 0 to disable the log.
+        RAG_TRACE_LOG_MAX_MB / RAG_TRACE_LOG_BACKUPS: rotation size and rotated files kept.
+        """
+        path = os.getenv("RAG_TRACE_LOG", DEFAULT_TRACE_LOG)
+        return cls(None if path in ("", "0") else path,
+                   log_max_bytes=int(float(os.getenv("RAG_TRACE_LOG_MAX_MB", DEFAULT_LOG_MAX_BYTES >> 20)) * (1 << 20)),
+                   log_backups=int(os.getenv("RAG_TRACE_LOG_BACKUPS", DEFAULT_LOG_BACKUPS)))
+
+    def record(self, trace: RequestTrace) -> Dict:
+        """Aggregates a finished trace and queues its log line; returns its dict form."""
+        data = trace.to_dict()
+        pipeline = str(data.get("pipeline", "none"))
+        with self._lock:
+            self._requests.setdefault(pipeline, _Histogram(LATENCY_BUCKETS)).observe(data["total_ms"] / 1000)
+            for span in data["spans"]:
+                self._stages.setdefault(span["name"], _Histogram(LATENCY_BUCKETS)).observe(span["duration_ms"] / 1000)
+                if span.get("tokens_per_s"):
+                    self._tokens_per_s.observe(span["tokens_per_s"])
+        if self._log is not None:
+            self._log.write(json.dumps(data, ensure_ascii=False, default=str) + "\n")
+        return data
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until the recorded traces are in the log file."""
+        return self._log.flush(timeout) if self._log is not None else True
+
+    def prometheus_text(self) -> str:
+        """Histograms in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            lines = [
+                "# HELP fundrag_request_duration_seconds End-to-end request latency by pipeline.",
+                "# TYPE fundrag_request_duration_seconds histogram",
+            ]
+            for pipeline, hist in sorted(self._requests.items()):
+                lines += hist.lines("fundrag_request_duration_seconds", f'pipeline="{pipeline}"')
+            lines += [
+                "# HELP fundrag_stage_duration_seconds Latency of each request stage.",
+                "# TYPE fundrag_stage_duration_seconds histogram",
+            ]
+            for stage, hist in sorted(self._stages.items()):
+                lines += hist.lines("fundrag_stage_duration_seconds", f'stage="{stage}"')
+            lines += [
+                "# HELP fundrag_llm_tokens_per_second LLM generation speed after the first token (estimated tokens).",
+                "# TYPE fundrag_llm_tokens_per_second histogram",
+            ]
+            lines += self._tokens_per_s.lines("fundrag_llm_tokens_per_second", "")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Serves prometheus_text() on http://host:port/metrics from a daemon thread."""
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="rag-metrics", daemon=True).start()
+        return self._server
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def default_tracer() -> Tracer:
+    """One tracer per process (FundRAG instances share histograms); starts /metrics if RAG_METRICS_PORT is set."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer.from_env()
+            atexit.register(_tracer.flush, 2.0)  # queued log lines of the last requests
+            port = os.getenv("RAG_METRICS_PORT")
+            if port:
+                _tracer.serve(int(port))
+                print(f"Prometheus metrics on :{port}/metrics")
+        return _tracer
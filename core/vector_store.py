@@ -0,0 +1,142 @@
+"""
+Native child vector store (index/faiss_native), replacing LangChain's pickled docstore.
+
+FAISS.load_local unpickles index.pkl: every child Document (text + a copy of
+its parent's metadata) is rebuilt in every process, at startup, from a format
+that can execute code. The native store keeps only what search needs:
+
+    index/faiss_native/
+        index.faiss          faiss.write_index; read with IO_FLAG_MMAP_IFC (flat / HNSW vectors are
+                             mmap-ed and shared across processes; IVF lists are still read into memory)
+        row_child.npy        int32[rows]       FAISS row -> children.id (SQLite v3); after an
+                             incremental update the index is id-mapped (labels = children.id)
+        child_parent.npy     int32[max_id + 1] children.id -> parent row (-1: none)
+        parent_ids.json      parent row -> parent_id string
+        faiss_params.json    index type / search knobs (core.faiss_index)
+
+Child texts are not loaded: hits fetch the few they need through a callback
+(FundRAG reads them from the v3 `children` table by id).
+"""
+import os
+import json
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from core.faiss_index import configure_search, load_params, save_params
+
+NATIVE_INDEX_DIR = os.path.join("index", "faiss_native")
+INDEX_FILE = "index.faiss"
+# Zero-copy mmap of flat code arrays (faiss >= 1.8); IO_FLAG_MMAP alone still copies them
+_MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+def native_maps(parents: List[Dict], children: List[Dict]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    (row_child, child_parent, parent_ids) for an index whose rows are `children`
+    in order, numbered like sqlite_schema.write_v3 (children.id = position + 1).
+    """
+    parent_rows = {p['parent_id']: row for row, p in enumerate(parents)}
+    row_child = np.arange(1, len(children) + 1, dtype=np.int32)
+    child_parent = np.full(len(children) + 1, -1, dtype=np.int32)
+    child_parent[1:] = [parent_rows.get(c['parent_id'], -1) for c in children]
+    return row_child, child_parent, [p['parent_id'] for p in parents]
+
+
+def write_native_store(index: faiss.Index, row_child: np.ndarray, child_parent: np.ndarray,
+                       parent_ids: List[str], index_dir: str = NATIVE_INDEX_DIR, params: Optional[Dict] = None):
+    if index.ntotal != len(row_child):
+        raise ValueError(f"index has {index.ntotal} rows but row_child maps {len(row_child)}")
+    os.makedirs(index_dir, exist_ok=True)
+
+    # Each file is written aside and renamed into place
+    def _path(name):
+        return os.path.join(index_dir, name)
+
+    faiss.write_index(index, _path(INDEX_FILE) + ".tmp")
+    os.replace(_path(INDEX_FILE) + ".tmp", _path(INDEX_FILE))
+    for name, arr in (("row_child", row_child), ("child_parent", child_parent)):
+        with open(_path(f"{name}.npy.tmp"), 'wb') as f:
+            np.save(f, np.asarray(arr, dtype=np.int32))
+        os.replace(_path(f"{name}.npy.tmp"), _path(f"{name}.npy"))
+    with open(_path("parent_ids.json.tmp"), 'w', encoding='utf-8') as f:
+        json.dump(parent_ids, f, ensure_ascii=False)
+    os.replace(_path("parent_ids.json.tmp"), _path("parent_ids.json"))
+    save_params(index_dir, params or {"index_type": "flat"})
+
+
+def rss_mb() -> float:
+    """
+    Private (anonymous) resident memory, i.e. what each process pays on its own;
+    mmap-ed index pages are shared page cache and not counted. Linux /proc, peak RSS elsewhere.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+class NativeVectorStore:
+
+    def __init__(self, index_dir: str = NATIVE_INDEX_DIR,
+                 child_texts: Optional[Callable[[List[int]], Dict[int, str]]] = None, mmap: bool = True):
+        """child_texts: {children.id: content} for a list of ids; without it hits carry no child text."""
+        index_path = os.path.join(index_dir, INDEX_FILE)
+        try:
+            self.index = faiss.read_index(index_path, _MMAP_FLAG if mmap else 0)
+        except RuntimeError:
+            # Index types / faiss builds without mmap support: regular read
+            self.index = faiss.read_index(index_path)
+        self.params = load_params(index_dir)
+        configure_search(self.index, self.params)
+        self.id_mapped = bool(self.params.get("id_mapped"))
+
+        self.row_child = np.load(os.path.join(index_dir, "row_child.npy"), mmap_mode='r' if mmap else None)
+        self.child_parent = np.load(os.path.join(index_dir, "child_parent.npy"), mmap_mode='r' if mmap else None)
+        with open(os.path.join(index_dir, "parent_ids.json"), 'r', encoding='utf-8') as f:
+            self.parent_ids = json.load(f)
+        self.child_texts = child_texts
+
+    @staticmethod
+    def exists(index_dir: str = NATIVE_INDEX_DIR) -> bool:
+        return os.path.exists(os.path.join(index_dir, "parent_ids.json"))
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def search_by_vector(self, embedding: List[float], k: int = 5) -> List[Dict]:
+        """Vector-leg hits (same shape as FundRAG._vector_hits, plus child_id); score = squared L2."""
+        distances, rows = self.index.search(np.asarray([embedding], dtype=np.float32), k)
+        found = rows[0] >= 0
+        labels = rows[0][found]
+        child_ids = labels if self.id_mapped else self.row_child[labels]
+        parent_rows = self.child_parent[child_ids].tolist()
+        child_ids = child_ids.tolist()
+        texts = self.child_texts(child_ids) if self.child_texts else {}
+
+        hits = []
+        for cid, parent_row, score in zip(child_ids, parent_rows, distances[0][found].tolist()):
+            pid = self.parent_ids[parent_row] if parent_row >= 0 else None
+            hits.append({
+                "parent_id": pid,
+                "child_id": cid,
+                "child_content": texts.get(cid),
+                "metadata": {"parent_id": pid},
+                "score": score,
+                "source": "vector"
+            })
+        return hits
+
+
+def timed_load(loader: Callable):
+    """(result, seconds, RSS MB added) for a loader call; used for the startup report."""
+    rss_before, start = rss_mb(), time.perf_counter()
+    result = loader()
+    return result, time.perf_counter() - start, rss_mb() - rss_before
@@ -0,0 +1,98 @@
+"""
+Background warm-up and readiness state for a FundRAG instance.
+
+Warm-up tasks (RAG_WARMUP=1, see FundRAG.start_warmup) run on daemon threads
+while the service already accepts traffic:
+
+    reranker      load the CrossEncoder / ONNX session and run one dummy batch,
+                  so the first user does not pay for the load or a cold forward pass
+    index_pages   read the FAISS, SQLite, parent-store (and BM25) files once, so
+                  their mmap-ed pages are in the page cache before the first search
+
+Readiness.status() reports the overall state for the UI / health endpoints:
+
+    ready      nothing pending (also when warm-up is not enabled)
+    warming    at least one task still running
+    degraded   a task failed; queries still run, e.g. without rerank
+"""
+import os
+import time
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+PAGE_CHUNK = 1 << 20  # bytes per read while touching index files
+
+
+def touch_pages(paths: Iterable[str]) -> int:
+    """Reads files (directories recursively) once to pull them into the page cache; returns bytes read."""
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+        elif os.path.exists(path):
+            files = [path]
+        else:
+            continue
+        for file_path in files:
+            with open(file_path, 'rb', buffering=0) as f:
+                while True:
+                    chunk = f.read(PAGE_CHUNK)
+                    if not chunk:
+                        break
+                    total += len(chunk)
+    return total
+
+
+class Readiness:
+    """Tracks background warm-up tasks; each task runs once on its own daemon thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, Dict] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+
+    def start(self, name: str, fn: Callable[[], Optional[Dict]]) -> threading.Thread:
+        """Runs fn in the background; its returned dict is kept as the task's details."""
+        with self._lock:
+            if name in self._threads:
+                return self._threads[name]
+            self._tasks[name] = {"state": "running"}
+            thread = threading.Thread(target=self._run, args=(name, fn), name=f"rag-warmup-{name}", daemon=True)
+            self._threads[name] = thread
+        thread.start()
+        return thread
+
+    def _run(self, name: str, fn: Callable[[], Optional[Dict]]):
+        start = time.perf_counter()
+        try:
+            result = {"state": "done", **(fn() or {})}
+        except Exception as e:
+            print(f"Warm-up task {name} failed: {e}")
+            result = {"state": "failed", "error": str(e)}
+        result["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        with self._lock:
+            self._tasks[name] = result
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            states = {task["state"] for task in self._tasks.values()}
+        if "running" in states:
+            return "warming"
+        return "degraded" if "failed" in states else "ready"
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every started task finished; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            threads = list(self._threads.values())
+        for thread in threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                return False
+        return True
+
+    def status(self) -> Dict:
+        state = self.state
+        with self._lock:
+            return {"state": state, "tasks": {name: dict(task) for name, task in self._tasks.items()}}
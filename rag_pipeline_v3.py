@@ -1,8 +1,12 @@
 import os
 import json
-import sqlite3
 import re
-from typing import List, Dict, Set
+import time
+import hashlib
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Set, Optional, Tuple, AsyncIterator
 from dotenv import load_dotenv
 
 import sys
@@ -11,127 +15,348 @@ import io
 if sys.stdout.encoding.lower() != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-# LangChain
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-
-# Rerank imports (moved to lazy load)
-# from sentence_transformers import CrossEncoder
-# import torch
+# LangChain, the OpenAI client, FAISS, scipy and the reranker are imported by the
+# FundRAG methods that first need them: importing this module stays cheap
+# (python scripts/profile_startup.py)
 
 # Config
 from config.prompt_templates import RAG_QA_PROMPT_TEMPLATE, CALC_QA_PROMPT_TEMPLATE
+from core.sqlite_pool import SQLiteReadPool
+from core.rerank_batcher import RerankBatcher
+from core.rerank_cache import build_rerank_cache
+from core.index_manifest import cache_fingerprint, index_fingerprint, load_manifest
+from core.answer_cache import build_answer_cache, answer_namespace
+from core.adaptive_pool import pool_signals, plan_pool, DEFAULT_SEARCH_K, DEFAULT_POOL
+from core.fusion import fuse_parent_scores, shortlist_size
+from core.cjk_tokenize import query_terms, match_expression
+from core import sqlite_schema as schema_v3
+from core.parent_store import ParentStore, PARENT_STORE_PATH
+from core.tracing import RequestTrace, current_trace, trace_span, add_span, default_tracer
+from core.text_utils import estimate_tokens
+from core.warmup import Readiness, touch_pages
 
 load_dotenv()
 
 INDEX_DIR = "index"
 FAISS_INDEX_DIR = os.path.join(INDEX_DIR, "faiss_v2")
-SQLITE_DB_PATH = os.path.join(INDEX_DIR, "sqlite_v2.db")
+# Native store (core.vector_store): mmap-ed faiss index + int32 id maps, no pickle.
+# Used when built and the v3 DB (child texts by id) exists; RAG_VECTOR_STORE=pickle forces faiss_v2
+VECTOR_STORE_FORMAT = os.getenv("RAG_VECTOR_STORE", "auto").lower()
+SQLITE_V2_DB_PATH = os.path.join(INDEX_DIR, "sqlite_v2.db")
+SQLITE_V3_DB_PATH = os.path.join(INDEX_DIR, "sqlite_v3.db")
+# Normalized schema v3 (core.sqlite_schema) once built/migrated, else the v2 JSON-metadata DB
+SQLITE_DB_PATH = SQLITE_V3_DB_PATH if os.path.exists(SQLITE_V3_DB_PATH) else SQLITE_V2_DB_PATH
+CHILDREN_FILE = os.path.join("data", "children.jsonl")
+
+# Keyword leg engine: fts5 (SQLite, default) | bm25 (in-process, core.bm25_index)
+KEYWORD_BACKEND = os.getenv("KEYWORD_BACKEND", "fts5").lower()
+
+# Bounded executor for blocking work called from the async pipeline (FAISS search, SQLite)
+RETRIEVAL_WORKERS = int(os.getenv("RAG_RETRIEVAL_WORKERS", "8"))
+
+# Reranker service: pairs from concurrent requests are scored in one forward pass
+RERANK_MAX_BATCH = int(os.getenv("RERANK_MAX_BATCH", "64"))         # pairs per batch
+RERANK_MAX_WAIT_MS = float(os.getenv("RERANK_MAX_WAIT_MS", "5"))    # wait for more requests
+RERANK_SCORE_TIMEOUT = float(os.getenv("RERANK_SCORE_TIMEOUT", "30"))  # seconds a blocking rerank waits
+
+# Rerank input: 'parent' scores the whole parent (up to 2000 chars, truncated at 512 tokens);
+# 'child' scores the matched child windows and max-pools them up to the parent
+RERANK_MODE = os.getenv("RERANK_MODE", "parent")
+RERANK_CHILD_WINDOWS = int(os.getenv("RERANK_CHILD_WINDOWS", "3"))   # max windows per parent
+CHILD_WINDOW_CHARS = 300  # = split_children.CHILD_SIZE, fallback window when no child matched
+
+# Adaptive pool: size the rerank pool from first-round score gaps / leg overlap (core.adaptive_pool)
+ADAPTIVE_POOL = os.getenv("RAG_ADAPTIVE_POOL", "0") == "1"
+
+# Fusion: rank parents by RRF + bm25/distance before rerank instead of arrival order (core.fusion)
+FUSION = os.getenv("RAG_FUSION", "0") == "1"
+
+# Child hits fetched by the vector leg (keyword leg: 20). Can be lowered once the
+# keyword leg matches reliably (CJK bigram index, see scripts/benchmark_keyword_leg.py)
+VECTOR_INITIAL_K = int(os.getenv("RAG_VECTOR_K", "20"))
+
+# Hybrid retrieval legs run concurrently; a leg that exceeds its timeout is dropped
+VECTOR_LEG_TIMEOUT = float(os.getenv("VECTOR_LEG_TIMEOUT", "10"))   # seconds, remote embedding call
+KEYWORD_LEG_TIMEOUT = float(os.getenv("KEYWORD_LEG_TIMEOUT", "2"))  # seconds, local FTS
+
+# LLMs: standard pipeline (fact / negative / scenario) and the stronger calc pipeline
+STD_LLM_MODEL = os.getenv("RAG_LLM_MODEL", "gpt-5.1-chat") #gpt-4o-mini
+CALC_LLM_MODEL = os.getenv("CALC_MODEL_NAME", "gpt-5.1")
+
+# Warm-up: load + exercise the reranker and pre-read index pages in the background at init (core.warmup)
+WARMUP = os.getenv("RAG_WARMUP", "0") == "1"
+# Dummy batch for the first (cold) reranker forward pass: a few parent-length pairs
+WARMUP_RERANK_PAIRS = [["开放式基金的申购费用如何计算？", "开放式基金的申购费用按申购金额的一定比例收取。" * 40]] * 8
 
 class FundRAG:
     def __init__(self):
         self._init_vector_store()
-        self._init_llm()
+        self._init_sqlite()
+        self._init_executors()
+        # LLM chains are built by the first query (ensure_llm): ChatOpenAI pulls in the OpenAI client
+        self.std_chain = None
+        self.calc_chain = None
+        self.llm_cache = None  # core.llm_cache, set by _init_llm when LLM_CACHE=1
+        self._llm_lock = threading.Lock()
         # self._init_reranker() # Lazy load
         self.reranker = None
+        self.rerank_cache = None # Created with the reranker (keyed on its model version)
+        self.rerank_mode = RERANK_MODE
+        self.adaptive_pool = ADAPTIVE_POOL
+        self.fusion = FUSION
+        self._reranker_lock = threading.Lock()
+        self.rerank_batcher = RerankBatcher(
+            self._predict_rerank, max_batch_size=RERANK_MAX_BATCH, max_wait_ms=RERANK_MAX_WAIT_MS,
+            score_timeout_s=RERANK_SCORE_TIMEOUT
+        )
+        # Per-stage spans of every query: JSONL log + Prometheus histograms (core.tracing)
+        self.tracer = default_tracer()
+        self.readiness = Readiness()
+        # Answers to repeated / reworded questions (RAG_ANSWER_CACHE=1, core.answer_cache);
+        # a new index build, prompt template or model starts an empty namespace
+        self.answer_cache = build_answer_cache(answer_namespace(
+            index_fingerprint(INDEX_DIR, [SQLITE_DB_PATH, FAISS_INDEX_DIR]),
+            RAG_QA_PROMPT_TEMPLATE, CALC_QA_PROMPT_TEMPLATE, STD_LLM_MODEL, CALC_LLM_MODEL,
+            self.embedding_spec["embedding_model"]
+        ))
+        if WARMUP:
+            self.start_warmup()
         
     def _init_vector_store(self):
-        """Load FAISS V2 index"""
+        """Load the native vector store, else the FAISS V2 (LangChain pickle) index"""
+        from core.embedding_providers import load_embeddings, check_index_embeddings
+        from core.vector_store import NativeVectorStore, NATIVE_INDEX_DIR, timed_load
+        from core.faiss_index import load_params as load_faiss_params, configure_search
+        # Query embeddings go through the LRU + on-disk cache (see self.embeddings.stats());
+        # EMBEDDING_PROVIDER=local embeds on CPU instead of a remote call per query
+        self.embeddings, self.embedding_spec = load_embeddings()
+        # Fail fast: querying an index with another model's vectors returns noise, not an error
+        check_index_embeddings(load_manifest(INDEX_DIR), self.embedding_spec)
+        self.vector_store = None
+        self.native_store = None
+
+        if VECTOR_STORE_FORMAT != "pickle" and NativeVectorStore.exists(NATIVE_INDEX_DIR) \
+                and os.path.exists(SQLITE_V3_DB_PATH):
+            print("Loading native vector store...")
+            self.native_store, seconds, rss = timed_load(
+                lambda: NativeVectorStore(NATIVE_INDEX_DIR, child_texts=self.get_child_texts)
+            )
+            self.faiss_params = self.native_store.params
+            print(f"Native vector store: {len(self.native_store)} rows in {seconds * 1000:.0f} ms, RSS +{rss:.1f} MB")
+            return
+
         print("Loading FAISS V2 index...")
+        from langchain_community.vectorstores import FAISS
         if not os.path.exists(FAISS_INDEX_DIR):
             raise FileNotFoundError(f"FAISS index not found at {FAISS_INDEX_DIR}")
-            
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        self.vector_store = FAISS.load_local(
+        self.vector_store, seconds, rss = timed_load(lambda: FAISS.load_local(
             FAISS_INDEX_DIR, 
-            embeddings,
+            self.embeddings,
             allow_dangerous_deserialization=True
-        )
+        ))
+        print(f"FAISS V2 (pickle docstore): {self.vector_store.index.ntotal} rows in {seconds * 1000:.0f} ms, "
+              f"RSS +{rss:.1f} MB (scripts/convert_faiss_native.py builds the native store)")
+        # HNSW / IVF indexes (FAISS_INDEX_TYPE at build time): re-apply efSearch / nprobe
+        self.faiss_params = load_faiss_params(FAISS_INDEX_DIR)
+        configure_search(self.vector_store.index, self.faiss_params)
         
+    def _init_sqlite(self):
+        """Thread-local read-only connections to SQLite V2/V3 (shared by Gradio workers)"""
+        self.db = SQLiteReadPool(SQLITE_DB_PATH)
+        self.schema_version = self.db.execute("PRAGMA user_version")[0][0] if self.db.exists() else 0
+        self._init_keyword_vocab()
+        self._init_bm25()
+        # mmap-ed parent texts (written by build_index_v2.py); get_parents skips SQL when present
+        self.parent_store = ParentStore(PARENT_STORE_PATH) if ParentStore.exists(PARENT_STORE_PATH) else None
+
+    def _init_bm25(self):
+        """KEYWORD_BACKEND=bm25: in-process BM25 over memory-mapped arrays, no SQLite on the keyword leg."""
+        self.bm25_index = None
+        if KEYWORD_BACKEND != "bm25":
+            return
+        from core.bm25_index import BM25Index, BM25_INDEX_DIR
+        if not BM25Index.exists(BM25_INDEX_DIR):
+            # Not built by build_index_v2.py yet: build once from children.jsonl and persist
+            print(f"BM25 index not found at {BM25_INDEX_DIR}, building from {CHILDREN_FILE}...")
+            with open(CHILDREN_FILE, 'r', encoding='utf-8') as f:
+                BM25Index.build([json.loads(line) for line in f]).save(BM25_INDEX_DIR)
+        self.bm25_index = BM25Index.load(BM25_INDEX_DIR)
+        print(f"Keyword backend: in-process BM25 ({len(self.bm25_index.docs)} children)")
+
+    def _init_keyword_vocab(self):
+        """
+        Indexes built with CJK bigrams (content_tokens column) are queried by
+        OR-ing selective query bigrams; their document frequencies come from
+        the fts5vocab table. Older indexes keep the whole-question phrase match.
+        """
+        self.keyword_bigrams = False
+        self.keyword_df: Dict[str, int] = {}
+        self.keyword_docs = 0
+        if not self.db.exists():
+            return
+        try:
+            if self.schema_version >= 3:
+                fts_table, vocab_table = "children", "children_vocab"
+            else:
+                columns = {row['name'] for row in self.db.execute("PRAGMA table_info(doc_children_fts)")}
+                if 'content_tokens' not in columns:
+                    return
+                fts_table, vocab_table = "doc_children_fts", "doc_children_vocab"
+            self.keyword_df = {row['term']: row['doc'] for row in self.db.execute(f"SELECT term, doc FROM {vocab_table}")}
+            self.keyword_docs = self.db.execute(f"SELECT count(*) AS n FROM {fts_table}")[0]['n']
+            self.keyword_bigrams = True
+        except Exception as e:
+            print(f"Keyword vocab load failed, using phrase match: {e}")
+
+    def _init_executors(self):
+        """
+        Bounded thread pool for blocking calls, plus one background event loop
+        that the sync wrappers (query/query_stream/hybrid_retrieval) submit to.
+        CrossEncoder work runs on the rerank_batcher's own worker thread.
+        """
+        self._retrieval_pool = ThreadPoolExecutor(
+            max_workers=RETRIEVAL_WORKERS, thread_name_prefix="rag-retrieval"
+        )
+        self.loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(
+            target=self.loop.run_forever, name="rag-event-loop", daemon=True
+        )
+        self._loop_thread.start()
+
+    def _run_sync(self, coro):
+        """Runs a coroutine on the background loop and blocks for its result."""
+        if threading.current_thread() is self._loop_thread:
+            raise RuntimeError("Sync FundRAG API called from its own event loop; use the async methods")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
     def _init_llm(self):
-        # EFundGPT Configuration (Optional overrides for LLM only)
-        # This allows keeping Embeddings on original OpenAI while moving LLM to EFundGPT
-        efund_base = os.getenv("EFUNDS_API_BASE")
-        efund_key = os.getenv("EFUNDS_API_KEY")
-        
-        # Headers for EFundGPT
-        extra_headers = {}
-        if os.getenv("EFUNDS_USER_NAME"):
-            extra_headers["Efunds-User-Name"] = os.getenv("EFUNDS_USER_NAME")
-        if os.getenv("EFUNDS_ACC_TOKEN"):
-            extra_headers["Efunds-Acc-Token"] = os.getenv("EFUNDS_ACC_TOKEN")
-        if os.getenv("EFUNDS_SOURCE"):
-            extra_headers["Efunds-Source"] = os.getenv("EFUNDS_SOURCE")
-            
-        # Common kwargs for ChatOpenAI
-        llm_kwargs = {}
-        if efund_base:
-            print(f"Using EFundGPT API Base: {efund_base}")
-            llm_kwargs["base_url"] = efund_base
-        if efund_key:
-            llm_kwargs["api_key"] = efund_key
-        if extra_headers:
-            print("Injecting EFundGPT headers...")
-            llm_kwargs["model_kwargs"] = {"extra_headers": extra_headers}
+        from langchain_openai import ChatOpenAI
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import StrOutputParser
+        from core.llm_factory import chat_llm_kwargs
+
+        # Common kwargs for ChatOpenAI: EFundGPT overrides (LLM only, embeddings stay on
+        # OpenAI) and, with LLM_CACHE=1, the persistent response cache
+        llm_kwargs = chat_llm_kwargs(temperature=0.0, verbose=True)
+        self.llm_cache = llm_kwargs.get("cache")
 
         # Standard Pipeline (for Fact/Negative/Scenario)
         # Load from env or default to gpt-4o-mini
-        std_model = os.getenv("RAG_LLM_MODEL", "gpt-5.1-chat") #gpt-4o-mini
+        std_model = STD_LLM_MODEL
         print(f"Loading Standard LLM: {std_model}")
-        self.std_llm = ChatOpenAI(model_name=std_model, temperature=0.0, **llm_kwargs)
+        self.std_llm = ChatOpenAI(model_name=std_model, **llm_kwargs)
         self.std_prompt = PromptTemplate.from_template(RAG_QA_PROMPT_TEMPLATE)
         self.std_chain = self.std_prompt | self.std_llm | StrOutputParser()
 
         # Calc Pipeline (for Calculation questions)
         # Using stronger model for reasoning (e.g. gpt-4o)
         # Fallback to 3.5 if env not set, but user requested strong model.
-        calc_model = os.getenv("CALC_MODEL_NAME", "gpt-5.1")
+        calc_model = CALC_LLM_MODEL
         try:
-            self.calc_llm = ChatOpenAI(model_name=calc_model, temperature=0.0, **llm_kwargs)
+            self.calc_llm = ChatOpenAI(model_name=calc_model, **llm_kwargs)
         except Exception as e:
             print(f"Warning: Failed to load {calc_model}, falling back to gpt-3.5-turbo. Error: {e}")
             # Fallback also uses the same kwargs unless it was the model itself that failed
-            self.calc_llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.0, **llm_kwargs)
+            self.calc_llm = ChatOpenAI(model_name="gpt-3.5-turbo", **llm_kwargs)
             
         self.calc_prompt = PromptTemplate.from_template(CALC_QA_PROMPT_TEMPLATE)
         self.calc_chain = self.calc_prompt | self.calc_llm | StrOutputParser()
 
-    def _init_reranker(self):
-        """Load BGE Reranker"""
+    def _init_reranker(self, warm: bool = False):
+        """
+        Load BGE Reranker (backend from RERANKER_BACKEND: torch / onnx / onnx-int8).
+        warm: also run a dummy batch, so the first real forward pass is not a cold one.
+        """
         # BAAI/bge-reranker-base is lightweight and effective for Chinese
         print("Lazy Loading Rerank Model...", flush=True)
         try:
-            from sentence_transformers import CrossEncoder
-            import torch
-            
-            # Prefer local model if exists
-            local_path = os.path.join("models", "bge-reranker-base")
-            model_name_or_path = "BAAI/bge-reranker-base"
-            
-            if os.path.exists(local_path):
-                print(f"Loading local Rerank model from: {local_path}")
-                model_name_or_path = local_path
-            else:
-                print(f"Local model not found at {local_path}, downloading/loading from HuggingFace...")
-            
-            self.reranker = CrossEncoder(
-                model_name_or_path, 
-                model_kwargs={"torch_dtype": torch.float32} # Use float32 for CPU compatibility
+            from core.reranker_backends import load_reranker
+            reranker = load_reranker()
+            print(f"Reranker backend: {reranker.model_version}")
+            if warm:
+                reranker.predict(WARMUP_RERANK_PAIRS, batch_size=len(WARMUP_RERANK_PAIRS))
+            self.rerank_cache = build_rerank_cache(
+                reranker.model_version,
+                cache_fingerprint(INDEX_DIR, [SQLITE_DB_PATH, FAISS_INDEX_DIR])
             )
+            # Published last: _arerank_docs checks it without the lock
+            self.reranker = reranker
         except Exception as e:
             print(f"Reranker load failed: {e}")
             self.reranker = None
 
-    def ensure_reranker(self):
+    def ensure_llm(self):
+        # calc_chain is assigned last by _init_llm
+        if self.calc_chain is None:
+            with self._llm_lock:
+                if self.calc_chain is None:
+                    self._init_llm()
+
+    async def _aensure_llm(self):
+        """First query only: imports / client setup run off the event loop."""
+        if self.calc_chain is None:
+            await asyncio.get_running_loop().run_in_executor(self._retrieval_pool, self.ensure_llm)
+
+    def ensure_reranker(self, warm: bool = False):
+        if self.reranker is None:
+            # Concurrent first requests (and the warm-up thread) share one load instead of loading twice
+            with self._reranker_lock:
+                if self.reranker is None:
+                    self._init_reranker(warm)
+
+    def start_warmup(self) -> Readiness:
+        """
+        Loads and exercises the reranker and pre-reads the index files on
+        background threads (RAG_WARMUP=1 does this at init). Queries arriving
+        meanwhile wait on the same reranker lock instead of loading it again.
+        Progress: self.readiness.status().
+        """
+        self.readiness.start("reranker", self._warm_reranker)
+        self.readiness.start("index_pages", self._warm_index_pages)
+        return self.readiness
+
+    def _warm_reranker(self) -> Dict:
+        self.ensure_reranker(warm=True)
         if self.reranker is None:
-            self._init_reranker()
+            raise RuntimeError("reranker failed to load, queries run without rerank")
+        return {"backend": self.reranker.model_version}
+
+    def _warm_index_pages(self) -> Dict:
+        paths = [SQLITE_DB_PATH]
+        if self.native_store is not None:
+            from core.vector_store import NATIVE_INDEX_DIR
+            paths.append(NATIVE_INDEX_DIR)
+        else:
+            paths.append(FAISS_INDEX_DIR)
+        if self.parent_store is not None:
+            paths.append(PARENT_STORE_PATH)
+        if self.bm25_index is not None:
+            from core.bm25_index import BM25_INDEX_DIR
+            paths.append(BM25_INDEX_DIR)
+        return {"mb": round(touch_pages(paths) / (1 << 20), 1)}
 
     def search_child_vector(self, query: str, k: int = 5) -> List[Dict]:
         """FAISS Child Search"""
+        if self.native_store is not None:
+            return self.native_store.search_by_vector(self.embeddings.embed_query(query), k)
         docs_and_scores = self.vector_store.similarity_search_with_score(query, k=k)
+        return self._vector_hits(docs_and_scores)
+
+    async def asearch_child_vector(self, query: str, k: int = 5) -> List[Dict]:
+        """FAISS Child Search (async embedding, FAISS search on the retrieval pool)"""
+        embedding = await self.embeddings.aembed_query(query)
+        if self.native_store is not None:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._retrieval_pool, self.native_store.search_by_vector, embedding, k
+            )
+        docs_and_scores = await asyncio.get_running_loop().run_in_executor(
+            self._retrieval_pool,
+            self.vector_store.similarity_search_with_score_by_vector, embedding, k
+        )
+        return self._vector_hits(docs_and_scores)
+
+    @staticmethod
+    def _vector_hits(docs_and_scores) -> List[Dict]:
         results = []
         for doc, score in docs_and_scores:
             results.append({
@@ -144,29 +369,57 @@ class FundRAG:
         return results
 
     def search_child_keyword(self, query: str, k: int = 5) -> List[Dict]:
-        """SQLite FTS5 Child Search"""
+        """SQLite FTS5 Child Search (or the in-process BM25 index, see KEYWORD_BACKEND)"""
+        if self.bm25_index is not None:
+            return self.bm25_index.search(query, k)
+
         results = []
-        if not os.path.exists(SQLITE_DB_PATH):
+        if not self.db.exists():
             return []
 
         try:
-            conn = sqlite3.connect(SQLITE_DB_PATH)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # Sanitize
-            safe_query = query.replace('"', '""')
-            safe_query = f'"{safe_query}"' # Quote wrap for literal phrase match attempt
+            if self.schema_version >= 3:
+                safe_query = match_expression(query_terms(query, self.keyword_df, self.keyword_docs))
+                if not safe_query:
+                    return []
+                # Metadata from the joined sections row, no JSON
+                for row in self.db.execute(schema_v3.KEYWORD_SQL, (safe_query, k)):
+                    results.append({
+                        "parent_id": row['parent_id'],
+                        "child_content": row['content'],
+                        "metadata": schema_v3.row_metadata(row),
+                        "score": float(row['bm25']),
+                        "source": "keyword"
+                    })
+                return results
+
+            if self.keyword_bigrams:
+                # Same bigrams as the index; rare terms first, boilerplate dropped
+                safe_query = match_expression(query_terms(query, self.keyword_df, self.keyword_docs))
+                if not safe_query:
+                    return []
+                bm25_expr = "bm25(doc_children_fts)"
+            else:
+                # Sanitize
+                safe_query = query.replace('"', '""')
+                safe_query = f'"{safe_query}"' # Quote wrap for literal phrase match attempt
+                # bm25 over the content column only (parent_id/metadata weighted 0)
+                bm25_expr = "bm25(doc_children_fts, 1.0, 0.0, 0.0)"
             
-            sql = """
-                SELECT content, parent_id, metadata
-                FROM doc_children_fts 
-                WHERE doc_children_fts MATCH ? 
-                ORDER BY rank 
-                LIMIT ?
+            # lower bm25 is better; rank on rowids first so only the top k rows load their columns
+            sql = f"""
+                SELECT f.content, f.parent_id, f.metadata, top.bm25
+                FROM (
+                    SELECT rowid AS id, {bm25_expr} AS bm25
+                    FROM doc_children_fts 
+                    WHERE doc_children_fts MATCH ? 
+                    ORDER BY bm25 
+                    LIMIT ?
+                ) AS top
+                JOIN doc_children_fts AS f ON f.rowid = top.id
+                ORDER BY top.bm25
             """
-            cursor.execute(sql, (safe_query, k))
-            rows = cursor.fetchall()
+            rows = self.db.execute(sql, (safe_query, k))
             
             for row in rows:
                 meta = json.loads(row['metadata'])
@@ -174,10 +427,9 @@ class FundRAG:
                     "parent_id": row['parent_id'],
                     "child_content": row['content'],
                     "metadata": meta,
-                    "score": 0.0,
+                    "score": float(row['bm25']),
                     "source": "keyword"
                 })
-            conn.close()
         except Exception as e:
             # print(f"Keyword search warning: {e}")
             pass
@@ -185,104 +437,292 @@ class FundRAG:
         return results
 
     def get_parents(self, parent_ids: List[str]) -> Dict[str, Dict]:
-        """Batch fetch Parents from SQLite"""
+        """Batch fetch Parents from the mmap parent store, else SQLite"""
         parents = {}
         if not parent_ids:
             return parents
+        if self.parent_store is not None:
+            return self.parent_store.get(parent_ids)
             
         try:
-            conn = sqlite3.connect(SQLITE_DB_PATH)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
+            # One statement per IN-list length, reused via the connection's statement cache
             placeholders = ','.join(['?'] * len(parent_ids))
-            sql = f"SELECT id, content, metadata FROM doc_parents WHERE id IN ({placeholders})"
+            if self.schema_version >= 3:
+                sql = schema_v3.PARENTS_SQL.format(placeholders=placeholders)
+                read_metadata = schema_v3.row_metadata
+            else:
+                sql = f"SELECT id, content, metadata FROM doc_parents WHERE id IN ({placeholders})"
+                read_metadata = lambda row: json.loads(row['metadata'])
             
-            cursor.execute(sql, parent_ids)
-            rows = cursor.fetchall()
+            rows = self.db.execute(sql, parent_ids)
             
             for row in rows:
                 parents[row['id']] = {
                     "content": row['content'],
-                    "metadata": json.loads(row['metadata'])
+                    "metadata": read_metadata(row)
                 }
-            conn.close()
         except Exception as e:
             print(f"Parent fetch error: {e}")
             
         return parents
 
+    def get_child_texts(self, child_ids: List[int]) -> Dict[int, str]:
+        """{children.id: content} from the v3 DB (native vector store hits)"""
+        if not child_ids:
+            return {}
+        sql = schema_v3.CHILDREN_SQL.format(placeholders=','.join(['?'] * len(child_ids)))
+        return {row['id']: row['content'] for row in self.db.execute(sql, child_ids)}
+
+    async def asearch_child_keyword(self, query: str, k: int = 5) -> List[Dict]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._retrieval_pool, self.search_child_keyword, query, k
+        )
+
+    async def aget_parents(self, parent_ids: List[str]) -> Dict[str, Dict]:
+        with trace_span("get_parents", parents=len(parent_ids)):
+            return await asyncio.get_running_loop().run_in_executor(
+                self._retrieval_pool, self.get_parents, parent_ids
+            )
+
+    def _predict_rerank(self, pairs: List[List[str]]) -> List[float]:
+        """One CrossEncoder forward pass over a (micro-)batch; runs on the batcher thread."""
+        return self.reranker.predict(pairs, batch_size=len(pairs))
+
+    @staticmethod
+    def _apply_rerank_scores(docs: List[Dict], scores: List[float]) -> List[Dict]:
+        # Attach scores
+        for i, doc in enumerate(docs):
+            doc['rerank_score'] = float(scores[i])
+            
+        # Sort descending
+        docs.sort(key=lambda x: x['rerank_score'], reverse=True)
+        return docs
+
+    def _rerank_items(self, docs: List[Dict]) -> List[Tuple[str, int, str]]:
+        """
+        Texts to score as (cache_id, doc index, text).
+        parent mode: one item per parent (its full content).
+        child mode: one item per matched child window, so inputs stay ~300 chars.
+        """
+        items = []
+        for i, doc in enumerate(docs):
+            if self.rerank_mode == 'child':
+                windows = doc.get('matched_children') or [doc['content'][:CHILD_WINDOW_CHARS]]
+                for window in windows[:RERANK_CHILD_WINDOWS]:
+                    digest = hashlib.sha1(window.encode('utf-8')).hexdigest()[:12]
+                    items.append((f"{doc['parent_id']}#{digest}", i, window))
+            else:
+                items.append((doc['parent_id'], i, doc['content']))
+        return items
+
+    def _split_cached_scores(self, query: str, items: List[Tuple[str, int, str]]) -> Tuple[Dict[str, float], List[Tuple[str, int, str]]]:
+        """Returns (cached scores by cache_id, items that still need the model)."""
+        if self.rerank_cache is None:
+            return {}, items
+        cached = self.rerank_cache.get_many(query, [item[0] for item in items])
+        return cached, [item for item in items if item[0] not in cached]
+
+    async def _asplit_cached_scores(self, query: str, items: List[Tuple[str, int, str]]) -> Tuple[Dict[str, float], List[Tuple[str, int, str]]]:
+        """_split_cached_scores with the SQLite tier off the event loop."""
+        if self.rerank_cache is None:
+            return {}, items
+        cached = await self.rerank_cache.aget_many(query, [item[0] for item in items])
+        return cached, [item for item in items if item[0] not in cached]
+
+    @staticmethod
+    def _fresh_scores(todo: List[Tuple[str, int, str]], new_scores: List[float]) -> Dict[str, float]:
+        return {item[0]: float(score) for item, score in zip(todo, new_scores)}
+
+    def _merge_scores(self, docs: List[Dict], items: List[Tuple[str, int, str]],
+                      cached: Dict[str, float], fresh: Dict[str, float]) -> List[Dict]:
+        # Max-pool item scores up to their parent (a no-op in parent mode)
+        doc_scores = [float('-inf')] * len(docs)
+        for cache_id, i, _ in items:
+            score = cached[cache_id] if cache_id in cached else fresh[cache_id]
+            doc_scores[i] = max(doc_scores[i], score)
+        return self._apply_rerank_scores(docs, doc_scores)
+
     def _rerank_docs(self, query: str, docs: List[Dict]) -> List[Dict]:
         """
         Rerank a list of Parent Docs using CrossEncoder.
-        docs: List of dict with 'content', 'metadata', 'parent_id'
+        docs: List of dict with 'content', 'metadata', 'parent_id' (+ 'matched_children')
+        Only items missing from the score cache go through the model.
         """
         self.ensure_reranker()
         
         if not self.reranker or not docs:
             return docs
             
-        pairs = [[query, doc['content']] for doc in docs]
-        
         try:
-            scores = self.reranker.predict(pairs)
+            items = self._rerank_items(docs)
+            cached, todo = self._split_cached_scores(query, items)
+            new_scores = self.rerank_batcher.score([[query, text] for _, _, text in todo])
+            fresh = self._fresh_scores(todo, new_scores)
+            if self.rerank_cache is not None:
+                self.rerank_cache.put_many(query, fresh)
+            self._merge_scores(docs, items, cached, fresh)
+        except Exception as e:
+            print(f"Rerank failed: {e}")
             
-            # Attach scores
-            for i, doc in enumerate(docs):
-                doc['rerank_score'] = float(scores[i])
-                
-            # Sort descending
-            docs.sort(key=lambda x: x['rerank_score'], reverse=True)
+        return docs
+
+    async def _arerank_docs(self, query: str, docs: List[Dict]) -> List[Dict]:
+        """Async _rerank_docs: awaits the shared batcher instead of holding a thread."""
+        if self.reranker is None:
+            await asyncio.get_running_loop().run_in_executor(self._retrieval_pool, self.ensure_reranker)
+        
+        if not self.reranker or not docs:
+            return docs
             
+        try:
+            items = self._rerank_items(docs)
+            cached, todo = await self._asplit_cached_scores(query, items)
+            new_scores = await self.rerank_batcher.ascore([[query, text] for _, _, text in todo])
+            fresh = self._fresh_scores(todo, new_scores)
+            if self.rerank_cache is not None:
+                await self.rerank_cache.aput_many(query, fresh)
+            self._merge_scores(docs, items, cached, fresh)
         except Exception as e:
             print(f"Rerank failed: {e}")
             
         return docs
 
-    def hybrid_retrieval(self, query: str, final_k: int = 3) -> List[Dict]:
+    async def _atimed_leg(self, name: str, coro, timeout: float, timings: Dict) -> List[Dict]:
+        """Awaits one retrieval leg with its own timeout; failures yield no hits."""
+        start = time.perf_counter()
+        try:
+            hits = await asyncio.wait_for(coro, timeout)
+            timings[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            timings[f"{name}_status"] = "ok"
+            add_span(f"{name}_leg", start, status="ok", hits=len(hits))
+            return hits
+        except asyncio.TimeoutError:
+            print(f"Warning: {name} retrieval leg timed out")
+            timings[f"{name}_status"] = "timeout"
+        except Exception as e:
+            print(f"Warning: {name} retrieval leg failed: {e}")
+            timings[f"{name}_status"] = "error"
+        add_span(f"{name}_leg", start, status=timings[f"{name}_status"], hits=0)
+        return []
+
+    async def _agather_legs(self, query: str, k: int, timings: Dict, vector_k: Optional[int] = None) -> Tuple[List[Dict], List[Dict]]:
+        """Runs the vector and keyword legs concurrently (k child hits each, vector_k for the vector leg if given)."""
+        start = time.perf_counter()
+        vector_hits, keyword_hits = await asyncio.gather(
+            self._atimed_leg("vector", self.asearch_child_vector(query, k=vector_k or k), VECTOR_LEG_TIMEOUT, timings),
+            self._atimed_leg("keyword", self.asearch_child_keyword(query, k=k), KEYWORD_LEG_TIMEOUT, timings)
+        )
+        # Accumulates over rounds (the adaptive "widen" path searches twice)
+        timings["legs_wall_ms"] = round(timings.get("legs_wall_ms", 0.0) + (time.perf_counter() - start) * 1000, 2)
+        return vector_hits, keyword_hits
+
+    async def _aload_candidates(self, all_hits: List[Dict], pool_size: int,
+                                fused: Optional[Dict[str, float]] = None) -> List[Dict]:
         """
-        1. Search Children (Broad Recall: Vector + Keyword) -> Initial Pool (e.g. 20)
-        2. Map to Parents
-        3. Deduplicate
-        4. Rerank Parents -> Final K
+        Dedupes hits to parents and fetches the first `pool_size`: in arrival
+        order, or by fused score when `fused` ({parent_id: score}) is given.
         """
-        # 1. Broad Search (Initial K = 20)
-        initial_k = 20
-        vector_hits = self.search_child_vector(query, k=initial_k)
-        keyword_hits = self.search_child_keyword(query, k=initial_k)
-        
-        all_hits = vector_hits + keyword_hits
-        
-        # 2. Collect unique Parent IDs
+        if fused is not None:
+            all_hits = sorted(all_hits, key=lambda hit: -fused.get(hit['parent_id'], 0.0))
         parent_ids = []
-        seen_ids = set()
+        matched_children: Dict[str, List[str]] = {}
         
         for hit in all_hits:
             pid = hit['parent_id']
-            if pid and pid not in seen_ids:
-                seen_ids.add(pid)
+            if not pid:
+                continue
+            if pid not in matched_children:
+                matched_children[pid] = []
                 parent_ids.append(pid)
+            child = hit.get('child_content')
+            if child and child not in matched_children[pid]:
+                matched_children[pid].append(child)
         
-        # 3. Fetch All Candidates (No limit here yet, or maybe top 20 parents)
-        # If we have too many parents, Rerank might be slow. Let's limit candidate parents to 20.
-        candidate_ids = parent_ids[:20]
-        parent_map = self.get_parents(candidate_ids)
+        candidate_ids = parent_ids[:pool_size]
+        parent_map = await self.aget_parents(candidate_ids)
         
         candidate_docs = []
         for pid in candidate_ids:
             if pid in parent_map:
                 p_data = parent_map[pid]
-                candidate_docs.append({
+                doc = {
                     "content": p_data['content'],
                     "metadata": p_data['metadata'],
-                    "parent_id": pid
-                })
+                    "parent_id": pid,
+                    "matched_children": matched_children[pid]
+                }
+                if fused is not None:
+                    doc["fusion_score"] = fused.get(pid, 0.0)
+                candidate_docs.append(doc)
+        return candidate_docs
+
+    async def _acandidates(self, query: str, timings: Dict) -> Tuple[List[Dict], Dict]:
+        """
+        Returns (candidate parents, pool plan). With RAG_ADAPTIVE_POOL the pool
+        size (and whether to rerank) follows the first-round score distribution.
+        """
+        # 1. Broad Search (Initial K = 20), both legs fanned out
+        vector_hits, keyword_hits = await self._agather_legs(query, DEFAULT_SEARCH_K, timings, vector_k=VECTOR_INITIAL_K)
+        
+        if self.adaptive_pool:
+            signals = pool_signals(vector_hits, keyword_hits)
+            plan = plan_pool(signals)
+            timings["pool_signals"] = signals
+            if plan["search_k"] > DEFAULT_SEARCH_K:
+                # Flat scores: search deeper (query embedding is served from the cache)
+                vector_hits, keyword_hits = await self._agather_legs(query, plan["search_k"], timings)
+        else:
+            plan = {"path": "fixed", "search_k": DEFAULT_SEARCH_K, "pool_size": DEFAULT_POOL, "rerank": True}
+        timings["pool_path"] = plan["path"]
+        
+        # 2-3. Map to unique Parents and fetch the pool (default: up to 20 parents in arrival order;
+        # with RAG_FUSION the RRF + bm25 ranked shortlist, scaled up on the adaptive widen path)
+        fused, pool_size = None, plan["pool_size"]
+        if self.fusion:
+            fused = fuse_parent_scores(vector_hits, keyword_hits)
+            pool_size = shortlist_size(pool_size, DEFAULT_POOL)
+        candidate_docs = await self._aload_candidates(vector_hits + keyword_hits, pool_size, fused)
+        timings["pool_size"] = len(candidate_docs)
+        return candidate_docs, plan
+
+    async def ahybrid_candidates(self, query: str, timings: Optional[Dict] = None) -> List[Dict]:
+        """
+        Steps 1-3 of hybrid retrieval: the deduplicated parent pool before rerank.
+        Each candidate carries the child windows that matched it ('matched_children').
+        """
+        candidate_docs, _ = await self._acandidates(query, timings if timings is not None else {})
+        return candidate_docs
+
+    async def ahybrid_retrieval(self, query: str, final_k: int = 3, timings: Optional[Dict] = None) -> List[Dict]:
+        """
+        1. Search Children (Broad Recall: Vector + Keyword, concurrently) -> Initial Pool (e.g. 20)
+        2. Map to Parents
+        3. Deduplicate
+        4. Rerank Parents -> Final K
+
+        If `timings` is given, per-leg latency/status and the pool path are written into it.
+        """
+        if timings is None:
+            timings = {}
+        candidate_docs, plan = await self._acandidates(query, timings)
         
-        # 4. Rerank
-        reranked_docs = self._rerank_docs(query, candidate_docs)
+        # 4. Rerank (micro-batched with concurrent requests, off the event loop)
+        if plan["rerank"]:
+            start = time.perf_counter()
+            with trace_span("rerank", docs=len(candidate_docs)):
+                candidate_docs = await self._arerank_docs(query, candidate_docs)
+            timings["rerank_ms"] = round((time.perf_counter() - start) * 1000, 2)
         
         # 5. Top K
-        return reranked_docs[:final_k]
+        return candidate_docs[:final_k]
+
+    def hybrid_retrieval(self, query: str, final_k: int = 3, timings: Optional[Dict] = None) -> List[Dict]:
+        """Sync wrapper around ahybrid_retrieval"""
+        return self._run_sync(self.ahybrid_retrieval(query, final_k=final_k, timings=timings))
+
+    def hybrid_candidates(self, query: str, timings: Optional[Dict] = None) -> List[Dict]:
+        """Sync wrapper around ahybrid_candidates"""
+        return self._run_sync(self.ahybrid_candidates(query, timings=timings))
 
     def format_context(self, docs: List[Dict]) -> str:
         context_parts = []
@@ -335,104 +775,256 @@ class FundRAG:
         
         return 'std'
 
-    def query(self, question: str) -> Dict:
-        """Entry Point with Router"""
-        
-        # 0. Router
-        pipeline_type = self._classify_query(question)
-        
-        # 1. Retrieval (Shared, now with Rerank)
-        final_docs = self.hybrid_retrieval(question, final_k=5) 
-        
-        if not final_docs:
-            return {
-                "answer": "未在教材中找到相关信息。",
-                "confidence": 0.0,
-                "evidence": []
-            }
+    async def _aretrieve_traced(self, trace: RequestTrace, question: str, timings: Dict) -> Tuple[str, List[Dict]]:
+        """Router + retrieval with `trace` as the current trace (one step, so also safe inside a generator)."""
+        token = current_trace.set(trace)
+        try:
+            with trace.span("classify"):
+                pipeline_type = self._classify_query(question)
+            trace.attrs["pipeline"] = pipeline_type
+            final_docs = await self.ahybrid_retrieval(question, final_k=5, timings=timings)
+            return pipeline_type, final_docs
+        finally:
+            current_trace.reset(token)
+
+    async def _aretrieve_cached(self, trace: RequestTrace, question: str,
+                                timings: Dict) -> Tuple[str, List[Dict], Optional[Dict], Optional[List[float]]]:
+        """
+        Router + retrieval behind the answer cache. Returns (pipeline, docs,
+        cached answer entry or None, query vector to store a new answer under).
+        An exact hit skips retrieval; a similar question's answer is served only
+        if retrieval for this question returns the same parents (and pipeline).
+        """
+        cache = self.answer_cache
+        if cache is None:
+            pipeline_type, final_docs = await self._aretrieve_traced(trace, question, timings)
+            return pipeline_type, final_docs, None, None
+
+        vector, candidate = None, None
+        with trace.span("answer_cache") as span:
+            entry = await cache.aget_exact(question)
+            if entry is None:
+                try:
+                    # Same call as the vector leg's: it then hits the embedding cache
+                    vector = await asyncio.get_running_loop().run_in_executor(
+                        self._retrieval_pool, self.embeddings.embed_query, question
+                    )
+                    candidate = cache.get_similar(question, vector)
+                except Exception as e:
+                    print(f"Answer cache lookup failed: {e}")
+            span["lookup"] = "exact" if entry else ("similar" if candidate else "miss")
+        if entry is not None:
+            trace.attrs.update(pipeline=entry["pipeline"], answer_cache="exact")
+            return entry["pipeline"], entry["retrieved_docs"], entry, None
+
+        pipeline_type, final_docs = await self._aretrieve_traced(trace, question, timings)
+        hit = candidate is not None and candidate["pipeline"] == pipeline_type \
+            and set(candidate["parent_ids"]) == {d['parent_id'] for d in final_docs}
+        cache.record_semantic(hit)
+        trace.attrs["answer_cache"] = "semantic" if hit else "miss"
+        return pipeline_type, final_docs, candidate if hit else None, vector
+
+    async def _astore_answer(self, question: str, vector: Optional[List[float]], answer: str,
+                             pipeline_type: str, final_docs: List[Dict]):
+        """Caches a new answer; with ANSWER_CACHE_PATH its SQLite write runs off the event loop."""
+        if self.answer_cache is not None and vector is not None and answer:
+            await self.answer_cache.aput(question, vector, answer, pipeline_type, final_docs)
+
+    @staticmethod
+    async def _ainvoke_as_stream(chain, inputs: Dict) -> AsyncIterator[str]:
+        yield await chain.ainvoke(inputs)
+
+    async def _agenerate(self, trace: RequestTrace, chain, inputs: Dict) -> AsyncIterator[str]:
+        """Streams the chain's output, recording time-to-first-token, generation time and tokens/s."""
+        start = time.perf_counter()
+        first = None
+        parts = []
+        # The LLM cache is only consulted by invoke: one chunk per answer when it is enabled
+        chunks = self._ainvoke_as_stream(chain, inputs) if self.llm_cache is not None else chain.astream(inputs)
+        try:
+            async for chunk in chunks:
+                if first is None:
+                    first = time.perf_counter()
+                    trace.add_span("llm_ttft", start, first)
+                parts.append(chunk)
+                yield chunk
+        finally:
+            end = time.perf_counter()
+            tokens = estimate_tokens("".join(parts)) if parts else 0
+            decode_s = end - first if first is not None else 0.0
+            trace.add_span("llm_generation", start, end, output_tokens=tokens,
+                           tokens_per_s=round(tokens / decode_s, 1) if decode_s > 0 else None)
+
+    async def aquery(self, question: str) -> Dict:
+        """Entry Point with Router (async)"""
+        trace = RequestTrace("query")
+        try:
+            # 0. Router + 1. Retrieval (Shared, now with Rerank), behind the answer cache
+            timings = {}
+            pipeline_type, final_docs, cached, vector = await self._aretrieve_cached(trace, question, timings)
             
-        # 2. Context Construction
-        context_str = self.format_context(final_docs)
-        
-        # 3. Generation (Routed)
-        if pipeline_type == 'calc':
-            response_text = self.calc_chain.invoke({
-                "context": context_str,
-                "question": question
-            })
-        else:
-            response_text = self.std_chain.invoke({
+            if not final_docs:
+                return {
+                    "answer": "未在教材中找到相关信息。",
+                    "confidence": 0.0,
+                    "evidence": [],
+                    "trace": trace.to_dict()
+                }
+
+            if cached is not None:
+                return {
+                    "full_response": cached["answer"],
+                    "evidence_sources": [d['metadata'] for d in final_docs],
+                    "pipeline": pipeline_type,
+                    "retrieved_docs": final_docs,
+                    "retrieval_timings": timings,
+                    "answer_cache": trace.attrs["answer_cache"],
+                    "trace": trace.to_dict()
+                }
+                
+            # 2. Context Construction
+            with trace.span("format_context"):
+                context_str = self.format_context(final_docs)
+            
+            # 3. Generation (Routed); streamed internally to measure time to first token
+            await self._aensure_llm()
+            chain = self.calc_chain if pipeline_type == 'calc' else self.std_chain
+            parts = []
+            async for chunk in self._agenerate(trace, chain, {
                 "context": context_str,
                 "question": question
-            })
-        
-        return {
-            "full_response": response_text,
-            "evidence_sources": [d['metadata'] for d in final_docs],
-            "pipeline": pipeline_type,
-            "retrieved_docs": final_docs # Return for debug
-        }
+            }):
+                parts.append(chunk)
+            response_text = "".join(parts)
+            await self._astore_answer(question, vector, response_text, pipeline_type, final_docs)
+            
+            return {
+                "full_response": response_text,
+                "evidence_sources": [d['metadata'] for d in final_docs],
+                "pipeline": pipeline_type,
+                "retrieved_docs": final_docs, # Return for debug
+                "retrieval_timings": timings,
+                "trace": trace.to_dict()
+            }
+        finally:
+            self.tracer.record(trace)
+
+    def query(self, question: str) -> Dict:
+        """Entry Point with Router (sync wrapper around aquery)"""
+        return self._run_sync(self.aquery(question))
     
-    def query_stream(self, question: str):
+    async def aquery_stream(self, question: str) -> AsyncIterator[Dict]:
         """
-        Entry Point with Router - Streaming Version
+        Entry Point with Router - Streaming Version (async)
         
         Yields:
             dict: Streaming chunks containing:
-                - type: 'metadata' (initial), 'chunk' (streaming), 'sources' (final)
+                - type: 'metadata' (initial), 'chunk' (streaming), 'sources' (final, with the request 'trace')
                 - content: the actual content
                 - other metadata as needed
         """
-        # 0. Router
-        pipeline_type = self._classify_query(question)
-        
-        # 1. Retrieval (Shared, now with Rerank)
-        final_docs = self.hybrid_retrieval(question, final_k=5)
-        
-        # Yield metadata first
-        yield {
-            "type": "metadata",
-            "pipeline": pipeline_type,
-            "docs_found": len(final_docs)
-        }
-        
-        if not final_docs:
+        trace = RequestTrace("query_stream")
+        try:
+            # 0. Router + 1. Retrieval (Shared, now with Rerank), behind the answer cache
+            timings = {}
+            pipeline_type, final_docs, cached, vector = await self._aretrieve_cached(trace, question, timings)
+            
+            # Yield metadata first
             yield {
-                "type": "chunk",
-                "content": "未在教材中找到相关信息。"
+                "type": "metadata",
+                "pipeline": pipeline_type,
+                "docs_found": len(final_docs),
+                "retrieval_timings": timings,
+                "answer_cache": trace.attrs.get("answer_cache")
             }
+            
+            if not final_docs:
+                yield {
+                    "type": "chunk",
+                    "content": "未在教材中找到相关信息。"
+                }
+                yield {
+                    "type": "sources",
+                    "evidence_sources": [],
+                    "retrieved_docs": [],
+                    "trace": trace.to_dict()
+                }
+                return
+
+            if cached is not None:
+                # Same chunk protocol, without waiting on the LLM
+                for line in cached["answer"].splitlines(keepends=True):
+                    yield {
+                        "type": "chunk",
+                        "content": line
+                    }
+                yield {
+                    "type": "sources",
+                    "evidence_sources": [d['metadata'] for d in final_docs],
+                    "retrieved_docs": final_docs,
+                    "trace": trace.to_dict()
+                }
+                return
+            
+            # 2. Context Construction
+            with trace.span("format_context"):
+                context_str = self.format_context(final_docs)
+            
+            # 3. Generation (Routed) - Stream the response
+            await self._aensure_llm()
+            if pipeline_type == 'calc':
+                chain = self.calc_chain
+            else:
+                chain = self.std_chain
+            
+            # Stream chunks from LLM
+            parts = []
+            async for chunk in self._agenerate(trace, chain, {
+                "context": context_str,
+                "question": question
+            }):
+                parts.append(chunk)
+                yield {
+                    "type": "chunk",
+                    "content": chunk
+                }
+            # Only complete answers are cached (not one the consumer stopped reading)
+            await self._astore_answer(question, vector, "".join(parts), pipeline_type, final_docs)
+            
+            # Yield sources at the end
             yield {
                 "type": "sources",
-                "evidence_sources": [],
-                "retrieved_docs": []
-            }
-            return
-        
-        # 2. Context Construction
-        context_str = self.format_context(final_docs)
-        
-        # 3. Generation (Routed) - Stream the response
-        if pipeline_type == 'calc':
-            chain = self.calc_chain
-        else:
-            chain = self.std_chain
-        
-        # Stream chunks from LLM
-        for chunk in chain.stream({
-            "context": context_str,
-            "question": question
-        }):
-            yield {
-                "type": "chunk",
-                "content": chunk
+                "evidence_sources": [d['metadata'] for d in final_docs],
+                "retrieved_docs": final_docs,
+                "trace": trace.to_dict()
             }
-        
-        # Yield sources at the end
-        yield {
-            "type": "sources",
-            "evidence_sources": [d['metadata'] for d in final_docs],
-            "retrieved_docs": final_docs
-        }
+        finally:
+            # Also when the consumer stops early: the partial trace is still recorded
+            self.tracer.record(trace)
+
+    def query_stream(self, question: str):
+        """
+        Entry Point with Router - Streaming Version (sync wrapper around aquery_stream)
+        Same chunk protocol as aquery_stream.
+        """
+        agen = self.aquery_stream(question)
+
+        async def _next():
+            return await agen.__anext__()
+
+        async def _close():
+            await agen.aclose()
+
+        try:
+            while True:
+                try:
+                    chunk = self._run_sync(_next())
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        finally:
+            # Consumer stopped early (or finished): close the generator on the loop
+            self._run_sync(_close())
 
 if __name__ == "__main__":
     rag = FundRAG()
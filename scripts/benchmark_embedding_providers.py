@@ -0,0 +1,134 @@
+"""
+End-to-end retrieval latency per embedding provider (core.embedding_providers):
+- openai: text-embedding-3-small, one API round trip per query
+- local:  sentence-transformers model from models/ on CPU
+
+For each provider the corpus is embedded (through the shared embedding cache)
+into a temp native vector store + SQLite v3 DB, then every query runs
+FundRAG.hybrid_candidates (vector + keyword legs, parent fetch; no rerank,
+which is the same for both) with an empty query-embedding cache:
+    total      hybrid_candidates wall time, p50 / p95
+    vector     vector leg (query embedding + FAISS search), p50
+    recall@20  share of queries whose source parent is in the candidate pool
+
+Queries are spans cut from random children in exam-style wording
+(see benchmark_keyword_leg.py), so the gold parent is known.
+
+Usage:
+    python scripts/benchmark_embedding_providers.py                       # data/*.jsonl, both providers
+    python scripts/benchmark_embedding_providers.py --synthetic           # 500 parents / ~2000 children
+    python scripts/benchmark_embedding_providers.py --providers local --children 2000 --queries 100
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from build_index_v2 import load_jsonl, PARENTS_FILE, CHILDREN_FILE
+from benchmark_keyword_leg import make_queries, synthetic_corpus
+from core.embedding_cache import CachedEmbeddings
+from core.embedding_pipeline import EmbeddingPipeline
+from core.embedding_providers import PROVIDERS, load_embeddings
+from core.faiss_index import DEFAULT_PARAMS, resolve_params, build_index
+from core.sqlite_pool import SQLiteReadPool
+from core.sqlite_schema import build_sqlite_v3
+from core.vector_store import NativeVectorStore, native_maps, write_native_store
+from rag_pipeline_v3 import FundRAG
+
+
+def retrieval_rag(tmp: str, provider: str, parents: List[Dict], children: List[Dict]) -> FundRAG:
+    """FundRAG over a temp index embedded with `provider` (no LLM / reranker)."""
+    embeddings, spec = load_embeddings(provider)
+    start = time.perf_counter()
+    pipeline = EmbeddingPipeline(embeddings, checkpoint_dir=os.path.join(tmp, "checkpoints"),
+                                 concurrency=1 if provider == "local" else 4)
+    vectors = pipeline.embed([c['content'] for c in children])
+    print(f"[{provider}] {spec['embedding_model']}: embedded {len(children)} children "
+          f"in {time.perf_counter() - start:.1f} s ({pipeline.stats()['texts_per_s']} texts/s uncached)")
+
+    db_path = os.path.join(tmp, "sqlite_v3.db")
+    native_dir = os.path.join(tmp, "faiss_native")
+    build_sqlite_v3(parents, children, db_path)
+    params = resolve_params(dict(DEFAULT_PARAMS, index_type="flat"), *vectors.shape)
+    write_native_store(build_index(vectors, params), *native_maps(parents, children), native_dir, params)
+
+    rag = FundRAG.__new__(FundRAG)
+    # Queries are embedded for real on every call: memory LRU only, nothing persisted
+    rag.embeddings = CachedEmbeddings(embeddings.underlying, embeddings.model_name, store=None)
+    rag.vector_store = None
+    rag.native_store = NativeVectorStore(native_dir, child_texts=rag.get_child_texts)
+    rag.db = SQLiteReadPool(db_path)
+    rag.schema_version = 3
+    rag._init_keyword_vocab()
+    rag.bm25_index = None
+    rag.parent_store = None
+    rag.adaptive_pool = False
+    rag.fusion = False
+    rag._init_executors()
+    return rag
+
+
+def run(rag: FundRAG, queries: List[Dict]) -> Dict:
+    rag.hybrid_candidates("基金的申购与赎回")  # warm-up: connections, model
+    totals, vector_ms, recalled = [], [], 0
+    for q in queries:
+        timings = {}
+        t0 = time.perf_counter()
+        docs = rag.hybrid_candidates(q["query"], timings)
+        totals.append((time.perf_counter() - t0) * 1000)
+        vector_ms.append(timings.get("vector_ms", float("nan")))
+        recalled += q["gold"] in {d['parent_id'] for d in docs}
+    totals.sort()
+    return {
+        "total_p50_ms": round(statistics.median(totals), 2),
+        "total_p95_ms": round(totals[max(int(len(totals) * 0.95) - 1, 0)], 2),
+        "vector_p50_ms": round(float(np.nanmedian(vector_ms)), 2),
+        "recall@20": round(recalled / len(queries), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--providers", nargs="+", default=list(PROVIDERS), choices=PROVIDERS)
+    parser.add_argument("--children", type=int, default=0, help="Use only the first N children (0: all)")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        parents, children = synthetic_corpus(500)
+    else:
+        parents, children = load_jsonl(PARENTS_FILE), load_jsonl(CHILDREN_FILE)
+    if args.children:
+        children = children[:args.children]
+        used = {c['parent_id'] for c in children}
+        parents = [p for p in parents if p['parent_id'] in used]
+    queries = make_queries(children, args.queries)
+    print(f"\n{len(parents)} parents / {len(children)} children, {len(queries)} span queries\n")
+
+    results = {}
+    for provider in args.providers:
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                rag = retrieval_rag(tmp, provider, parents, children)
+            except Exception as e:
+                print(f"[{provider}] skipped: {e}")
+                continue
+            results[provider] = run(rag, queries)
+            rag.db.close_all()
+            rag.loop.call_soon_threadsafe(rag.loop.stop)
+
+    print()
+    for provider, stats in results.items():
+        print(f"{provider:>7}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
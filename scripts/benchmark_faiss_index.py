@@ -0,0 +1,129 @@
+"""
+Recall / latency / memory of the FAISS index types (core.faiss_index) against
+exact flat search, to pick FAISS_INDEX_TYPE and its parameters per corpus size.
+
+For every type the index is built once over the same vectors and queried with
+a sweep of its search knob (efSearch for HNSW, nprobe for IVF):
+    recall@k   share of the exact (flat) top-k found, averaged over queries
+    p50 / p95  single-query latency
+    memory     serialized index size (what faiss keeps in RAM)
+
+Vectors come from the built index (index/faiss_v2) or a synthetic clustered set;
+queries are perturbed copies of random corpus vectors, like questions about a passage.
+
+Usage:
+    python scripts/benchmark_faiss_index.py                         # index/faiss_v2
+    python scripts/benchmark_faiss_index.py --synthetic --n 200000  # model a bigger corpus
+    python scripts/benchmark_faiss_index.py --types hnsw ivf_pq --k 20
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from typing import Dict
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.faiss_index import INDEX_TYPES, DEFAULT_PARAMS, resolve_params, build_index, configure_search
+
+FAISS_INDEX_DIR = os.path.join("index", "faiss_v2")
+SWEEPS = {
+    "flat": [None],
+    "hnsw": [16, 32, 64, 128, 256],
+    "ivf_flat": [1, 4, 16, 64],
+    "ivf_pq": [1, 4, 16, 64],
+}
+
+
+def load_vectors(index_dir: str) -> np.ndarray:
+    index = faiss.read_index(os.path.join(index_dir, "index.faiss"))
+    if isinstance(index, faiss.IndexIVF):
+        index.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 200) -> np.ndarray:
+    """Unit vectors around random topic centres (embeddings of passages are clustered, not uniform)."""
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_queries(vectors: np.ndarray, n: int) -> np.ndarray:
+    rng = np.random.default_rng(42)
+    picked = vectors[rng.choice(len(vectors), n, replace=False)]
+    queries = picked + 0.3 * rng.standard_normal(picked.shape).astype(np.float32) / np.sqrt(vectors.shape[1])
+    return queries.astype(np.float32)
+
+
+def run(index: faiss.Index, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict:
+    index.search(queries[:1], k)  # warm-up
+    latencies, recalls = [], []
+    for i in range(len(queries)):
+        t0 = time.perf_counter()
+        _, ids = index.search(queries[i:i + 1], k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        recalls.append(len(set(ids[0]) & set(truth[i])) / k)
+    latencies.sort()
+    return {
+        "recall@k": round(statistics.mean(recalls), 4),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--n", type=int, default=50000, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=1536, help="Synthetic dimension (text-embedding-3-small: 1536)")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--pq-refine", type=int, default=4, help="Also run ivf_pq with exact re-ranking of N*k hits (0: off)")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.n, args.dim) if args.synthetic else load_vectors(FAISS_INDEX_DIR)
+    queries = make_queries(vectors, min(args.queries, len(vectors)))
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"\n{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}\n")
+    print(f"{'type':>15} {'knob':>12} {'build_s':>8} {'memory_mb':>10} {'recall@k':>9} {'p50_ms':>8} {'p95_ms':>8}")
+    configs = [(t, {}) for t in args.types]
+    if "ivf_pq" in args.types and args.pq_refine:
+        configs.append(("ivf_pq", {"pq_refine": args.pq_refine}))
+    for index_type, overrides in configs:
+        params = resolve_params(dict(DEFAULT_PARAMS, index_type=index_type, **overrides),
+                                len(vectors), vectors.shape[1])
+        t0 = time.perf_counter()
+        index = build_index(vectors, params)
+        build_s = time.perf_counter() - t0
+        memory_mb = len(faiss.serialize_index(index)) / 1e6
+
+        knob = "ef_search" if index_type == "hnsw" else "nprobe"
+        for value in SWEEPS[index_type]:
+            label = "-"
+            if value is not None:
+                if knob == "nprobe" and value > params["nlist"]:
+                    continue
+                params[knob] = value
+                configure_search(index, params)
+                label = f"{knob}={value}"
+            result = run(index, queries, truth, args.k)
+            name = index_type + ("+refine" if params.get("pq_refine") else "")
+            print(f"{name:>15} {label:>12} {build_s:>8.1f} {memory_mb:>10.1f} "
+                  f"{result['recall@k']:>9} {result['p50_ms']:>8} {result['p95_ms']:>8}")
+        if index_type.startswith("ivf"):
+            print(f"{'':>15} (nlist={params['nlist']}" +
+                  (f", pq_m={params['pq_m']}, pq_nbits={params['pq_nbits']}, pq_refine={params['pq_refine']})"
+                   if index_type == "ivf_pq" else ")"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Recall / latency of the keyword leg:
+- phrase: old FTS5 index (unicode61 over raw content), whole question as one quoted phrase
+- bigram: FTS5 CJK bigram index (content_tokens) queried with selective OR-ed bigrams
+- bm25:   in-process BM25 over memory-mapped sparse arrays (KEYWORD_BACKEND=bm25)
+
+All indexes are built into a temp dir from the same parents/children and queried
+through FundRAG.search_child_keyword. Queries are spans cut from random
+children and wrapped in exam-style boilerplate, so the gold parent is known:
+    recall@k = share of queries whose source parent is among the k hits.
+
+Usage:
+    python scripts/benchmark_keyword_leg.py                 # data/parents.jsonl + children.jsonl
+    python scripts/benchmark_keyword_leg.py --synthetic
+    python scripts/benchmark_keyword_leg.py --validation    # + hit rate on validation questions
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from typing import List, Dict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from build_index_v2 import build_sqlite_v2, build_bm25, load_jsonl, PARENTS_FILE, CHILDREN_FILE
+from core.sqlite_pool import SQLiteReadPool
+from core.bm25_index import BM25Index
+from rag_pipeline_v3 import FundRAG
+
+VALIDATION_FILE = os.path.join("rawdoc", "validation_set.xlsx")
+TEMPLATES = [
+    "{span}",
+    "关于{span}，下列说法正确的是？",
+    "以下关于{span}的说法错误的是",
+    "{span}是指什么？",
+]
+
+
+def build_phrase_db(path: str, parents: List[Dict], children: List[Dict]):
+    """The pre-bigram build_sqlite_v2 schema."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE doc_parents (id TEXT PRIMARY KEY, content TEXT, metadata TEXT)")
+    conn.execute("CREATE VIRTUAL TABLE doc_children_fts USING fts5(content, parent_id, metadata)")
+    conn.executemany("INSERT INTO doc_parents VALUES (?, ?, ?)", [
+        (p['parent_id'], p['content'], json.dumps(p['metadata'], ensure_ascii=False)) for p in parents
+    ])
+    conn.executemany("INSERT INTO doc_children_fts VALUES (?, ?, ?)", [
+        (c['content'], c['parent_id'], json.dumps(c['metadata'], ensure_ascii=False)) for c in children
+    ])
+    conn.commit()
+    conn.close()
+
+
+def synthetic_corpus(n_parents: int = 2000):
+    """Unspaced Chinese-like text, Zipf-distributed words from a 20000-word vocabulary (no index needed)."""
+    rnd = random.Random(0)
+    vocab = ["".join(chr(rnd.randint(0x4E00, 0x9FA5)) for _ in range(rnd.choice((2, 2, 3, 4))))
+             for _ in range(20000)]
+    weights = [1.0 / rank for rank in range(1, len(vocab) + 1)]
+    meta = {"book": "证券投资基金", "chapter": "第1章", "section": "第一节"}
+    parents, children = [], []
+    for i in range(n_parents):
+        words = [w + ("，" if rnd.random() < 0.1 else "") for w in rnd.choices(vocab, weights, k=450)]
+        text = "".join(words)[:1000]
+        pid = f"p{i}"
+        parents.append({"parent_id": pid, "content": text, "metadata": meta})
+        for start in range(0, len(text), 250):
+            children.append({"parent_id": pid, "content": text[start:start + 300], "metadata": meta})
+    return parents, children
+
+
+def make_queries(children: List[Dict], n: int) -> List[Dict]:
+    rnd = random.Random(42)
+    queries = []
+    while len(queries) < n:
+        child = rnd.choice(children)
+        text = child['content']
+        if len(text) < 20:
+            continue
+        length = rnd.randint(8, 16)
+        start = rnd.randint(0, len(text) - length)
+        span = text[start:start + length]
+        queries.append({"query": rnd.choice(TEMPLATES).format(span=span), "gold": child['parent_id']})
+    return queries
+
+
+def keyword_rag(db_path: str, bm25_dir: str = None) -> FundRAG:
+    """FundRAG with only the keyword side initialised (no FAISS / LLM / OpenAI key needed)."""
+    rag = FundRAG.__new__(FundRAG)
+    rag.db = SQLiteReadPool(db_path)
+    rag._init_keyword_vocab()
+    rag.bm25_index = BM25Index.load(bm25_dir) if bm25_dir else None
+    return rag
+
+
+def run(rag: FundRAG, queries: List[Dict], k: int) -> Dict:
+    rag.search_child_keyword(queries[0]["query"], k=k)  # warm-up
+    latencies, hits, recalled = [], 0, 0
+    for q in queries:
+        t0 = time.perf_counter()
+        results = rag.search_child_keyword(q["query"], k=k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += bool(results)
+        recalled += q.get("gold") in {r['parent_id'] for r in results}
+    latencies.sort()
+    return {
+        "hit_rate": round(hits / len(queries), 4),
+        "recall@k": round(recalled / len(queries), 4),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--validation", action="store_true", help="Also report hit rate on validation questions")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        parents, children = synthetic_corpus()
+    else:
+        parents, children = load_jsonl(PARENTS_FILE), load_jsonl(CHILDREN_FILE)
+    queries = make_queries(children, args.queries)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engines = {
+            "phrase": os.path.join(tmp, "phrase.db"),
+            "bigram": os.path.join(tmp, "bigram.db"),
+        }
+        build_phrase_db(engines["phrase"], parents, children)
+        build_sqlite_v2(parents, children, db_path=engines["bigram"])
+        bm25_dir = os.path.join(tmp, "bm25")
+        build_bm25(children, index_dir=bm25_dir)
+
+        validation = []
+        if args.validation:
+            import pandas as pd
+            df = pd.read_excel(VALIDATION_FILE)
+            col = 'question' if 'question' in df.columns else df.columns[0]
+            validation = [{"query": q} for q in df[col].dropna().astype(str)]
+
+        print(f"\n{len(children)} children, {len(queries)} span queries, k={args.k}\n")
+        for name in ("phrase", "bigram", "bm25"):
+            rag = keyword_rag(engines.get(name, engines["bigram"]), bm25_dir if name == "bm25" else None)
+            line = f"{name:>7}: {run(rag, queries, args.k)}"
+            if validation:
+                val = run(rag, validation, args.k)
+                line += f"  validation hit_rate={val['hit_rate']} p50={val['p50_ms']}ms"
+            print(line)
+            rag.db.close_all()
+
+
+if __name__ == "__main__":
+    main()
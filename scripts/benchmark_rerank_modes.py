@@ -0,0 +1,114 @@
+"""
+Compares the two rerank inputs (RERANK_MODE):
+- parent: one CrossEncoder pair per candidate parent (full content, up to 2000 chars)
+- child:  one pair per matched child window (~300 chars), max-pooled per parent
+
+Reports per query: rerank latency, reranker input tokens per pair and
+top-k agreement of the child ranking with the parent ranking.
+Candidates come from the real retrieval legs (FundRAG.hybrid_candidates),
+so both modes rerank the exact same pool. The rerank score cache is disabled.
+
+Usage:
+    python scripts/benchmark_rerank_modes.py --queries 30
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from typing import List, Dict
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["RERANK_CACHE"] = "0"
+from rag_pipeline_v3 import FundRAG
+
+VALIDATION_FILE = os.path.join("rawdoc", "validation_set.xlsx")
+MODES = ("parent", "child")
+
+
+def load_questions(n_queries: int) -> List[str]:
+    df = pd.read_excel(VALIDATION_FILE)
+    col = 'question' if 'question' in df.columns else df.columns[0]
+    questions = df[col].dropna().astype(str).tolist()
+    random.Random(0).shuffle(questions)
+    return questions[:n_queries]
+
+
+def token_counter(reranker):
+    """Counts pair tokens with the reranker's own tokenizer (falls back to characters)."""
+    tokenizer = getattr(reranker, "tokenizer", None) or getattr(getattr(reranker, "model", None), "tokenizer", None)
+    if tokenizer is None:
+        return lambda query, text: len(query) + len(text)
+    return lambda query, text: min(len(tokenizer(query, text, truncation=False)["input_ids"]), 512)
+
+
+def run_mode(rag: FundRAG, mode: str, workload: List[Dict], count_tokens) -> List[Dict]:
+    rag.rerank_mode = mode
+    # Warm-up (first forward pass is always slower)
+    rag._rerank_docs(workload[0]["query"], [dict(d) for d in workload[0]["candidates"]])
+
+    results = []
+    for w in workload:
+        docs = [dict(d) for d in w["candidates"]]
+        items = rag._rerank_items(docs)
+        t0 = time.perf_counter()
+        ranked = rag._rerank_docs(w["query"], docs)
+        results.append({
+            "latency_ms": (time.perf_counter() - t0) * 1000,
+            "pairs": len(items),
+            "tokens_per_pair": statistics.mean(count_tokens(w["query"], text) for _, _, text in items),
+            "ranking": [d["parent_id"] for d in ranked],
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=3, help="k for top-k agreement (pipeline final_k)")
+    args = parser.parse_args()
+
+    rag = FundRAG()
+    rag.ensure_reranker()
+    count_tokens = token_counter(rag.reranker)
+
+    workload = []
+    for q in load_questions(args.queries):
+        candidates = rag.hybrid_candidates(q)
+        if candidates:
+            workload.append({"query": q, "candidates": candidates})
+    print(f"{len(workload)} queries, avg pool {statistics.mean(len(w['candidates']) for w in workload):.1f} parents\n")
+
+    by_mode = {mode: run_mode(rag, mode, workload, count_tokens) for mode in MODES}
+
+    rows = []
+    for mode in MODES:
+        res = by_mode[mode]
+        latencies = sorted(r["latency_ms"] for r in res)
+        agreement = [
+            len(set(r["ranking"][:args.top_k]) & set(ref["ranking"][:args.top_k])) / args.top_k
+            for r, ref in zip(res, by_mode["parent"])
+        ]
+        top1 = [r["ranking"][0] == ref["ranking"][0] for r, ref in zip(res, by_mode["parent"])]
+        rows.append({
+            "mode": mode,
+            "pairs_per_query": round(statistics.mean(r["pairs"] for r in res), 1),
+            "tokens_per_pair": round(statistics.mean(r["tokens_per_pair"] for r in res), 1),
+            "mean_ms": round(statistics.mean(latencies), 1),
+            "p50_ms": round(statistics.median(latencies), 1),
+            "p95_ms": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)], 1),
+            f"top{args.top_k}_agreement": round(statistics.mean(agreement), 4),
+            "top1_agreement": round(statistics.mean(top1), 4),
+        })
+
+    result = pd.DataFrame(rows)
+    base = result.loc[result['mode'] == 'parent', 'mean_ms'].iloc[0]
+    result["speedup"] = (base / result["mean_ms"]).round(2)
+    print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compares reranker backends against the torch CrossEncoder:
+- latency per query (one query x N candidate parents, like _rerank_docs)
+- ranking agreement with torch scores: Kendall tau and top-5 overlap
+
+Queries come from the validation set, candidates from index/sqlite_v3.db (or v2) parents
+(random sample per query, mirroring the 20-parent rerank pool).
+
+Usage:
+    python scripts/benchmark_reranker_backends.py --queries 30
+    python scripts/benchmark_reranker_backends.py --backends torch onnx-int8
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import statistics
+from typing import List, Dict
+
+import numpy as np
+import pandas as pd
+from scipy.stats import kendalltau
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.reranker_backends import load_reranker, BACKENDS
+
+SQLITE_DB_PATH = os.path.join("index", "sqlite_v3.db")
+if not os.path.exists(SQLITE_DB_PATH):
+    SQLITE_DB_PATH = os.path.join("index", "sqlite_v2.db")
+VALIDATION_FILE = os.path.join("rawdoc", "validation_set.xlsx")
+
+
+def load_workload(n_queries: int, pool_size: int) -> List[Dict]:
+    df = pd.read_excel(VALIDATION_FILE)
+    col = 'question' if 'question' in df.columns else df.columns[0]
+    questions = df[col].dropna().astype(str).tolist()
+
+    conn = sqlite3.connect(SQLITE_DB_PATH)
+    table = "parents" if conn.execute("PRAGMA user_version").fetchone()[0] >= 3 else "doc_parents"
+    parents = [r[0] for r in conn.execute(f"SELECT content FROM {table}")]
+    conn.close()
+
+    rnd = random.Random(0)
+    rnd.shuffle(questions)
+    return [
+        {"query": q, "candidates": rnd.sample(parents, min(pool_size, len(parents)))}
+        for q in questions[:n_queries]
+    ]
+
+
+def score_all(backend, workload: List[Dict]):
+    # Warm-up pass (first forward pass is always slower)
+    w = workload[0]
+    backend.predict([[w["query"], c] for c in w["candidates"]], batch_size=len(w["candidates"]))
+
+    latencies, all_scores = [], []
+    for w in workload:
+        pairs = [[w["query"], c] for c in w["candidates"]]
+        t0 = time.perf_counter()
+        scores = np.asarray(backend.predict(pairs, batch_size=len(pairs)), dtype=np.float64)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        all_scores.append(scores)
+    return latencies, all_scores
+
+
+def top_k_overlap(a: np.ndarray, b: np.ndarray, k: int = 5) -> float:
+    top_a = set(np.argsort(-a)[:k])
+    top_b = set(np.argsort(-b)[:k])
+    return len(top_a & top_b) / k
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--pool-size", type=int, default=20, help="Candidate parents per query")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    args = parser.parse_args()
+
+    workload = load_workload(args.queries, args.pool_size)
+    print(f"{len(workload)} queries x {args.pool_size} parents\n")
+
+    reference = None
+    rows = []
+    for name in ["torch"] + [b for b in args.backends if b != "torch"]:
+        t0 = time.perf_counter()
+        backend = load_reranker(name)
+        load_s = time.perf_counter() - t0
+        latencies, scores = score_all(backend, workload)
+        if reference is None:
+            reference = scores
+
+        taus = [kendalltau(ref, s).correlation for ref, s in zip(reference, scores)]
+        overlaps = [top_k_overlap(ref, s) for ref, s in zip(reference, scores)]
+        rows.append({
+            "backend": name,
+            "load_s": round(load_s, 2),
+            "mean_ms": round(statistics.mean(latencies), 1),
+            "p50_ms": round(statistics.median(latencies), 1),
+            "p95_ms": round(sorted(latencies)[int(len(latencies) * 0.95) - 1], 1),
+            "kendall_tau": round(float(np.nanmean(taus)), 4),
+            "top5_overlap": round(float(np.mean(overlaps)), 4),
+        })
+        del backend
+
+    result = pd.DataFrame(rows)
+    base = result.loc[result['backend'] == 'torch', 'mean_ms'].iloc[0]
+    result["speedup"] = (base / result["mean_ms"]).round(2)
+    print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Micro-benchmark: per-query SQLite retrieval latency,
+connect-per-query (old FundRAG behaviour) vs pooled read-only connections.
+
+Each "query" = one FTS5 keyword search + one get_parents batch fetch (20 ids),
+i.e. the SQLite work of a single hybrid_retrieval call.
+
+Usage:
+    python scripts/benchmark_sqlite_pool.py                  # uses index/sqlite_v2.db
+    python scripts/benchmark_sqlite_pool.py --synthetic      # temp DB, no index needed
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from typing import List, Callable
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.sqlite_pool import SQLiteReadPool
+
+DEFAULT_DB = os.path.join("index", "sqlite_v2.db")
+
+KEYWORD_SQL = """
+    SELECT content, parent_id, metadata
+    FROM doc_children_fts
+    WHERE doc_children_fts MATCH ?
+    ORDER BY rank
+    LIMIT ?
+"""
+
+
+def build_synthetic_db(path: str, n_parents: int = 2000):
+    """Same schema as build_index_v2.build_sqlite_v2, filled with random text."""
+    rnd = random.Random(0)
+    # ~5000 random two-character CJK "words" so phrase matches are selective, like real queries
+    vocab = [chr(rnd.randint(0x4E00, 0x9FA5)) + chr(rnd.randint(0x4E00, 0x9FA5)) for _ in range(5000)]
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE doc_parents (id TEXT PRIMARY KEY, content TEXT, metadata TEXT)")
+    conn.execute("CREATE VIRTUAL TABLE doc_children_fts USING fts5(content, parent_id, metadata)")
+    meta = json.dumps({"book": "证券投资基金", "chapter": "第1章", "section": "第一节"}, ensure_ascii=False)
+    parents, children = [], []
+    for i in range(n_parents):
+        text = " ".join(rnd.choice(vocab) for _ in range(400))
+        pid = f"p{i}"
+        parents.append((pid, text, meta))
+        for start in range(0, len(text), 250):
+            children.append((text[start:start + 300], pid, meta))
+    conn.executemany("INSERT INTO doc_parents VALUES (?, ?, ?)", parents)
+    conn.executemany("INSERT INTO doc_children_fts VALUES (?, ?, ?)", children)
+    conn.commit()
+    conn.close()
+
+
+def load_workload(db_path: str, n: int) -> List[tuple]:
+    conn = sqlite3.connect(db_path)
+    ids = [r[0] for r in conn.execute("SELECT id FROM doc_parents")]
+    words = [r[0] for r in conn.execute("SELECT content FROM doc_children_fts LIMIT 500")]
+    conn.close()
+    rnd = random.Random(42)
+    workload = []
+    for _ in range(n):
+        phrase = rnd.choice(words).split()[0] if words else "基金"
+        workload.append((f'"{phrase}"', rnd.sample(ids, min(20, len(ids)))))
+    return workload
+
+
+def query_connect_per_call(db_path: str, phrase: str, parent_ids: List[str]):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(KEYWORD_SQL, (phrase, 20)).fetchall()
+    [json.loads(r['metadata']) for r in rows]
+    conn.close()
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    placeholders = ','.join(['?'] * len(parent_ids))
+    rows = conn.execute(f"SELECT id, content, metadata FROM doc_parents WHERE id IN ({placeholders})", parent_ids).fetchall()
+    [json.loads(r['metadata']) for r in rows]
+    conn.close()
+
+
+def make_pooled(pool: SQLiteReadPool) -> Callable:
+    def query_pooled(db_path: str, phrase: str, parent_ids: List[str]):
+        rows = pool.execute(KEYWORD_SQL, (phrase, 20))
+        [json.loads(r['metadata']) for r in rows]
+        placeholders = ','.join(['?'] * len(parent_ids))
+        rows = pool.execute(f"SELECT id, content, metadata FROM doc_parents WHERE id IN ({placeholders})", parent_ids)
+        [json.loads(r['metadata']) for r in rows]
+    return query_pooled
+
+
+def run(name: str, fn: Callable, db_path: str, workload: List[tuple]):
+    # Warm the OS page cache equally for both variants
+    for phrase, ids in workload[:10]:
+        fn(db_path, phrase, ids)
+
+    latencies = []
+    for phrase, ids in workload:
+        t0 = time.perf_counter()
+        fn(db_path, phrase, ids)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<22} mean={statistics.mean(latencies):7.3f} ms  "
+          f"p50={statistics.median(latencies):7.3f} ms  p95={p95:7.3f} ms")
+    return statistics.mean(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite V2 DB to benchmark")
+    parser.add_argument("--synthetic", action="store_true", help="Use a generated temp DB")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    db_path = args.db
+    if args.synthetic or not os.path.exists(db_path):
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp_dir.name, "bench.db")
+        print(f"Building synthetic DB at {db_path} ...")
+        build_synthetic_db(db_path)
+
+    workload = load_workload(db_path, args.queries)
+    print(f"Running {len(workload)} queries (keyword search + get_parents x20) on {db_path}\n")
+
+    before = run("connect-per-query", query_connect_per_call, db_path, workload)
+    pool = SQLiteReadPool(db_path)
+    after = run("pooled read-only", make_pooled(pool), db_path, workload)
+    pool.close_all()
+
+    print(f"\nSpeedup: {before / after:.2f}x")
+
+    if tmp_dir:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Startup time / memory of the vector store formats, each loaded in a fresh process:
+- pickle: FAISS.load_local (index.faiss + unpickled index.pkl docstore)
+- native: core.vector_store.NativeVectorStore (mmap-ed index.faiss + int32 id maps)
+
+Reports load time, RSS added by the load and vector search latency (native hits
+include the child-text lookup from SQLite v3).
+
+Usage:
+    python scripts/benchmark_vector_store.py                  # index/faiss_v2 vs index/faiss_native
+    python scripts/benchmark_vector_store.py --synthetic      # 2000 parents / ~8000 children, 1536 dims
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+INDEX_DIR = "index"
+DIM = 1536
+
+
+def measure(fmt: str, index_dir: str, db_path: str, queries: int = 200) -> dict:
+    """Runs in the child process: load once, then time single-vector searches."""
+    import faiss
+    from core.vector_store import rss_mb, timed_load
+    rss_start = rss_mb()  # interpreter + libraries, before any index data
+
+    if fmt == "pickle":
+        from langchain_community.vectorstores import FAISS
+        from langchain_core.embeddings import FakeEmbeddings
+        store, seconds, rss = timed_load(lambda: FAISS.load_local(
+            index_dir, FakeEmbeddings(size=1), allow_dangerous_deserialization=True
+        ))
+        dim = store.index.d
+        search = lambda vec: store.similarity_search_with_score_by_vector(vec, 20)
+    else:
+        from core.sqlite_pool import SQLiteReadPool
+        from core.sqlite_schema import CHILDREN_SQL
+        from core.vector_store import NativeVectorStore
+        db = SQLiteReadPool(db_path)
+
+        def child_texts(ids):
+            sql = CHILDREN_SQL.format(placeholders=','.join(['?'] * len(ids)))
+            return {row['id']: row['content'] for row in db.execute(sql, ids)}
+
+        store, seconds, rss = timed_load(lambda: NativeVectorStore(index_dir, child_texts=child_texts))
+        dim = store.index.d
+        search = lambda vec: store.search_by_vector(vec, 20)
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((queries, dim)).astype(np.float32).tolist()
+    search(vectors[0])  # warm-up
+    latencies = []
+    for vec in vectors:
+        t0 = time.perf_counter()
+        search(vec)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return {
+        "load_ms": round(seconds * 1000, 1),
+        "load_rss_mb": round(rss, 1),
+        "total_rss_mb": round(rss_mb(), 1),
+        "baseline_rss_mb": round(rss_start, 1),
+        "search_p50_ms": round(statistics.median(latencies), 3),
+    }
+
+
+def build_synthetic(tmp: str):
+    """Both formats over the same synthetic corpus with random embeddings."""
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import FakeEmbeddings
+    from benchmark_keyword_leg import synthetic_corpus
+    from core.sqlite_schema import build_sqlite_v3
+    from core.vector_store import native_maps, write_native_store
+
+    parents, children = synthetic_corpus()
+    db_path = os.path.join(tmp, "sqlite_v3.db")
+    build_sqlite_v3(parents, children, db_path)
+
+    vectors = np.random.default_rng(1).standard_normal((len(children), DIM)).astype(np.float32)
+    metadatas = [dict(c['metadata'], parent_id=c['parent_id']) for c in children]
+    store = FAISS.from_embeddings(
+        [(c['content'], v) for c, v in zip(children, vectors.tolist())], FakeEmbeddings(size=DIM), metadatas=metadatas
+    )
+    pickle_dir, native_dir = os.path.join(tmp, "faiss_v2"), os.path.join(tmp, "faiss_native")
+    store.save_local(pickle_dir)
+    write_native_store(store.index, *native_maps(parents, children), native_dir)
+    return pickle_dir, native_dir, db_path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--child", choices=("pickle", "native"), help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.dir, args.db)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            pickle_dir, native_dir, db_path = build_synthetic(tmp)
+        else:
+            pickle_dir = os.path.join(INDEX_DIR, "faiss_v2")
+            native_dir = os.path.join(INDEX_DIR, "faiss_native")
+            db_path = os.path.join(INDEX_DIR, "sqlite_v3.db")
+
+        results = {}
+        for fmt, index_dir in (("pickle", pickle_dir), ("native", native_dir)):
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", fmt, "--dir", index_dir, "--db", db_path],
+                capture_output=True, text=True, check=True
+            ).stdout
+            results[fmt] = json.loads(out.strip().splitlines()[-1])
+            print(f"{fmt:>7}: {results[fmt]}")
+
+        saved_ms = results["pickle"]["load_ms"] - results["native"]["load_ms"]
+        saved_mb = results["pickle"]["load_rss_mb"] - results["native"]["load_rss_mb"]
+        print(f"\nnative saves {saved_ms:.0f} ms startup and {saved_mb:.1f} MB RSS per process")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import sqlite3
 import shutil
@@ -10,6 +11,9 @@ from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.embedding_cache import cached_embeddings
+
 # Load env
 load_dotenv()
 
@@ -64,13 +68,14 @@ def build_faiss_index(chunks: List[Dict]):
         )
         documents.append(doc)
     
-    # Initialize Embeddings
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small") # Cost-effective model
+    # Initialize Embeddings (shared embedding store: re-runs only embed unseen chunks)
+    embeddings = cached_embeddings(OpenAIEmbeddings(model="text-embedding-3-small"), "text-embedding-3-small") # Cost-effective model
     
     # Create VectorStore
     # Using from_documents will call OpenAI API to get embeddings
     print(f"Generating embeddings for {len(documents)} documents. This may take a while...")
     vectorstore = FAISS.from_documents(documents, embeddings)
+    print(f"Embedding cache: {embeddings.stats()}")
     
     # Save
     if not os.path.exists(FAISS_INDEX_DIR):
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import sqlite3
 from typing import List, Dict
@@ -6,8 +7,19 @@ from dotenv import load_dotenv
 
 # LangChain Imports
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.documents import Document
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.embedding_providers import load_embeddings, check_index_embeddings
+from core.embedding_pipeline import EmbeddingPipeline
+from core.index_manifest import write_manifest, load_manifest
+from core.cjk_tokenize import index_text
+from core.bm25_index import BM25Index, BM25_INDEX_DIR
+from core.sqlite_schema import build_sqlite_v3
+from core.parent_store import write_parent_store, PARENT_STORE_PATH
+from core.faiss_index import params_from_env, rebuild_vector_store, save_params
+from core.vector_store import native_maps, write_native_store, NATIVE_INDEX_DIR
+from core.content_ids import has_content_ids
+from core.index_update import update_index
 
 # Load env
 load_dotenv()
@@ -17,6 +29,7 @@ DATA_DIR = "data"
 INDEX_DIR = "index"
 FAISS_INDEX_DIR = os.path.join(INDEX_DIR, "faiss_v2")
 SQLITE_DB_PATH = os.path.join(INDEX_DIR, "sqlite_v2.db")
+SQLITE_V3_DB_PATH = os.path.join(INDEX_DIR, "sqlite_v3.db")
 
 PARENTS_FILE = os.path.join(DATA_DIR, "parents.jsonl")
 CHILDREN_FILE = os.path.join(DATA_DIR, "children.jsonl")
@@ -29,20 +42,26 @@ def load_jsonl(file_path: str) -> List[Dict]:
                 data.append(json.loads(line))
     return data
 
-def build_sqlite_v2(parents: List[Dict], children: List[Dict]):
+def build_sqlite_v2(parents: List[Dict], children: List[Dict], db_path: str = SQLITE_DB_PATH):
     """
     Builds SQLite DB with:
     1. doc_parents (Regular Table): id, content, metadata (json)
-    2. doc_children_fts (FTS Table): content, parent_id, metadata (json)
+    2. doc_children_fts (FTS Table): content, parent_id, metadata (json) stored only,
+       content_tokens (CJK bigrams, see core.cjk_tokenize) indexed
+    3. doc_children_vocab (fts5vocab): per-term document frequencies for query term selection
     """
     print("--- Building SQLite V2 ---")
     
-    if os.path.exists(SQLITE_DB_PATH):
-        os.remove(SQLITE_DB_PATH)
+    if os.path.exists(db_path):
+        os.remove(db_path)
         
-    conn = sqlite3.connect(SQLITE_DB_PATH)
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
+    # WAL is persistent in the DB file: lets FundRAG's read-only pooled
+    # connections read concurrently from many threads/processes
+    cursor.execute("PRAGMA journal_mode=WAL")
+    
     # 1. Parent Table (Regular)
     cursor.execute('''
         CREATE TABLE doc_parents (
@@ -55,11 +74,13 @@ def build_sqlite_v2(parents: List[Dict], children: List[Dict]):
     # 2. Child FTS Table (Virtual)
     cursor.execute('''
         CREATE VIRTUAL TABLE doc_children_fts USING fts5(
-            content,
-            parent_id,
-            metadata
+            content UNINDEXED,
+            parent_id UNINDEXED,
+            metadata UNINDEXED,
+            content_tokens
         )
     ''')
+    cursor.execute("CREATE VIRTUAL TABLE doc_children_vocab USING fts5vocab(doc_children_fts, 'row')")
     
     # Insert Parents
     print(f"Inserting {len(parents)} parents...")
@@ -72,54 +93,148 @@ def build_sqlite_v2(parents: List[Dict], children: List[Dict]):
     # Insert Children
     print(f"Inserting {len(children)} children to FTS...")
     child_data = [
-        (c['content'], c['parent_id'], json.dumps(c['metadata'], ensure_ascii=False))
+        (c['content'], c['parent_id'], json.dumps(c['metadata'], ensure_ascii=False), index_text(c['content']))
         for c in children
     ]
-    cursor.executemany('INSERT INTO doc_children_fts VALUES (?, ?, ?)', child_data)
+    cursor.executemany('INSERT INTO doc_children_fts VALUES (?, ?, ?, ?)', child_data)
+    # Merge FTS segments: fewer b-trees to probe per query term
+    cursor.execute("INSERT INTO doc_children_fts(doc_children_fts) VALUES ('optimize')")
     
     conn.commit()
     conn.close()
-    print(f"SQLite V2 saved to {SQLITE_DB_PATH}")
+    print(f"SQLite V2 saved to {db_path}")
+
+def build_bm25(children: List[Dict], index_dir: str = BM25_INDEX_DIR):
+    """Sparse BM25 arrays for KEYWORD_BACKEND=bm25 (memory-mapped by FundRAG)."""
+    print("--- Building BM25 (in-process keyword index) ---")
+    index = BM25Index.build(children)
+    index.save(index_dir)
+    print(f"BM25 index ({index.weights.shape[1]} terms, {index.weights.nnz} postings) saved to {index_dir}")
+
+def embedding_pipeline(embeddings, spec: Dict) -> EmbeddingPipeline:
+    """Token-budgeted concurrent batches, checkpointed: an interrupted build resumes."""
+    pipeline = EmbeddingPipeline.from_env(embeddings)
+    if spec["embedding_provider"] == "local":
+        pipeline.concurrency = 1  # torch already uses every core for one batch
+    return pipeline
 
-def build_faiss_v2(children: List[Dict]):
+def build_faiss_v2(children: List[Dict], index_type: str = None, parents: List[Dict] = None,
+                   embeddings=None, spec: Dict = None) -> Dict:
     """
     Builds FAISS index for Children.
     Metadata includes 'parent_id' for mapping.
+    With `parents`, also writes the native store (index + int32 id maps, core.vector_store).
+    index_type: flat | hnsw | ivf_flat | ivf_pq (default: FAISS_INDEX_TYPE, see core.faiss_index).
+    embeddings / spec: from core.embedding_providers.load_embeddings (default: EMBEDDING_PROVIDER).
+    Returns the resolved index parameters.
     """
     print("--- Building FAISS V2 (Children) ---")
     
-    documents = []
+    texts = []
+    metadatas = []
     for c in children:
         meta = c['metadata'].copy()
         meta['parent_id'] = c['parent_id'] # Crucial for mapping
         
-        doc = Document(
-            page_content=c['content'],
-            metadata=meta
-        )
-        documents.append(doc)
+        texts.append(c['content'])
+        metadatas.append(meta)
         
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    # Cached: re-running the build only embeds children it has never seen
+    if embeddings is None:
+        embeddings, spec = load_embeddings()
+    print(f"Embedding provider: {spec['embedding_provider']} ({spec['embedding_model']})")
+    pipeline = embedding_pipeline(embeddings, spec)
+    
+    print(f"Embedding {len(texts)} children...")
+    vectors = pipeline.embed(texts)
+    print(f"Embedding pipeline: {pipeline.stats()}")
+    print(f"Embedding cache: {embeddings.stats()}")
+    vectorstore = FAISS.from_embeddings(zip(texts, vectors.tolist()), embeddings, metadatas=metadatas)
     
-    print(f"Embedding {len(documents)} children...")
-    vectorstore = FAISS.from_documents(documents, embeddings)
+    params = rebuild_vector_store(vectorstore, params_from_env(index_type))
+    print(f"FAISS index type: {params['index_type']}")
     
     if not os.path.exists(FAISS_INDEX_DIR):
         os.makedirs(FAISS_INDEX_DIR)
         
     vectorstore.save_local(FAISS_INDEX_DIR)
+    save_params(FAISS_INDEX_DIR, params)
     print(f"FAISS V2 saved to {FAISS_INDEX_DIR}")
+    
+    if parents is not None:
+        write_native_store(vectorstore.index, *native_maps(parents, children), NATIVE_INDEX_DIR, params)
+        print(f"Native vector store saved to {NATIVE_INDEX_DIR}")
+    return params
+
+def update_incremental(parents: List[Dict], children: List[Dict], embeddings=None, spec: Dict = None) -> Dict:
+    """
+    Diffs parents/children against the current index by content id and applies
+    only the changes to SQLite V3 and the native vector store (core.index_update);
+    only new children are embedded. index/faiss_v2 (pickle) is left as is.
+    """
+    print("--- Incremental update (SQLite V3 + native vector store) ---")
+    if embeddings is None:
+        embeddings, spec = load_embeddings()
+    # New vectors must live in the same space as the indexed ones
+    check_index_embeddings(load_manifest(INDEX_DIR), spec)
+    pipeline = embedding_pipeline(embeddings, spec)
+    stats = update_index(parents, children, pipeline.embed_documents, SQLITE_V3_DB_PATH, NATIVE_INDEX_DIR)
+    print(f"Update: {stats}")
+    print(f"Embedding pipeline: {pipeline.stats()}")
+    
+    # Small derived stores are rewritten from the new corpus
+    write_parent_store(parents, PARENT_STORE_PATH)
+    if BM25Index.exists(BM25_INDEX_DIR):
+        build_bm25(children)
+    return stats
 
 if __name__ == "__main__":
-    if not os.getenv("OPENAI_API_KEY"):
+    embeddings, embedding_spec = load_embeddings()
+    if embedding_spec["embedding_provider"] == "openai" and not os.getenv("OPENAI_API_KEY"):
         print("Error: OPENAI_API_KEY not found.")
         exit(1)
         
     parents = load_jsonl(PARENTS_FILE)
     children = load_jsonl(CHILDREN_FILE)
+    # Content-hash ids (process_data_v2.py): rerank scores keyed on parent ids survive rebuilds
+    content_ids = has_content_ids(parents)
+    
+    if "--incremental" in sys.argv:
+        if not content_ids:
+            print("Error: --incremental needs content-hash parent ids; re-run process_data_v2.py first.")
+            exit(1)
+        try:
+            update_incremental(parents, children, embeddings, embedding_spec)
+        except ValueError as e:
+            print(f"Error: {e}")
+            exit(1)
+        manifest = write_manifest(INDEX_DIR, {"content_ids": True, "parents": len(parents), "children": len(children)})
+        print(f"Index manifest written (build_id={manifest['build_id']})")
+        exit(0)
+    
+    # FundRAG serves sqlite_v3.db (normalized metadata) when present;
+    # --v2 also writes the legacy JSON-metadata DB for older tooling
+    print("--- Building SQLite V3 ---")
+    build_sqlite_v3(parents, children, SQLITE_V3_DB_PATH)
+    print(f"SQLite V3 saved to {SQLITE_V3_DB_PATH}")
+    if "--v2" in sys.argv:
+        build_sqlite_v2(parents, children)
+    write_parent_store(parents, PARENT_STORE_PATH)
+    print(f"Parent store saved to {PARENT_STORE_PATH}")
+    build_bm25(children)
+    faiss_params = build_faiss_v2(children, parents=parents, embeddings=embeddings, spec=embedding_spec)
     
-    build_sqlite_v2(parents, children)
-    build_faiss_v2(children)
+    # New build_id invalidates rerank/answer caches keyed on the index
+    manifest = write_manifest(INDEX_DIR, {
+        **embedding_spec,
+        "keyword_tokenizer": "cjk-bigram",
+        "sqlite_schema": 3,
+        "faiss_index_type": faiss_params["index_type"],
+        "content_ids": content_ids,
+        "parents": len(parents),
+        "children": len(children)
+    })
+    print(f"Index manifest written (build_id={manifest['build_id']})")
 
 
 
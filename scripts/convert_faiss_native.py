@@ -0,0 +1,85 @@
+"""
+Converts an existing index/faiss_v2 (LangChain FAISS, pickled docstore) to the
+native vector store (core/vector_store.py) without re-embedding. FundRAG loads
+index/faiss_native instead of unpickling index.pkl as soon as it exists.
+
+FAISS rows are mapped to SQLite v3 children ids by (parent_id, content), so the
+v3 DB must exist (build_index_v2.py or migrate_sqlite_v3.py).
+
+Usage:
+    python scripts/convert_faiss_native.py
+    python scripts/convert_faiss_native.py --src index/faiss_v2 --db index/sqlite_v3.db --dst index/faiss_native
+"""
+import os
+import sys
+import sqlite3
+import argparse
+from collections import defaultdict, deque
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import FakeEmbeddings
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.faiss_index import load_params
+from core.vector_store import write_native_store, NATIVE_INDEX_DIR
+
+INDEX_DIR = "index"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--src", default=os.path.join(INDEX_DIR, "faiss_v2"))
+    parser.add_argument("--db", default=os.path.join(INDEX_DIR, "sqlite_v3.db"))
+    parser.add_argument("--dst", default=NATIVE_INDEX_DIR)
+    args = parser.parse_args()
+
+    for path in (args.src, args.db):
+        if not os.path.exists(path):
+            print(f"Error: {path} not found.")
+            sys.exit(1)
+
+    # Only the index and docstore are needed; no embedding calls are made
+    store = FAISS.load_local(args.src, FakeEmbeddings(size=1), allow_dangerous_deserialization=True)
+
+    conn = sqlite3.connect(args.db)
+    parent_ids, parent_rows = [], {}
+    for uid, in conn.execute("SELECT uid FROM parents ORDER BY id"):
+        parent_rows[uid] = len(parent_ids)
+        parent_ids.append(uid)
+    # Duplicate child texts under one parent map to their ids in order
+    children = defaultdict(deque)
+    max_child_id = 0
+    for cid, uid, content in conn.execute(
+        "SELECT c.id, p.uid, c.content FROM children c JOIN parents p ON p.id = c.parent_id ORDER BY c.id"
+    ):
+        children[(uid, content)].append(cid)
+        max_child_id = cid
+    conn.close()
+
+    row_child = np.zeros(store.index.ntotal, dtype=np.int32)
+    child_parent = np.full(max_child_id + 1, -1, dtype=np.int32)
+    missing = 0
+    for row in range(store.index.ntotal):
+        doc = store.docstore.search(store.index_to_docstore_id[row])
+        uid = doc.metadata.get('parent_id')
+        ids = children.get((uid, doc.page_content))
+        if not ids:
+            missing += 1
+            row_child[row] = 0  # id 0 never exists: maps to parent row -1
+            continue
+        cid = ids.popleft()
+        row_child[row] = cid
+        child_parent[cid] = parent_rows[uid]
+    if missing:
+        print(f"Warning: {missing} FAISS rows have no matching child in {args.db} (hits without parent)")
+
+    write_native_store(store.index, row_child, child_parent, parent_ids, args.dst, load_params(args.src))
+    size_mb = sum(os.path.getsize(os.path.join(args.dst, f)) for f in os.listdir(args.dst)) / 1e6
+    pickle_mb = os.path.getsize(os.path.join(args.src, "index.pkl")) / 1e6
+    print(f"Native vector store: {store.index.ntotal} rows -> {args.dst} ({size_mb:.1f} MB; "
+          f"replaces index.pkl {pickle_mb:.1f} MB + index.faiss)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import sys
 from sentence_transformers import CrossEncoder
 
 def download_reranker():
@@ -18,6 +19,24 @@ def download_reranker():
     print("✅ 模型下载完成！")
     print(f"请更新 rag_pipeline_v3.py 中的模型路径为: {save_path}")
 
+def download_embedding():
+    """Local embedding model for EMBEDDING_PROVIDER=local (core.embedding_providers)"""
+    from sentence_transformers import SentenceTransformer
+    model_name = "BAAI/bge-small-zh-v1.5"
+    save_path = "models/bge-small-zh-v1.5"
+    
+    print(f"开始下载模型: {model_name} ...")
+    print(f"目标路径: {os.path.abspath(save_path)}")
+    
+    model = SentenceTransformer(model_name)
+    model.save(save_path)
+    
+    print("✅ 模型下载完成！")
+    print("设置 EMBEDDING_PROVIDER=local 后需重新运行 scripts/build_index_v2.py")
+
 if __name__ == "__main__":
-    download_reranker()
+    if "--embedding" in sys.argv:
+        download_embedding()
+    else:
+        download_reranker()
 
@@ -0,0 +1,122 @@
+"""
+Evaluates adaptive candidate pool sizing (RAG_ADAPTIVE_POOL) against the fixed 20/20 pool.
+
+Every validation question is answered twice, once per mode, and the script reports
+per query type (router pipeline) and per adaptive path. The question is embedded
+before either run (both then hit the embedding cache) and the two modes alternate
+which runs first, so neither is timed with caches the other just warmed:
+- retrieval latency (legs + rerank) and the latency saved
+- answer accuracy (loose match of std answer in the parsed answer, as in EvaluationTools.py)
+- top-5 agreement of the retrieved parents with the fixed pool
+
+--retrieval-only skips the LLM and compares retrieval only (no accuracy column).
+
+Usage:
+    python scripts/evaluate_adaptive_pool.py --limit 50
+    python scripts/evaluate_adaptive_pool.py --retrieval-only
+"""
+import os
+import sys
+import time
+import argparse
+from typing import Dict
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["RERANK_CACHE"] = "0"  # both modes must pay for their own rerank
+from rag_pipeline_v3 import FundRAG
+
+VALIDATION_FILE = os.path.join("rawdoc", "validation_set.xlsx")
+FINAL_K = 5  # same as FundRAG.query
+
+
+def parse_answer(full_response: str) -> str:
+    for line in full_response.split('\n'):
+        if line.strip().lower().startswith("answer:") or line.strip().startswith("答案："):
+            return line.split(":", 1)[1].strip() if ":" in line else line.split("：", 1)[1].strip()
+    return ""
+
+
+def run_once(rag: FundRAG, question: str, retrieval_only: bool) -> Dict:
+    timings = {}
+    start = time.perf_counter()
+    docs = rag.hybrid_retrieval(question, final_k=FINAL_K, timings=timings)
+    retrieval_ms = (time.perf_counter() - start) * 1000
+
+    pred = ""
+    if not retrieval_only and docs:
+        chain = rag.calc_chain if rag._classify_query(question) == 'calc' else rag.std_chain
+        pred = parse_answer(chain.invoke({"context": rag.format_context(docs), "question": question}))
+
+    return {
+        "retrieval_ms": retrieval_ms,
+        "path": timings.get("pool_path"),
+        "pool_size": timings.get("pool_size"),
+        "parents": [d['parent_id'] for d in docs],
+        "pred": pred,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=VALIDATION_FILE)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--retrieval-only", action="store_true")
+    parser.add_argument("--output", default="evaluation_adaptive_pool.xlsx")
+    args = parser.parse_args()
+
+    df = pd.read_excel(args.input)
+    if 'question' not in df.columns:
+        df.rename(columns={'题目': 'question', '问题': 'question'}, inplace=True)
+    if args.limit:
+        df = df.head(args.limit)
+
+    rag = FundRAG()
+    rag.ensure_reranker()
+    if not args.retrieval_only:
+        rag.ensure_llm()  # chains are built lazily; run_once invokes them directly
+    rag.hybrid_retrieval(str(df['question'].iloc[0]))  # warm-up
+
+    rows = []
+    for index, row in df.iterrows():
+        question = str(row['question'])
+        std = str(row.get('answer', '') or row.get('答案', '') or row.get('std_answer', '')).strip().upper()
+        print(f"[{index + 1}/{len(df)}] {question[:30]}...", flush=True)
+
+        rag.embeddings.embed_query(question)  # outside the timed runs: equal cost for both modes
+        runs = {}
+        for adaptive_pool in ((False, True) if index % 2 == 0 else (True, False)):
+            rag.adaptive_pool = adaptive_pool
+            runs[adaptive_pool] = run_once(rag, question, args.retrieval_only)
+        fixed, adaptive = runs[False], runs[True]
+
+        result = {
+            "question": question,
+            "query_type": rag._classify_query(question),
+            "path": adaptive["path"],
+            "pool_size": adaptive["pool_size"],
+            "fixed_ms": round(fixed["retrieval_ms"], 1),
+            "adaptive_ms": round(adaptive["retrieval_ms"], 1),
+            "top5_agreement": len(set(fixed["parents"]) & set(adaptive["parents"])) / FINAL_K,
+        }
+        if not args.retrieval_only and std and std != 'NAN':
+            result["fixed_correct"] = std in fixed["pred"].upper()
+            result["adaptive_correct"] = std in adaptive["pred"].upper()
+        rows.append(result)
+
+    result_df = pd.DataFrame(rows)
+    result_df["saved_ms"] = result_df["fixed_ms"] - result_df["adaptive_ms"]
+    result_df.to_excel(args.output, index=False)
+
+    agg = {"question": "count", "fixed_ms": "mean", "adaptive_ms": "mean", "saved_ms": "mean", "top5_agreement": "mean"}
+    if "fixed_correct" in result_df.columns:
+        agg.update({"fixed_correct": "mean", "adaptive_correct": "mean"})
+    for key in ("query_type", "path"):
+        print(f"\n=== By {key} ===")
+        print(result_df.groupby(key).agg(agg).rename(columns={"question": "n"}).round(3).to_string())
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Exports models/bge-reranker-base to ONNX for the ONNX Runtime reranker backend:
+    models/bge-reranker-base-onnx/model.onnx        (float32, RERANKER_BACKEND=onnx)
+    models/bge-reranker-base-onnx/model-int8.onnx   (dynamic int8, RERANKER_BACKEND=onnx-int8)
+
+Requires torch, transformers, onnx and onnxruntime.
+
+Usage:
+    python scripts/export_reranker_onnx.py
+    python scripts/export_reranker_onnx.py --skip-quantize
+"""
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.reranker_backends import (
+    RERANKER_HF_NAME, RERANKER_LOCAL_DIR, RERANKER_ONNX_DIR, ONNX_FP32_FILE, ONNX_INT8_FILE
+)
+
+OPSET = 17
+
+
+def export_fp32(model_dir: str, out_dir: str) -> str:
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    source = model_dir if os.path.exists(model_dir) else RERANKER_HF_NAME
+    print(f"Loading {source} ...")
+    tokenizer = AutoTokenizer.from_pretrained(source)
+    model = AutoModelForSequenceClassification.from_pretrained(source, torch_dtype=torch.float32)
+    model.eval()
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer.save_pretrained(out_dir)
+
+    dummy = tokenizer(["什么是开放式基金？"], ["开放式基金是指基金份额不固定的基金。"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    out_path = os.path.join(out_dir, ONNX_FP32_FILE)
+    print(f"Exporting ONNX (opset {OPSET}) to {out_path} ...")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            out_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=OPSET,
+        )
+    return out_path
+
+
+def quantize_int8(fp32_path: str, out_dir: str) -> str:
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    out_path = os.path.join(out_dir, ONNX_INT8_FILE)
+    print(f"Quantizing (dynamic int8 weights) to {out_path} ...")
+    quantize_dynamic(fp32_path, out_path, weight_type=QuantType.QInt8)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", default=RERANKER_LOCAL_DIR)
+    parser.add_argument("--out-dir", default=RERANKER_ONNX_DIR)
+    parser.add_argument("--skip-quantize", action="store_true")
+    args = parser.parse_args()
+
+    fp32_path = export_fp32(args.model_dir, args.out_dir)
+    print(f"fp32 size: {os.path.getsize(fp32_path) / 1e6:.1f} MB")
+
+    if not args.skip_quantize:
+        int8_path = quantize_int8(fp32_path, args.out_dir)
+        print(f"int8 size: {os.path.getsize(int8_path) / 1e6:.1f} MB")
+
+    print("✅ Export complete. Set RERANKER_BACKEND=onnx or onnx-int8 to use it.")
+
+
+if __name__ == "__main__":
+    main()
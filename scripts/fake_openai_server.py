@@ -0,0 +1,128 @@
+"""
+Local OpenAI-compatible /v1/embeddings stand-in, for tests and offline build runs.
+
+Vectors are deterministic (seeded by the input) and unit length. Rate limits
+and outages can be injected to exercise core.embedding_pipeline:
+
+    python scripts/fake_openai_server.py --port 8900 --dim 1536 [--rate-limit-every 5]
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=test python scripts/build_index_v2.py
+"""
+import json
+import base64
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import numpy as np
+
+
+def fake_vector(value, dim: int) -> np.ndarray:
+    """Unit vector seeded by the input (a string, or token ids when the client pre-tokenizes)."""
+    seed = hashlib.sha256(json.dumps(value, ensure_ascii=False).encode("utf-8")).digest()
+    vector = np.random.default_rng(int.from_bytes(seed[:8], "little")).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeEmbeddingServer:
+
+    def __init__(self, dim: int = 8, host: str = "127.0.0.1", port: int = 0,
+                 rate_limit_every: int = 0, retry_after: float = 0.0, fail_after: Optional[int] = None):
+        """
+        rate_limit_every: every n-th request gets a 429 (with Retry-After: retry_after seconds)
+        fail_after: after this many successful requests, every request gets a 500
+        """
+        self.dim = dim
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.fail_after = fail_after
+        self.requests = 0
+        self.served = 0
+        self.texts = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: dict, headers: Optional[dict] = None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("/embeddings"):
+                    return self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                with server._lock:
+                    server.requests += 1
+                    rate_limited = server.rate_limit_every and server.requests % server.rate_limit_every == 0
+                    down = server.fail_after is not None and server.served >= server.fail_after
+                    if not (rate_limited or down):
+                        server.served += 1
+                if rate_limited:
+                    return self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                      {"Retry-After": str(server.retry_after)})
+                if down:
+                    return self._send(500, {"error": {"message": "The server had an error", "type": "server_error"}})
+
+                inputs = body.get("input", [])
+                if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                    inputs = [inputs]
+                with server._lock:
+                    server.texts += len(inputs)
+                data = []
+                for i, value in enumerate(inputs):
+                    vector = fake_vector(value, server.dim)
+                    if body.get("encoding_format") == "base64":
+                        embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+                    else:
+                        embedding = vector.tolist()
+                    data.append({"object": "embedding", "index": i, "embedding": embedding})
+                self._send(200, {"object": "list", "data": data, "model": body.get("model"),
+                                 "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+
+        return Handler
+
+    def start(self) -> "FakeEmbeddingServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = FakeEmbeddingServer(args.dim, args.host, args.port, args.rate_limit_every, args.retry_after)
+    print(f"Fake embeddings at {server.url} (dim={args.dim})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,49 @@
+"""
+Migrates index/sqlite_v2.db (JSON metadata per row) to the normalized schema v3
+(core/sqlite_schema.py) at index/sqlite_v3.db, and writes the mmap parent store
+(core/parent_store.py). FundRAG and the question generator use them as soon as
+they exist; the v2 file is left untouched.
+
+Usage:
+    python scripts/migrate_sqlite_v3.py
+    python scripts/migrate_sqlite_v3.py --src index/sqlite_v2.db --dst index/sqlite_v3.db
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.sqlite_schema import migrate_v2_to_v3, read_v2
+from core.parent_store import write_parent_store, PARENT_STORE_PATH
+
+INDEX_DIR = "index"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--src", default=os.path.join(INDEX_DIR, "sqlite_v2.db"))
+    parser.add_argument("--dst", default=os.path.join(INDEX_DIR, "sqlite_v3.db"))
+    parser.add_argument("--parent-store", default=PARENT_STORE_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.src):
+        print(f"Error: {args.src} not found.")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    n_parents, n_children = migrate_v2_to_v3(args.src, args.dst)
+    elapsed = time.perf_counter() - start
+
+    src_mb = os.path.getsize(args.src) / 1e6
+    dst_mb = os.path.getsize(args.dst) / 1e6
+    print(f"Migrated {n_parents} parents / {n_children} children in {elapsed:.1f}s")
+    print(f"{args.src}: {src_mb:.1f} MB -> {args.dst}: {dst_mb:.1f} MB ({dst_mb / src_mb:.0%})")
+
+    parents, _ = read_v2(args.src)
+    write_parent_store(parents, args.parent_store)
+    print(f"Parent store: {args.parent_store} ({os.path.getsize(args.parent_store) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
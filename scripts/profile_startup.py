@@ -0,0 +1,109 @@
+"""
+Startup-time profile of the entry points, from `python -X importtime`.
+
+For each module a fresh interpreter imports it with -X importtime; the report
+shows the total import time, the slowest direct imports (cumulative) and the
+packages that cost the most in total (self time summed per top-level package),
+i.e. what to move behind a lazy import.
+
+--cli also times how long `python cli.py` takes to show its input prompt
+(index loading runs in the background, see cli.BackgroundRAG).
+
+Usage:
+    python scripts/profile_startup.py                        # rag_pipeline_v3, cli, EvaluationTools, ui.app
+    python scripts/profile_startup.py rag_pipeline_v3 --top 20
+    python scripts/profile_startup.py --cli
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["rag_pipeline_v3", "cli", "EvaluationTools", "ui.app"]
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importtime(module: str) -> List[Tuple[int, int, int, str]]:
+    """(self us, cumulative us, nesting depth, module name) per import, in -X importtime order."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cum_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cum_us), (len(indent) - 1) // 2, name))
+    if not rows or rows[-1][3] != module:
+        error = proc.stderr.strip().splitlines()
+        raise RuntimeError(error[-1] if error else f"import {module} failed")
+    return rows
+
+
+def report(module: str, top: int) -> Dict:
+    rows = importtime(module)
+    total_ms = rows[-1][1] / 1000
+    # Direct imports of the module (depth 1): what its own import statements cost
+    direct = sorted(((cum, name) for _, cum, depth, name in rows if depth == 1), reverse=True)
+    packages: Dict[str, int] = defaultdict(int)
+    for self_us, _, _, name in rows:
+        packages[name.split(".")[0]] += self_us
+
+    print(f"\n=== {module}: {total_ms:.0f} ms ({len(rows)} modules) ===")
+    print("  slowest direct imports (cumulative):")
+    for cum, name in direct[:top]:
+        print(f"    {cum / 1000:8.1f} ms  {name}")
+    print("  heaviest packages (self time, all submodules):")
+    for name, self_us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"    {self_us / 1000:8.1f} ms  {name}")
+    return {"module": module, "total_ms": round(total_ms, 1)}
+
+
+def time_to_prompt(timeout: float = 60.0) -> float:
+    """Seconds until `python cli.py` prints its '> ' prompt."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "cli.py"], cwd=ROOT, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        seen = b""
+        while b"> " not in seen:
+            byte = proc.stdout.read(1)
+            if not byte or time.perf_counter() - start > timeout:
+                raise RuntimeError("cli.py exited or timed out before showing its prompt")
+            seen += byte
+        return time.perf_counter() - start
+    finally:
+        proc.stdin.write(b"exit\n")
+        proc.stdin.close()
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--cli", action="store_true", help="Also time cli.py until its input prompt")
+    args = parser.parse_args()
+
+    summary = []
+    for module in args.modules:
+        try:
+            summary.append(report(module, args.top))
+        except RuntimeError as e:
+            print(f"\n=== {module}: import failed ({e}) ===")
+
+    print()
+    for row in summary:
+        print(f"{row['module']:>20}: {row['total_ms']:8.1f} ms")
+    if args.cli:
+        print(f"{'cli.py prompt':>20}: {time_to_prompt() * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 import sqlite3
 import json
 import os
-import re
 from typing import List, Dict, Any, Tuple
 
-DB_PATH = os.path.join("index", "sqlite_v2.db")
+# clean_chapter_name moved to core.sqlite_schema (v3 stores the cleaned name); re-exported here
+from core.sqlite_schema import clean_chapter_name, row_metadata, METADATA_COLUMNS, SCHEMA_VERSION
+
+DB_V3_PATH = os.path.join("index", "sqlite_v3.db")
+DB_V2_PATH = os.path.join("index", "sqlite_v2.db")
+DB_PATH = DB_V3_PATH if os.path.exists(DB_V3_PATH) else DB_V2_PATH
 
 def get_db_connection():
     """Establishes a connection to the SQLite database."""
@@ -14,21 +18,8 @@ def get_db_connection():
     conn.row_factory = sqlite3.Row
     return conn
 
-def clean_chapter_name(name: str) -> str:
-    """
-    Removes trailing numbers from chapter names to deduplicate.
-    Handles standard spaces, non-breaking spaces, full-width spaces.
-    Example: "第6章 投资管理基础 151" -> "第6章 投资管理基础"
-    """
-    if not name:
-        return "Unknown Chapter"
-    
-    # Regex explanation:
-    # [\s\xa0\u3000]+ : Match one or more whitespace characters (including NBSP \xa0 and full-width space \u3000)
-    # \d+             : Match one or more digits
-    # [\s\xa0\u3000]* : Match zero or more trailing whitespace characters
-    # $               : End of string
-    return re.sub(r'[\s\xa0\u3000]+\d+[\s\xa0\u3000]*$', '', name).strip()
+def is_v3(conn) -> bool:
+    return conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION
 
 def fetch_chapter_tree() -> Dict[str, Dict[str, List[str]]]:
     """
@@ -42,6 +33,25 @@ def fetch_chapter_tree() -> Dict[str, Dict[str, List[str]]]:
         }
     """
     conn = get_db_connection()
+    if is_v3(conn):
+        # Sections are interned with their cleaned chapter name: no per-parent scan
+        rows = conn.execute(
+            "SELECT DISTINCT book, chapter_clean, section FROM sections s "
+            "WHERE EXISTS (SELECT 1 FROM parents p WHERE p.section_id = s.id)"
+        ).fetchall()
+        conn.close()
+        tree = {}
+        for row in rows:
+            book = row['book'] or 'Unknown Book'
+            chapters = tree.setdefault(book, {})
+            sections = chapters.setdefault(row['chapter_clean'], [])
+            if row['section'] and row['section'] not in sections:
+                sections.append(row['section'])
+        for book in tree:
+            for chapter in tree[book]:
+                tree[book][chapter].sort()
+        return tree
+
     cursor = conn.cursor()
     
     # We only need metadata to build the tree
@@ -86,6 +96,19 @@ def fetch_parent_chunks(chapters: List[str] = None) -> List[Dict[str, Any]]:
     Matches against CLEANED chapter names.
     """
     conn = get_db_connection()
+    if is_v3(conn):
+        query = f"SELECT p.uid AS id, p.content, {METADATA_COLUMNS} FROM parents p JOIN sections s ON s.id = p.section_id"
+        params = []
+        if chapters:
+            query += f" WHERE s.chapter_clean IN ({','.join(['?'] * len(chapters))})"
+            params = list(chapters)
+        rows = conn.execute(query + " ORDER BY p.id", params).fetchall()
+        conn.close()
+        return [
+            {"id": row['id'], "content": row['content'], "metadata": row_metadata(row)}
+            for row in rows
+        ]
+
     cursor = conn.cursor()
 
     query = "SELECT id, content, metadata FROM doc_parents"
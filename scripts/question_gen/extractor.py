@@ -6,6 +6,7 @@ from langchain_core.output_parsers import PydanticOutputParser
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 
+from core.llm_factory import chat_llm_kwargs
 from scripts.question_gen.models import KnowledgePoint
 
 load_dotenv()
@@ -46,29 +47,11 @@ class KnowledgeExtractor:
         # Use env var or default to qwen-max if not provided
         if model_name is None:
             model_name = os.getenv("RAG_LLM_MODEL", "qwen-max")
-        # Initialize LLM similar to main pipeline
-        efund_base = os.getenv("EFUNDS_API_BASE")
-        efund_key = os.getenv("EFUNDS_API_KEY")
-        
-        llm_kwargs = {}
-        if efund_base:
-            llm_kwargs["base_url"] = efund_base
-        if efund_key:
-            llm_kwargs["api_key"] = efund_key
-            
-        # Headers for EFundGPT if present
-        extra_headers = {}
-        if os.getenv("EFUNDS_USER_NAME"):
-            extra_headers["Efunds-User-Name"] = os.getenv("EFUNDS_USER_NAME")
-        if os.getenv("EFUNDS_ACC_TOKEN"):
-            extra_headers["Efunds-Acc-Token"] = os.getenv("EFUNDS_ACC_TOKEN")
-        if os.getenv("EFUNDS_SOURCE"):
-            extra_headers["Efunds-Source"] = os.getenv("EFUNDS_SOURCE")
-            
-        if extra_headers:
-            llm_kwargs["model_kwargs"] = {"extra_headers": extra_headers}
+        # Same settings as the main pipeline (core.llm_factory); cached when
+        # LLM_CACHE=1 and temperature is 0
+        llm_kwargs = chat_llm_kwargs(temperature)
 
-        self.llm = ChatOpenAI(model_name=model_name, temperature=temperature, **llm_kwargs)
+        self.llm = ChatOpenAI(model_name=model_name, **llm_kwargs)
         self.parser = PydanticOutputParser(pydantic_object=KnowledgePoint)
         
         # We define a custom prompt that includes format instructions if needed, 
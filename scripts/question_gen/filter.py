@@ -4,15 +4,19 @@ import numpy as np
 from typing import List
 from langchain_openai import OpenAIEmbeddings
 from scripts.question_gen.models import GeneratedQuestion
+from core.embedding_cache import cached_embeddings
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+
 class DuplicationFilter:
     def __init__(self, validation_file: str = "rawdoc/validation_set.xlsx", threshold: float = 0.85):
         self.threshold = threshold
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+        # Cached: the validation set is only embedded once across runs
+        self.embeddings = cached_embeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL)
         self.existing_vectors = []
         self.existing_texts = []
         
@@ -26,9 +30,10 @@ class DuplicationFilter:
                 questions = df[col_name].dropna().astype(str).tolist()
                 
                 if questions:
-                    self.existing_vectors = self.embeddings.embed_documents(questions)
+                    # Served from the shared embedding store after the first run; kept as one matrix
+                    self.existing_vectors = np.array(self.embeddings.embed_documents(questions), dtype=np.float32)
                     self.existing_texts = questions
-                    print(f"Loaded {len(self.existing_vectors)} existing questions.")
+                    print(f"Loaded {len(self.existing_vectors)} existing questions. Embedding cache: {self.embeddings.stats()}")
             except Exception as e:
                 print(f"Failed to load validation set: {e}")
         else:
@@ -49,7 +54,7 @@ class DuplicationFilter:
         new_vector = self.embeddings.embed_query(question_text)
         
         # Check against existing (Validation Set)
-        if self.existing_vectors:
+        if len(self.existing_vectors):
             sims = self._cosine_similarity(new_vector, self.existing_vectors)
             if np.max(sims) > self.threshold:
                 # print(f"Duplicate found in validation set (max sim: {np.max(sims):.4f})")
@@ -66,12 +71,7 @@ class DuplicationFilter:
 
     def add_question(self, question: GeneratedQuestion):
         """Adds a verified question to the session history."""
-        # We re-embed here or cache the embedding from check step. 
-        # For simplicity/robustness, we re-embed or just assume it passed check.
-        # Ideally we cache, but `embed_query` is cheap enough for single item usually.
-        # Optimization: We could return vector from is_duplicate? 
-        # For now, let's just re-embed to keep API clean.
-        
+        # Served from the embedding cache filled by is_duplicate()
         vector = self.embeddings.embed_query(question.question)
         self.generated_vectors.append(vector)
         self.generated_texts.append(question.question)
@@ -1,3 +1,4 @@
+import os
 import unittest
 from unittest.mock import MagicMock, patch
 import numpy as np
@@ -6,6 +7,7 @@ from scripts.question_gen.models import GeneratedQuestion
 
 class TestFilter(unittest.TestCase):
     
+    @patch.dict(os.environ, {"EMBEDDING_CACHE": "0"}) # Memory-only cache, no files
     @patch('scripts.question_gen.filter.OpenAIEmbeddings')
     @patch('scripts.question_gen.filter.pd.read_excel') # Mock pandas to avoid file IO
     @patch('scripts.question_gen.filter.os.path.exists')
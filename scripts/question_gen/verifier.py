@@ -48,7 +48,8 @@ class RAGVerifier:
         # We use a separate lightweight LLM for the verification step itself if needed,
         # but here we can reuse the rag's llm or init a new one.
         # Let's reuse the config approach for consistency.
-        self.llm = self.rag.std_llm # Reuse the standard LLM from RAG
+        self.rag.ensure_llm()  # FundRAG builds its LLM clients on first use
+        self.llm = self.rag.std_llm # Reuse the standard LLM from RAG (LLM_CACHE=1 caches its answers)
         
         self.prompt = PromptTemplate(
             template=VERIFICATION_PROMPT,
@@ -1,5 +1,10 @@
+import os
+import sys
 from typing import List, Dict
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.content_ids import child_ids
+
 CHILD_SIZE = 300
 CHILD_OVERLAP = 50
 
@@ -43,6 +48,9 @@ def split_children(parent_chunks: List[Dict]) -> List[Dict]:
             start += (CHILD_SIZE - CHILD_OVERLAP)
             chunk_index += 1
             
+    # Deterministic child ids (parent_id + content, see core.content_ids)
+    for child, child_id in zip(children, child_ids(children)):
+        child['child_id'] = child_id
     return children
 
 
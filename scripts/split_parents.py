@@ -1,8 +1,12 @@
+import os
 import re
-import uuid
+import sys
 import json
 from typing import List, Dict
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.content_ids import assign_parent_ids
+
 # Config
 PARENT_MIN_LEN = 300
 PARENT_TARGET_LEN = 1000
@@ -49,7 +53,7 @@ def split_text_smart(text: str, max_len: int) -> List[str]:
 def process_parents(sections: List[Dict]) -> List[Dict]:
     """
     Converts Sections into Parent Chunks.
-    Adds parent_id and ensures length constraints.
+    Adds parent_id (content hash, see core.content_ids) and ensures length constraints.
     """
     parents = []
     
@@ -66,9 +70,7 @@ def process_parents(sections: List[Dict]) -> List[Dict]:
         
         # If it's a table rewrite, keep as single parent (usually)
         if base_meta['chunk_type'] == 'manual_table_rewrite':
-            parent_id = str(uuid.uuid4())
             parents.append({
-                "parent_id": parent_id,
                 "content": content,
                 "metadata": base_meta
             })
@@ -79,24 +81,21 @@ def process_parents(sections: List[Dict]) -> List[Dict]:
             # Split logic
             split_contents = split_text_smart(content, PARENT_TARGET_LEN)
             for i, sub_content in enumerate(split_contents):
-                parent_id = str(uuid.uuid4())
                 meta = base_meta.copy()
                 meta['split_part'] = i + 1
                 parents.append({
-                    "parent_id": parent_id,
                     "content": sub_content,
                     "metadata": meta
                 })
         else:
             # Keep as is
-            parent_id = str(uuid.uuid4())
             parents.append({
-                "parent_id": parent_id,
                 "content": content,
                 "metadata": base_meta
             })
             
-    return parents
+    # Same text + metadata -> same id on every run (incremental index builds diff by id)
+    return assign_parent_ids(parents)
 
 
 
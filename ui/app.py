@@ -3,6 +3,7 @@ from ui.components import create_ui_components, get_custom_css
 from ui.callbacks import bind_callbacks
 from ui.chat_components import create_chat_ui_components, create_mode_toggle_button
 from ui.chat_callbacks import bind_chat_callbacks
+from ui.chat_utils import preload_rag
 
 def main():
     # 1. Get CSS
@@ -65,6 +66,8 @@ def main():
     return app, css
 
 if __name__ == "__main__":
+    # Index / LLM client load overlaps with building and serving the UI
+    preload_rag()
     app, css = main()
     app.launch(
         server_name="127.0.0.1", 
@@ -1,14 +1,14 @@
 import gradio as gr
 import pandas as pd
 import os
-from scripts.generate_questions import QuestionGenerationPipeline
 
-# Global Pipeline Instance (Lazy load)
+# Global Pipeline Instance (Lazy load, import included: it pulls in LangChain)
 pipeline = None
 
 def get_pipeline():
     global pipeline
     if pipeline is None:
+        from scripts.generate_questions import QuestionGenerationPipeline
         pipeline = QuestionGenerationPipeline()
     return pipeline
 
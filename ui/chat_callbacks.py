@@ -5,6 +5,7 @@ This module contains all callback functions for the chat assistant interface,
 including message sending, chat clearing, and event binding.
 """
 
+import asyncio
 import gradio as gr
 import logging
 from typing import List, Tuple, Dict, Any
@@ -14,9 +15,11 @@ from ui.chat_utils import get_rag, format_sources, handle_rag_error, validate_in
 logger = logging.getLogger(__name__)
 
 
-def on_send_message(user_message: str, chat_history: List[Dict[str, str]]):
+async def on_send_message(user_message: str, chat_history: List[Dict[str, str]]):
     """
     Handle user message submission and generate response with streaming output.
+    Runs on Gradio's event loop via FundRAG.aquery_stream, so concurrent users
+    don't each hold a worker thread for the whole LLM call.
     
     Args:
         user_message: The user's input question
@@ -47,8 +50,8 @@ def on_send_message(user_message: str, chat_history: List[Dict[str, str]]):
         chat_history.append({"role": "assistant", "content": "🤖 正在检索相关知识..."})
         yield chat_history, ""
         
-        # Get RAG instance
-        rag = get_rag()
+        # Get RAG instance (first call loads the index, keep it off the event loop)
+        rag = await asyncio.to_thread(get_rag)
         
         # Call RAG pipeline with streaming
         logger.info(f"Processing question: {user_message[:50]}...")
@@ -63,7 +66,7 @@ def on_send_message(user_message: str, chat_history: List[Dict[str, str]]):
         retrieved_docs = []
         chunk_count = 0
         
-        for stream_chunk in rag.query_stream(user_message):
+        async for stream_chunk in rag.aquery_stream(user_message):
             chunk_type = stream_chunk.get("type")
             
             if chunk_type == "metadata":
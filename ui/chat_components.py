@@ -6,6 +6,7 @@ including chatbot display, input fields, and action buttons.
 """
 
 import gradio as gr
+from ui.chat_utils import rag_status
 
 
 def create_chat_ui_components():
@@ -19,6 +20,7 @@ def create_chat_ui_components():
             - send_btn: Button to submit question
             - clear_btn: Button to clear chat history
             - chat_state: State component to store conversation history
+            - rag_status: Markdown with the RAG readiness, refreshed every 5 s
     
     Example:
         >>> components = create_chat_ui_components()
@@ -30,6 +32,7 @@ def create_chat_ui_components():
     # Chat display area (conversation history)
     gr.Markdown("### 🤖 知识问答助手")
     gr.Markdown("输入您的问题，获取基于教材的专业解答")
+    components['rag_status'] = gr.Markdown(value=rag_status, every=5)
     
     # Chatbot component - removed clear button, using built-in features
     components['chat_display'] = gr.Chatbot(
@@ -7,12 +7,16 @@ including RAG instance management, source formatting, and error handling.
 
 from typing import Dict, List, Optional
 import logging
+import threading
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
 # Global RAG instance (lazy loading)
 _rag_instance = None
+_rag_lock = threading.Lock()
+# Last initialization / preload error, shown by rag_status until a retry succeeds
+_rag_error: Optional[str] = None
 
 
 def get_rag():
@@ -25,21 +29,73 @@ def get_rag():
     Raises:
         Exception: If RAG initialization fails
     """
-    global _rag_instance
+    global _rag_instance, _rag_error
     
-    if _rag_instance is None:
+    if _rag_instance is not None:
+        return _rag_instance
+    
+    # Concurrent first messages share one initialization
+    with _rag_lock:
+        if _rag_instance is not None:
+            return _rag_instance
         try:
             logger.info("Initializing FundRAG instance...")
             from rag_pipeline_v3 import FundRAG
             _rag_instance = FundRAG()
+            _rag_error = None
             logger.info("FundRAG instance initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize FundRAG: {e}")
+            _rag_error = str(e)
             raise Exception(f"RAG系统初始化失败: {str(e)}")
     
     return _rag_instance
 
 
+def preload_rag() -> threading.Thread:
+    """
+    Starts loading FundRAG (index + LLM client) in a background thread while
+    the UI starts, so the first chat message finds it ready. Errors are logged
+    and shown by rag_status; get_rag() retries and reports them on first use.
+    """
+    def _load():
+        global _rag_error
+        try:
+            get_rag().ensure_llm()
+        except Exception as e:
+            logger.warning(f"Background RAG preload failed: {e}")
+            _rag_error = _rag_error or str(e)  # get_rag already recorded an init failure
+
+    thread = threading.Thread(target=_load, name="rag-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+READINESS_LABELS = {
+    "warming": "🔥 预热中",
+    "ready": "✅ 就绪",
+    "degraded": "⚠️ 部分组件不可用",
+}
+
+
+def rag_status() -> str:
+    """
+    One-line readiness of the RAG system for the chat page: loading (no
+    instance yet), warming (RAG_WARMUP tasks running), ready or degraded
+    (a failed warm-up task, or a failed preload with its error message).
+    """
+    if _rag_instance is None:
+        if _rag_error:
+            return f"{READINESS_LABELS['degraded']}：索引加载失败（{_rag_error}），发送消息将重试"
+        return "⏳ 正在加载索引..."
+    if _rag_error and _rag_instance.std_chain is None:
+        return f"{READINESS_LABELS['degraded']}：LLM 初始化失败（{_rag_error}），发送消息将重试"
+    status = _rag_instance.readiness.status()
+    label = READINESS_LABELS.get(status["state"], status["state"])
+    pending = [name for name, task in status["tasks"].items() if task["state"] != "done"]
+    return f"{label}（{', '.join(pending)}）" if pending else label
+
+
 def format_sources(metadata_list: List[Dict], retrieved_docs: List[Dict]) -> str:
     """
     Format retrieved document sources into readable Markdown format.
@@ -68,7 +124,7 @@ def format_sources(metadata_list: List[Dict], retrieved_docs: List[Dict]) -> str
         # Extract metadata
         book = meta.get('book', 'Unknown')
         chapter = meta.get('chapter', 'Unknown')
-        rerank_score = doc.get('rerank_score', 0.0)
+        rerank_score = doc.get('rerank_score')  # absent when the adaptive pool skipped rerank
         
         # Get text snippet (first 150 characters for better readability)
         content = doc.get('content', '')
@@ -76,7 +132,8 @@ def format_sources(metadata_list: List[Dict], retrieved_docs: List[Dict]) -> str
         
         # Format source entry with better spacing and styling
         sources_md += f"**[{i}]** {book} | {chapter}\n\n"
-        sources_md += f"<b>Confidence:</b> {rerank_score:.2f}\n\n"
+        if rerank_score is not None:
+            sources_md += f"<b>Confidence:</b> {rerank_score:.2f}\n\n"
         sources_md += f"<b>Evidence:</b>\n<span style='font-size: 0.9em; color: #666;'>> {snippet}</span>\n\n"
     
     return sources_md